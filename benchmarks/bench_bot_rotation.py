@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Daily bot rotation benchmark: per-city loop vs the single-pass bulk engine
+
+The legacy loop re-read every bot twice per city (one full SELECT per
+gender) and wrote each city in its own transaction, resetting all bots each
+time. The bulk engine reads bots once, groups them by (city, gender) in
+memory and writes last_rotation_date plus daily_bot_order in one
+transaction.
+
+Usage: python benchmarks/bench_bot_rotation.py [bots]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import Database
+from scripts.bot_rotation import BotRotationManager
+
+
+def seed_bots(db: Database, bots: int):
+    """Spread bots over every rotated city, both genders"""
+    cities = list(db.city_config.tiers())
+    rows = []
+    for n in range(bots):
+        city = cities[n % len(cities)]
+        gender = 'male' if (n // len(cities)) % 2 else 'female'
+        rows.append((10_000_000 + n, f'Bot {n}', 25, gender, city, city, 'Пиво'))
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, is_bot)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ''', rows)
+        conn.commit()
+
+
+def legacy_rotation(manager: BotRotationManager, date: str):
+    """The previous algorithm: two full bot scans and one reset-all write per city"""
+    for city in manager.rotation_cities:
+        male = [b for b in manager._fetch_bots() if b['city_normalized'] == city and b['gender'] == 'male']
+        female = [b for b in manager._fetch_bots() if b['city_normalized'] == city and b['gender'] == 'female']
+        quota = manager.city_tiers[city]
+        active_ids = [b['user_id'] for b in manager.shuffle_bots(male)[:quota] + manager.shuffle_bots(female)[:quota]]
+        with manager.db._connect() as conn:
+            conn.execute("UPDATE profiles SET last_rotation_date = NULL WHERE is_bot = 1")
+            conn.executemany('UPDATE profiles SET last_rotation_date = ? WHERE user_id = ? AND is_bot = 1',
+                             [(date, user_id) for user_id in active_ids])
+            conn.commit()
+
+
+def active_count(db: Database, date: str) -> int:
+    with db._connect() as conn:
+        return conn.execute('SELECT COUNT(*) FROM profiles WHERE is_bot = 1 AND last_rotation_date = ?',
+                            (date,)).fetchone()[0]
+
+
+def main():
+    bots = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print("BOT ROTATION BENCHMARK")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), pool_size=1)
+        try:
+            seed_bots(db, bots)
+            manager = BotRotationManager(db)
+            print(f"Bots: {bots}, rotated cities: {len(manager.rotation_cities)}")
+
+            started = time.perf_counter()
+            legacy_rotation(manager, '2026-01-01')
+            legacy = time.perf_counter() - started
+            print(f"{'per-city loop':<16} {legacy:8.2f}s  ({active_count(db, '2026-01-01')} bots active afterwards)")
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.rotate_all_cities('2026-01-02')
+            bulk = time.perf_counter() - started
+            print(f"{'bulk engine':<16} {bulk:8.2f}s  ({active_count(db, '2026-01-02')} bots active afterwards)")
+
+            print(f"\nSpeedup: {legacy / bulk:.1f}x")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+City resolution throughput: legacy city_mappings lookup vs the indexed resolver
+
+The corpus mixes what users actually type: exact Russian names, Ukrainian
+and Latin spellings, different case and spacing, typos and unknown cities.
+The resolver is measured cold (LRU cleared before every pass) and warm.
+
+Usage: python benchmarks/bench_city_resolver.py [resolutions]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers.city_normalizer_backup import normalize_city_name as legacy_normalize
+from helpers.city_resolver import CITIES, resolve_city, normalize_city
+
+UNKNOWN = ["Berlin", "Paris", "Praha", "Vilnius", "Тбилиси", "Баку", "Riga", "Сочи", "Tula", "Батуми"]
+
+
+def typo(text: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:] if rng.random() < 0.5 else text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def build_corpus(size: int) -> list:
+    rng = random.Random(42)
+    spellings = [s for names in CITIES.values() for s in names]
+    corpus = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.55:
+            text = rng.choice(spellings)
+        elif kind < 0.75:
+            text = rng.choice(spellings).upper() if rng.random() < 0.5 else f"  {rng.choice(spellings).lower()} "
+        elif kind < 0.9:
+            text = typo(rng.choice([s for s in spellings if len(s) > 6]), rng)
+        else:
+            text = rng.choice(UNKNOWN)
+        corpus.append(text)
+    return corpus
+
+
+def run(title: str, func, corpus: list, before=None):
+    if before:
+        before()
+    started = time.perf_counter()
+    for text in corpus:
+        func(text)
+    elapsed = time.perf_counter() - started
+    print(f"{title:<26} {len(corpus) / elapsed:10.0f} resolutions/s")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    corpus = build_corpus(size)
+
+    print("CITY RESOLVER BENCHMARK")
+    print("=" * 50)
+    print(f"Inputs: {size} ({len(set(corpus))} distinct)")
+
+    known = sum(1 for text in corpus if resolve_city(text))
+    legacy_known = sum(1 for text in corpus if legacy_normalize(text) != text.title())
+    print(f"Resolved to a known city: legacy {legacy_known / size:.0%}, resolver {known / size:.0%}")
+
+    run("legacy city_mappings", legacy_normalize, corpus)
+    run("resolver, no LRU", resolve_city.__wrapped__, corpus)
+    run("resolver, LRU from empty", normalize_city, corpus, before=resolve_city.cache_clear)
+    run("resolver, warm LRU", normalize_city, corpus)
+
+
+if __name__ == "__main__":
+    main()
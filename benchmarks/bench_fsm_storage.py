@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+FSM storage latency benchmark: MemoryStorage vs SQLiteStorage at 100k keys
+
+For every key runs update_data followed by get_data and reports per-call
+latency. SQLiteStorage is measured twice: with a warm hot layer and right
+after a restart, when every key is loaded from disk on first access.
+
+Usage: python benchmarks/bench_fsm_storage.py [keys]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database.fsm_storage import SQLiteStorage
+from helpers.swipe_session import SwipeSession
+
+
+def payload(n: int) -> dict:
+    session = SwipeSession()
+    for i in range(10):
+        session.push(n * 10 + i)
+    return {
+        'deck': {'city_normalized': 'Kyiv', 'gender_filter': None, 'who_pays_filter': None, 'exact': False},
+        'swipe': session.pack(),
+    }
+
+
+async def run(storage, keys: list) -> tuple:
+    update_times, get_times = [], []
+    for n, key in enumerate(keys):
+        started = time.perf_counter()
+        await storage.update_data(key, payload(n))
+        update_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await storage.get_data(key)
+        get_times.append(time.perf_counter() - started)
+    return update_times, get_times
+
+
+def report(title: str, update_times: list, get_times: list):
+    def fmt(times):
+        times = sorted(times)
+        p99 = times[int(len(times) * 0.99)]
+        return f"avg {statistics.mean(times) * 1e6:6.1f}us  p99 {p99 * 1e6:6.1f}us"
+    print(f"{title}")
+    print(f"  update_data: {fmt(update_times)}")
+    print(f"  get_data:    {fmt(get_times)}")
+
+
+async def main_async(count: int):
+    keys = [StorageKey(bot_id=1, chat_id=n, user_id=n) for n in range(count)]
+
+    memory = MemoryStorage()
+    report("MemoryStorage", *(await run(memory, keys)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fsm.db')
+
+        sqlite_storage = SQLiteStorage(path)
+        report("SQLiteStorage, cold keys (first write)", *(await run(sqlite_storage, keys)))
+        report("SQLiteStorage, hot layer", *(await run(sqlite_storage, keys)))
+
+        started = time.perf_counter()
+        await sqlite_storage.close()
+        print(f"  final flush of {count} keys on close: {time.perf_counter() - started:.2f}s")
+
+        restarted = SQLiteStorage(path)
+        report("SQLiteStorage after restart (loads from disk)", *(await run(restarted, keys)))
+        await restarted.close()
+        print(f"  database size: {os.path.getsize(path) / 2**20:.1f} MiB")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print("FSM STORAGE LATENCY BENCHMARK")
+    print("=" * 50)
+    print(f"Keys: {count}")
+    asyncio.run(main_async(count))
+
+
+if __name__ == "__main__":
+    main()
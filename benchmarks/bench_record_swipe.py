@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Like throughput benchmark: four separate calls vs Database.record_swipe
+
+The old handle_swipe_action path commits mark_profile_as_viewed, add_like,
+check_mutual_like and create_match separately; record_swipe does the same
+work in one transaction. Every second like completes a mutual pair, so half
+of the swipes create matches. Run with DB_SYNCHRONOUS=FULL to see the fsync
+cost per commit.
+
+Usage: python benchmarks/bench_record_swipe.py [likes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import Database
+
+
+def legacy_like(db: Database, from_id: int, to_id: int):
+    db.mark_profile_as_viewed(from_id, to_id)
+    if db.add_like(from_id, to_id) and db.check_mutual_like(from_id, to_id):
+        db.create_match(from_id, to_id)
+
+
+def record_like(db: Database, from_id: int, to_id: int):
+    db.record_swipe(from_id, to_id, 'like')
+
+
+def run(title: str, like, count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), pool_size=1)
+        try:
+            started = time.perf_counter()
+            for n in range(count // 2):
+                a, b = 2 * n + 1, 2 * n + 2
+                like(db, a, b)
+                like(db, b, a)
+            elapsed = time.perf_counter() - started
+            with db._connect() as conn:
+                matches = conn.execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+        finally:
+            db.close()
+    print(f"{title:<28} {count / elapsed:8.0f} likes/s  ({elapsed * 1e6 / count:6.1f}us per like, {matches} matches)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("LIKE THROUGHPUT BENCHMARK")
+    print("=" * 50)
+    print(f"Likes: {count}, synchronous={os.getenv('DB_SYNCHRONOUS', 'NORMAL')}")
+    run("4 calls, 4 commits", legacy_like, count)
+    run("record_swipe, 1 commit", record_like, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Candidate selection latency vs like history size: NOT IN subqueries vs seen set
+
+For growing numbers of likes made by the swiper, times the former query
+shape (NOT IN over likes and profile_views) against the current
+get_profiles_for_swiping_with_filters, which skips the in-memory seen set.
+
+Usage: python benchmarks/bench_seen_set.py [bots]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import Database
+
+NOT_IN_QUERY = '''
+    SELECT p.* FROM profiles p
+    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
+    WHERE p.user_id != ?
+    AND p.user_id NOT IN (SELECT to_user_id FROM likes WHERE from_user_id = ?)
+    AND p.user_id NOT IN (SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = DATE('now'))
+    AND p.city_normalized IN (?)
+    AND (p.is_bot = 0 OR (p.city_normalized = ? AND p.last_rotation_date = DATE('now')))
+    AND dbo.city_normalized = p.city_normalized
+    AND dbo.date = DATE('now')
+    ORDER BY dbo.order_index
+    LIMIT 30
+'''
+
+
+def timed(func, repeats: int = 50) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - started) / repeats * 1000
+
+
+def main():
+    bots = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    print("SEEN SET BENCHMARK")
+    print("=" * 50)
+    print(f"Bots in city: {bots}, 30 candidates per query")
+    print(f"{'likes':>8} {'NOT IN':>10} {'seen set':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), pool_size=1)
+        try:
+            with db._connect() as conn:
+                conn.executemany('''
+                    INSERT INTO profiles (user_id, name, age, gender, city, city_display, city_normalized,
+                                          favorite_drink, is_bot, last_rotation_date)
+                    VALUES (?, 'Bot', 25, 'female', 'Kyiv', 'Kyiv', 'Kyiv', 'Вино', 1, DATE('now'))
+                ''', [(100 + i,) for i in range(bots)])
+                conn.executemany('''
+                    INSERT INTO daily_bot_order (city_normalized, bot_user_id, order_index, date)
+                    VALUES ('Kyiv', ?, ?, DATE('now'))
+                ''', [(100 + i, i) for i in range(bots)])
+
+            liked = 0
+            for target in (0, 1000, 10000, 100000):
+                with db._connect() as conn:
+                    conn.executemany('INSERT INTO likes (from_user_id, to_user_id) VALUES (1, ?)',
+                                     [(10**7 + i,) for i in range(liked, target)])
+                    # A few real candidates are liked as well
+                    conn.execute('INSERT OR IGNORE INTO likes (from_user_id, to_user_id) VALUES (1, ?)', (100 + target % bots,))
+                liked = target
+                db.seen.invalidate(1)
+
+                def not_in():
+                    with db._connect() as conn:
+                        conn.execute(NOT_IN_QUERY, (1, 1, 1, 'Kyiv', 'Kyiv')).fetchall()
+
+                def seen_set():
+                    db.get_profiles_for_swiping_with_filters(1, city_normalized='Kyiv', limit=30)
+
+                seen_set()  # load the set once, as the first swipe of a session does
+                print(f"{target:>8} {timed(not_in):>8.2f}ms {timed(seen_set):>8.2f}ms")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Swipe card benchmark: Bot API calls per 100 swipes, new message per card vs edit in place
+
+Runs the real dating handlers (find_dating_my_city_start, then like/dislike
+callbacks through the Dispatcher) against a temporary database and a fake
+Bot API session that counts requests by method. "new message" replays the
+old behaviour by never passing the current card to render_card, so every
+card is a sendPhoto; "edit in place" is the current code. Every third swipe
+is a like, whose "someone liked you" ping is a sendMessage in both modes.
+
+Usage: python benchmarks/bench_swipe_cards.py [swipes]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from collections import Counter
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import SendMessage, SendPhoto
+from aiogram.types import Chat, Message, Update, User
+
+import handlers.start as start
+from database.async_db import AsyncDatabase
+from database.models import Database
+from helpers.swipe_card import render_card
+
+class CountingSession(BaseSession):
+    """Bot API stand-in: counts requests and new messages per chat, answers sends with a new message"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self.messages = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, (SendMessage, SendPhoto)):
+            self.messages[method.chat_id] += 1
+            return Message(message_id=sum(self.calls.values()), date=1767225600,
+                           chat=Chat(id=method.chat_id, type='private'))
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def seed(db: Database, candidates: int):
+    """Two swipers plus enough of today's Kyiv bots (the only profiles the deck serves) for every swipe"""
+    for user_id in (1, 2):
+        db.create_profile(user_id, 'Swiper', 30, 'male', 'Kyiv', 'Пиво', photo_id=f'photo-{user_id}')
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, photo_id, is_bot)
+            VALUES (?, ?, 25, ?, 'Kyiv', 'Kyiv', 'Вино', ?, 1)
+        ''', [(1000 + n, f'Candidate {n}', 'female' if n % 2 else 'male', f'photo-{1000 + n}')
+              for n in range(candidates)])
+        conn.commit()
+    db.update_city_config('Kyiv', bots_per_gender=candidates)
+
+
+async def swipe(dp: Dispatcher, bot: Bot, swipes: int, user_id: int) -> tuple:
+    bot.session.calls.clear()
+    chat = {'id': user_id, 'type': 'private'}
+    user = User(id=user_id, is_bot=False, first_name='Swiper')
+    opener = Message(message_id=1, date=1767225600, chat=Chat(**chat), from_user=user, text='🍺')
+    state = dp.fsm.get_context(bot, chat_id=user_id, user_id=user_id)
+    await start.find_dating_my_city_start(opener.as_(bot), state)
+
+    for n in range(swipes):
+        card = (await state.get_data()).get('card') or {'message_id': 1}
+        await dp.feed_update(bot, Update.model_validate({
+            'update_id': n + 1,
+            'callback_query': {
+                'id': str(n), 'chat_instance': 'bench', 'data': 'like' if n % 3 == 0 else 'dislike',
+                'from': {'id': user_id, 'is_bot': False, 'first_name': 'Swiper'},
+                'message': {'message_id': card['message_id'], 'date': 1767225600, 'chat': chat},
+            },
+        }, context={'bot': bot}))
+    return Counter(bot.session.calls), bot.session.messages[user_id]
+
+
+async def run(swipes: int):
+    bot = Bot(token='42:BENCH', session=CountingSession())
+    start.set_bot_instance(bot)
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(start.router)
+
+    async def new_message_per_card(bot, chat_id, card, *args):
+        return await render_card(bot, chat_id, None, *args)
+
+    results = {}
+    start.render_card = new_message_per_card
+    results['new message'] = await swipe(dp, bot, swipes, user_id=1)
+    start.render_card = render_card
+    results['edit in place'] = await swipe(dp, bot, swipes, user_id=2)
+    return results
+
+
+def main():
+    swipes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    print("SWIPE CARD API CALLS BENCHMARK")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        start.db = AsyncDatabase(db)
+        try:
+            seed(db, swipes + 10)
+            results = asyncio.run(run(swipes))
+        finally:
+            db.close()
+
+    for mode, (calls, messages) in results.items():
+        total = sum(calls.values())
+        print(f"\n{mode}: {total} API calls for {swipes} swipes ({total * 100 / swipes:.0f} per 100)")
+        for method, count in calls.most_common():
+            print(f"  {method:<22} {count:6d}")
+        print(f"  new messages in the swiper's chat: {messages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Swipe throughput benchmark: fresh connection per call vs pooled connections
+
+Replays the database calls that handle_swipe_action makes for one "like"
+(view mark, like, mutual check, next card, language lookups) against a
+temporary database.
+
+Usage: python benchmarks/bench_swipe_pool.py [swipes]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import Database
+
+
+class FreshConnectionPool:
+    """Old behaviour: a brand-new connection for every Database call"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def close_all(self):
+        pass
+
+
+def prepare_database(db_path: str, profiles: int) -> Database:
+    db = Database(db_path)
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO profiles (user_id, name, age, gender, city, city_display, city_normalized, favorite_drink)
+            VALUES (?, ?, 25, ?, 'Kyiv', 'Kyiv', 'Kyiv', 'Пиво')
+        ''', [(1000 + i, f"User {i}", 'male' if i % 2 else 'female') for i in range(profiles)])
+    return db
+
+
+def run_swipes(db: Database, swipes: int, profiles: int) -> float:
+    swiper = 1000
+    started = time.perf_counter()
+    for i in range(swipes):
+        target = 1001 + (i % (profiles - 1))
+        db.mark_profile_as_viewed(swiper, target)
+        if db.add_like(swiper, target):
+            if db.check_mutual_like(swiper, target):
+                db.create_match(swiper, target)
+        db.get_profile(target + 1)
+        db.get_user_language(swiper)
+        db.get_user_language(swiper)
+        # Keep likes table small so both runs do the same work
+        if i % (profiles - 1) == profiles - 2:
+            with db._connect() as conn:
+                conn.execute('DELETE FROM likes')
+                conn.execute('DELETE FROM profile_views')
+    return time.perf_counter() - started
+
+
+def main():
+    swipes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    profiles = 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: journal_mode=DELETE, synchronous=FULL, new connection per call
+        legacy_path = os.path.join(tmp, "legacy.db")
+        legacy = prepare_database(legacy_path, profiles)
+        legacy.close()
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        legacy.pool = FreshConnectionPool(legacy_path)
+
+        pooled = prepare_database(os.path.join(tmp, "pooled.db"), profiles)
+
+        print("SWIPE THROUGHPUT BENCHMARK")
+        print("=" * 50)
+        print(f"Swipes: {swipes}, profiles: {profiles}")
+
+        legacy_time = run_swipes(legacy, swipes, profiles)
+        pooled_time = run_swipes(pooled, swipes, profiles)
+        pooled.close()
+
+        print(f"Fresh connection per call: {swipes / legacy_time:8.0f} swipes/s ({legacy_time:.2f}s)")
+        print(f"Pooled connections:        {swipes / pooled_time:8.0f} swipes/s ({pooled_time:.2f}s)")
+        print(f"Speedup: {legacy_time / pooled_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
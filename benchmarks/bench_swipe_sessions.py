@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Swipe session memory benchmark: full profile rows vs packed id sessions
+
+Fills aiogram MemoryStorage with N concurrent swipe sessions the way the
+dating handlers store them and measures the heap with tracemalloc.
+
+- rows: the old ``state.update_data(profiles=[SELECT p.* ...], current_index=...)``
+- packed: deck parameters plus ``SwipeSession.pack()``; card data comes from
+  one shared ProfileCache
+
+Each layout is measured with normal and 4x wider profile rows to show that
+packed sessions stay flat.
+
+Usage: python benchmarks/bench_swipe_sessions.py [sessions]
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import tracemalloc
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from database.profile_cache import ProfileCache
+from helpers.swipe_session import SwipeSession
+
+CANDIDATES = 10     # rows per session in the old layout
+SHOWN = 10          # ids a packed session has already seen
+POPULATION = 2000   # distinct profiles the swipers are looking at
+
+
+def make_row(user_id: int, width: int) -> dict:
+    """One SELECT p.* row, built fresh like sqlite3 does for every fetch"""
+    return {
+        'id': user_id, 'user_id': user_id, 'username': f"user_{user_id}" * width,
+        'name': f"Name {user_id}" * width, 'age': 20 + user_id % 30, 'gender': 'female',
+        'city': 'Kyiv', 'city_display': 'Kyiv', 'city_normalized': 'Kyiv',
+        'favorite_drink': f"Drink {user_id}" * width,
+        'photo_id': f"AgACAgIAAxkBAAI{user_id:010d}" * 3 * width,
+        'who_pays': 'each_self', 'language': 'ru', 'lat': 50.45, 'lon': 30.52, 'is_premium': 0,
+        'created_at': '2024-01-01 12:00:00', 'filter_gender': 'all', 'filter_who_pays': 'any',
+        'is_bot': 1, 'bot_photo_path': f"photos/bot_{user_id}.jpg" * width,
+        'last_rotation_date': '2024-01-01', 'last_activity': None,
+    }
+
+
+def rows_session(n: int, width: int) -> dict:
+    return {
+        'profiles': [make_row((n * 7 + i) % POPULATION, width) for i in range(CANDIDATES)],
+        'current_index': 1,
+    }
+
+
+def packed_session(n: int, width: int) -> dict:
+    session = SwipeSession()
+    for i in range(SHOWN):
+        session.push((n * 7 + i) % POPULATION)
+    return {
+        'deck': {'city_normalized': 'Kyiv', 'gender_filter': 'female', 'who_pays_filter': None, 'exact': False},
+        'swipe': session.pack(),
+    }
+
+
+async def fill_storage(sessions: int, width: int, build) -> MemoryStorage:
+    storage = MemoryStorage()
+    for n in range(sessions):
+        key = StorageKey(bot_id=1, chat_id=n, user_id=n)
+        await storage.set_data(key, build(n, width))
+    return storage
+
+
+def measure(sessions: int, width: int, build, shared_cache: bool) -> float:
+    """Heap bytes per session, shared profile cache included once"""
+    gc.collect()
+    tracemalloc.start()
+    storage = asyncio.run(fill_storage(sessions, width, build))
+    cache = None
+    if shared_cache:
+        cache = ProfileCache(max_entries=POPULATION)
+        for user_id in range(POPULATION):
+            cache.put(user_id, make_row(user_id, width))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del storage, cache
+    return current / sessions
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print("SWIPE SESSION MEMORY BENCHMARK")
+    print("=" * 50)
+    print(f"Sessions: {sessions}, rows per old session: {CANDIDATES}, profile population: {POPULATION}")
+
+    results = {}
+    for width in (1, 4):
+        results[('rows', width)] = measure(sessions, width, rows_session, shared_cache=False)
+        results[('packed', width)] = measure(sessions, width, packed_session, shared_cache=True)
+
+    for width in (1, 4):
+        rows = results[('rows', width)]
+        packed = results[('packed', width)]
+        print(f"Profile width x{width}:")
+        print(f"  Full rows in FSM:     {rows:10.0f} bytes/session ({rows * sessions / 2**20:7.1f} MiB)")
+        print(f"  Packed ids + cache:   {packed:10.0f} bytes/session ({packed * sessions / 2**20:7.1f} MiB)")
+        print(f"  Reduction: {rows / packed:.1f}x")
+
+    growth_rows = results[('rows', 4)] / results[('rows', 1)]
+    growth_packed = results[('packed', 4)] / results[('packed', 1)]
+    print(f"Growth with 4x wider profiles: rows {growth_rows:.2f}x, packed {growth_packed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
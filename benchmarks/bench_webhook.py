@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Update intake benchmark: long polling vs webhook, updates per second
+
+Both modes run the same Dispatcher with a handler that awaits HANDLER_MS
+(stand-in for a database call). Polling reads recorded updates through a
+fake Bot API session that answers getUpdates with up to 100 updates after a
+simulated round trip; webhook mode POSTs the same updates to a local
+WebhookServer over HTTP with Telegram's default 40 parallel connections.
+
+Usage: python benchmarks/bench_webhook.py [updates] [rtt_ms] [handler_ms]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем путь к корню проекта
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe, GetUpdates
+from aiogram.types import Message, Update, User
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+from helpers.webhook import SECRET_HEADER, WebhookServer
+
+CONNECTIONS = 40  # Telegram's default max_connections for webhooks
+
+
+def recorded_updates(count: int) -> list:
+    return [{
+        'update_id': n + 1,
+        'message': {
+            'message_id': n + 1, 'date': 1767225600, 'text': '❤️',
+            'chat': {'id': 1000 + n % 500, 'type': 'private'},
+            'from': {'id': 1000 + n % 500, 'is_bot': False, 'first_name': 'User'},
+        },
+    } for n in range(count)]
+
+
+class RecordedSession(BaseSession):
+    """Bot API stand-in: getUpdates serves recorded updates after a simulated round trip"""
+
+    def __init__(self, updates: list, rtt: float):
+        super().__init__()
+        self.updates = updates
+        self.rtt = rtt
+
+    async def make_request(self, bot, method, timeout=None):
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name='Bench')
+        if isinstance(method, GetUpdates):
+            await asyncio.sleep(self.rtt)
+            start = (method.offset or 1) - 1
+            batch = self.updates[start:start + (method.limit or 100)]
+            return [Update.model_validate(u, context={'bot': bot}) for u in batch]
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def make_dispatcher(total: int, handler_delay: float, done: asyncio.Event) -> Dispatcher:
+    router = Router()
+    handled = [0]
+
+    @router.message()
+    async def handle(message: Message):
+        await asyncio.sleep(handler_delay)
+        handled[0] += 1
+        if handled[0] == total:
+            done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+async def bench_polling(updates: list, rtt: float, handler_delay: float) -> float:
+    done = asyncio.Event()
+    dp = make_dispatcher(len(updates), handler_delay, done)
+    bot = Bot(token='42:BENCH', session=RecordedSession(updates, rtt))
+    started = time.perf_counter()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await dp.stop_polling()
+    await polling
+    return elapsed
+
+
+async def bench_webhook(updates: list, handler_delay: float) -> float:
+    done = asyncio.Event()
+    bot = Bot(token='42:BENCH')
+    server = WebhookServer(make_dispatcher(len(updates), handler_delay, done), bot,
+                           secret_token='bench')
+    http = TestServer(server.make_app())
+    await http.start_server()
+    server.start_feeder()
+    pending = iter(updates)
+
+    async def connection(session: ClientSession):
+        for update in pending:
+            async with session.post(http.make_url('/webhook'), json=update,
+                                    headers={SECRET_HEADER: 'bench'}) as response:
+                assert response.status == 200
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*[connection(session) for _ in range(CONNECTIONS)])
+        await done.wait()
+    elapsed = time.perf_counter() - started
+    await server.stop()
+    await http.close()
+    await bot.session.close()
+    return elapsed
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    handler_delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 5) / 1000
+    updates = recorded_updates(total)
+
+    print("UPDATE INTAKE BENCHMARK")
+    print("=" * 50)
+    print(f"Updates: {total}, getUpdates round trip: {rtt * 1000:.0f} ms, handler: {handler_delay * 1000:.0f} ms")
+
+    polling = asyncio.run(bench_polling(updates, rtt, handler_delay))
+    print(f"{'long polling':<16} {total / polling:8.0f} updates/s  ({polling:.2f}s)")
+    webhook = asyncio.run(bench_webhook(updates, handler_delay))
+    print(f"{'webhook':<16} {total / webhook:8.0f} updates/s  ({webhook:.2f}s)")
+    print(f"\nSpeedup: {polling / webhook:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
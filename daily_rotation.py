@@ -1,6 +1,13 @@
+import os
 import sqlite3
-from datetime import datetime
-import random
+
+from database.bot_order import daily_bot_order
+from database.business_day import BusinessDay
+from database.city_config import load_snapshot
+from database.migrations import run_migrations
+from helpers.city_normalizer import normalize_city_name
+
+BOT_ORDER_SEED = os.getenv("BOT_ORDER_SEED", "drinkbot")
 
 def daily_rotation():
     """Ежедневная ротация ботов - меняет порядок и активных ботов"""
@@ -8,57 +15,23 @@ def daily_rotation():
     conn = sqlite3.connect('drink_bot.db')
     cursor = conn.cursor()
     
-    today = datetime.now().strftime('%Y-%m-%d')
+    # 1. Получаем конфигурацию городов (таблица city_config)
+    run_migrations(conn)
+    snapshot = load_snapshot(conn)
+    city_tiers = snapshot.tiers()
+    days = BusinessDay(snapshot.timezone, default_tz=os.getenv("BUSINESS_TIMEZONE", "Europe/Kyiv"))
+    today = days.today()
     
     print("DAILY BOT ROTATION:")
     print("=" * 50)
     print(f"Date: {today}")
     
-    # 1. Получаем конфигурацию городов
-    city_tiers = {
-        # Tier 1 - Крупнейшие города (15 ботов на гендер)
-        "Москва": 15, "Санкт-Петербург": 15, "Киев": 15, "Минск": 15,
-        
-        # Tier 2 - Большие города (10 ботов на гендер)
-        "Новосибирск": 10, "Екатеринбург": 10, "Ташкент": 10, "Казань": 10,
-        "Харьков": 10, "Нижний Новгород": 10, "Челябинск": 10, "Алматы": 10,
-        "Самара": 10, "Уфа": 10, "Ростов-на-Дону": 10, "Красноярск": 10,
-        "Омск": 10, "Воронеж": 10, "Пермь": 10, "Волгоград": 10,
-        
-        # Tier 3 - Средние города (7 ботов на гендер)
-        "Одесса": 7, "Краснодар": 7, "Днепр": 7, "Саратов": 7, "Донецк": 7,
-        "Тюмень": 7, "Тольятти": 7, "Львов": 7, "Запорожье": 7, "Ижевск": 7,
-        "Барнаул": 7, "Кривой Рог": 7, "Ульяновск": 7, "Иркутск": 7, "Хабаровск": 7,
-        
-        # Tier 4 - Маленькие города (5 ботов на гендер)
-        "Махачкала": 5, "Владивосток": 5, "Ярославль": 5, "Оренбург": 5, "Томск": 5,
-        "Кемерово": 5, "Рязань": 5, "Набережные Челны": 5, "Астана": 5, "Пенза": 5,
-        "Киров": 5, "Липецк": 5, "Чебоксары": 5, "Балашиха": 5, "Николаев": 5
-    }
-    
     # 2. Для каждого города делаем ротацию
     for city, bots_per_gender in city_tiers.items():
         print(f"\nProcessing {city} ({bots_per_gender} per gender)...")
         
         # Нормализуем город
-        city_mappings = {
-            "москва": "Moscow", "киев": "Kyiv", "санкт-петербург": "Saint Petersburg",
-            "минск": "Minsk", "харьков": "Kharkiv", "одесса": "Odesa", "днепр": "Dnipro",
-            "донецк": "Donetsk", "запорожье": "Zaporizhzhia", "львов": "Lviv",
-            "новосибирск": "Novosibirsk", "екатеринбург": "Yekaterinburg", "ташкент": "Tashkent",
-            "казань": "Kazan", "нижний новгород": "Nizhny Novgorod", "челябинск": "Chelyabinsk",
-            "алматы": "Almaty", "самара": "Samara", "уфа": "Ufa", "ростов-на-дону": "Rostov-on-Don",
-            "красноярск": "Krasnoyarsk", "омск": "Omsk", "воронеж": "Voronezh", "пермь": "Perm",
-            "волгоград": "Volgograd", "краснодар": "Krasnodar", "саратов": "Saratov", "тюмень": "Tyumen",
-            "тольятти": "Tolyatti", "барнаул": "Barnaul", "ульяновск": "Ulyanovsk", "иркутск": "Irkutsk",
-            "хабаровск": "Khabarovsk", "махачкала": "Makhachkala", "владивосток": "Vladivostok",
-            "ярославль": "Yaroslavl", "оренбург": "Orenburg", "томск": "Tomsk", "кемерово": "Kemerovo",
-            "рязань": "Ryazan", "набережные челны": "Naberezhnye Chelny", "астана": "Astana",
-            "пенза": "Penza", "киров": "Kirov", "липецк": "Lipetsk", "чебоксары": "Cheboksary",
-            "балашиха": "Balashikha", "николаев": "Mykolaiv"
-        }
-        
-        city_normalized = city_mappings.get(city.lower(), city)
+        city_normalized = normalize_city_name(city)
         
         # Получаем всех ботов для города
         cursor.execute('''
@@ -78,20 +51,14 @@ def daily_rotation():
             print(f"  Skipping {city} - no bots available")
             continue
         
-        # Перемешиваем боты
-        random.shuffle(male_bots)
-        random.shuffle(female_bots)
-        
-        # Выбираем активных ботов
-        active_male = male_bots[:bots_per_gender]
-        active_female = female_bots[:bots_per_gender]
-        
-        # Объединяем и перемешиваем для разнообразия порядка
-        all_active = active_male + active_female
-        random.shuffle(all_active)
+        # День города в его часовом поясе (database/business_day.py)
+        city_day = days.today(city_normalized)
         
-        # Обновляем last_rotation_date для активных ботов
-        active_bot_ids = [bot[0] for bot in all_active]
+        # Тот же детерминированный порядок, что бот считает сам (database/bot_order.py)
+        active_bot_ids = list(daily_bot_order([(b[0], b[2]) for b in all_bots], bots_per_gender,
+                                              city_normalized, city_day, BOT_ORDER_SEED))
+        active_male = [b for b in male_bots if b[0] in active_bot_ids]
+        active_female = [b for b in female_bots if b[0] in active_bot_ids]
         
         # Сначала сбрасываем всем боту в городе last_rotation_date
         cursor.execute('''
@@ -107,17 +74,16 @@ def daily_rotation():
                 UPDATE profiles 
                 SET last_rotation_date = ? 
                 WHERE user_id IN ({placeholders})
-            ''', [today] + active_bot_ids)
+            ''', [city_day] + active_bot_ids)
         
         # Создаем порядок на день
-        cursor.execute('DELETE FROM daily_bot_order WHERE city_normalized = ? AND date = ?', (city_normalized, today))
+        cursor.execute('DELETE FROM daily_bot_order WHERE city_normalized = ? AND date = ?', (city_normalized, city_day))
         
-        for i, bot in enumerate(all_active):
-            user_id, name, gender = bot
+        for i, user_id in enumerate(active_bot_ids):
             cursor.execute('''
                 INSERT INTO daily_bot_order (city_normalized, bot_user_id, order_index, date)
                 VALUES (?, ?, ?, ?)
-            ''', (city_normalized, user_id, i, today))
+            ''', (city_normalized, user_id, i, city_day))
         
         print(f"  Activated: {len(active_male)} male, {len(active_female)} female")
     
@@ -0,0 +1,82 @@
+"""
+Async facade over Database for aiogram handlers
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database.models import Database, db as sync_db
+
+async_db_logger = logging.getLogger('database.async')
+
+
+class AsyncDatabase:
+    """Awaitable mirror of Database.
+
+    ``await async_db.get_profile(user_id)`` runs ``Database.get_profile`` on a
+    bounded thread pool, so a slow query occupies one worker instead of the
+    event loop. Background threads (write-behind flusher, deck refills,
+    outbox, schedulers) borrow from the same connection pool, so the executor
+    leaves ``DB_POOL_RESERVED`` connections to them. A worker only waits for a
+    connection when more background borrowers than that are busy at once.
+    """
+
+    # Helpers that never touch SQLite run inline, no thread hop needed
+    INLINE_METHODS = frozenset({'normalize_city', 'get_icebreaker', 'get_time_remaining'})
+
+    def __init__(self, database: Database, max_workers: int = None):
+        self.db = database
+        self._requested_workers = max_workers
+        self._executor_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Created on first query, so importing the global instance leaves the database alone"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    reserved = int(os.getenv("DB_POOL_RESERVED", "2"))
+                    available = max(1, self.db.pool.size - reserved)
+                    workers = self._requested_workers or int(os.getenv("DB_EXECUTOR_WORKERS", "0")) or available
+                    self.max_workers = min(workers, available)
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db')
+        return self._executor
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        if name in self.INLINE_METHODS:
+            @functools.wraps(attr)
+            async def method(*args, **kwargs):
+                return attr(*args, **kwargs)
+        else:
+            @functools.wraps(attr)
+            async def method(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, functools.partial(attr, *args, **kwargs))
+
+        # Cache the wrapper so the lookup happens once per method
+        setattr(self, name, method)
+        return method
+
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking callable on the database executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        """Wait for running queries, then close pooled connections"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self.db.close()
+        async_db_logger.info("Async database executor stopped")
+
+
+# Global async database instance (wraps the global Database)
+async_db = AsyncDatabase(sync_db)
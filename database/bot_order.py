@@ -0,0 +1,96 @@
+"""
+Daily bot order per city: seeded hash permutation, computed on demand
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def bot_rank(seed: str, city_normalized: str, day: str, user_id: int, salt: str = '') -> int:
+    """Stable pseudo-random rank, the same in every process"""
+    key = f"{seed}|{salt}|{city_normalized}|{day}|{user_id}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'big')
+
+
+def daily_bot_order(bots: Iterable[Tuple[int, str]], bots_per_gender: int, city_normalized: str,
+                    day: str, seed: str) -> Tuple[int, ...]:
+    """Active bot ids of a city for a day, in display order.
+
+    Each gender's bots are ranked by a hash of (seed, city, day, user_id) and
+    the first ``bots_per_gender`` are active; the chosen ones are then ordered
+    by a second hash so men and women are interleaved. Same input, same order.
+    """
+    by_gender: Dict[str, List[int]] = {}
+    for user_id, gender in bots:
+        by_gender.setdefault(gender, []).append(user_id)
+    active = []
+    for gender in ('male', 'female'):
+        ids = by_gender.get(gender, [])
+        ids.sort(key=lambda user_id: bot_rank(seed, city_normalized, day, user_id, 'active'))
+        active.extend(ids[:bots_per_gender])
+    active.sort(key=lambda user_id: bot_rank(seed, city_normalized, day, user_id, 'order'))
+    return tuple(active)
+
+
+class BotOrder:
+    """Memoized (city, day) -> ordered active bot ids.
+
+    ``mode='hash'`` derives the order from ``daily_bot_order()`` over the
+    city's bot roster, so it needs no rotation job and no writes: every
+    process computes the same answer and a missed cron can't leave a city
+    empty. ``mode='table'`` reads the rows scripts wrote to daily_bot_order.
+    """
+
+    def __init__(self, roster_loader: Callable[[str], List[Tuple[int, str]]],
+                 table_loader: Callable[[str, str], List[int]],
+                 quota: Callable[[str], int], seed: str = 'drinkbot', mode: str = 'hash',
+                 max_entries: int = 1024):
+        self.roster_loader = roster_loader
+        self.table_loader = table_loader
+        self.quota = quota
+        self.seed = seed
+        self.mode = mode
+        self.max_entries = max_entries
+        self.computed = 0
+        self._orders = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, city_normalized: str, day: str) -> Tuple[int, ...]:
+        # The quota is part of the key: a hot-reloaded city_config applies at once
+        quota = self.quota(city_normalized) if self.mode == 'hash' else None
+        key = (city_normalized, day, quota)
+        with self._lock:
+            order = self._orders.get(key)
+            if order is not None:
+                self._orders.move_to_end(key)
+                return order
+
+        if self.mode == 'table':
+            order = tuple(self.table_loader(city_normalized, day))
+        else:
+            order = daily_bot_order(self.roster_loader(city_normalized), quota, city_normalized, day, self.seed)
+        with self._lock:
+            self._orders[key] = order
+            self.computed += 1
+            while len(self._orders) > self.max_entries:
+                self._orders.popitem(last=False)
+        return order
+
+    def ranks(self, cities: Iterable[str], day_for: Callable[[str], str]) -> Dict[int, int]:
+        """user_id -> position in its city's order, each city on its own current day"""
+        ranks = {}
+        for city in cities:
+            for index, user_id in enumerate(self.get(city, day_for(city))):
+                ranks.setdefault(user_id, index)
+        return ranks
+
+    def invalidate(self, city_normalized: Optional[str] = None, day: Optional[str] = None):
+        """Forget memoized orders (after bots were added, removed or re-tiered), optionally of one city or (city, day)"""
+        with self._lock:
+            if city_normalized is None:
+                self._orders.clear()
+            else:
+                for key in [k for k in self._orders
+                            if k[0] == city_normalized and (day is None or k[1] == day)]:
+                    del self._orders[key]
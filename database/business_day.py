@@ -0,0 +1,56 @@
+"""
+Business day per city: the 'YYYY-MM-DD' key views, limits, decks and rotation agree on
+"""
+import logging
+import threading
+from datetime import datetime, timezone, tzinfo
+from typing import Callable, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+business_day_logger = logging.getLogger('database.business_day')
+
+
+def utc_today() -> str:
+    """Same value as SQLite DATE('now')"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+
+class BusinessDay:
+    """Day keys computed in each city's own timezone.
+
+    A city's day starts at local midnight in ``timezone_for(city)`` (or
+    ``default_tz``). Keys are computed here once per call and bound into SQL
+    as parameters, never ``DATE('now')``, which is the UTC day and would
+    disagree with Python's local date around midnight.
+    """
+
+    def __init__(self, timezone_for: Callable[[str], Optional[str]], default_tz: str = 'Europe/Kyiv',
+                 clock: Callable[[], datetime] = None):
+        self.timezone_for = timezone_for
+        self.default_tz = default_tz
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self._zones: Dict[str, tzinfo] = {}
+        self._lock = threading.Lock()
+
+    def zone(self, name: Optional[str]) -> tzinfo:
+        """ZoneInfo by name (cached); unknown names fall back to the default zone, then UTC"""
+        name = name or self.default_tz
+        zone = self._zones.get(name)
+        if zone is not None:
+            return zone
+        try:
+            zone = ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            business_day_logger.warning(f"Unknown timezone '{name}', using {self.default_tz}")
+            zone = self.zone(None) if name != self.default_tz else timezone.utc
+        with self._lock:
+            self._zones[name] = zone
+        return zone
+
+    def zone_for(self, city_normalized: Optional[str]) -> tzinfo:
+        return self.zone(self.timezone_for(city_normalized) if city_normalized else None)
+
+    def today(self, city_normalized: Optional[str] = None, now: datetime = None) -> str:
+        """Current day key of a city (default zone when the city is unknown)"""
+        now = now or self.clock()
+        return now.astimezone(self.zone_for(city_normalized)).strftime('%Y-%m-%d')
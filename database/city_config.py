@@ -0,0 +1,145 @@
+"""
+Per-city configuration: rotation tier, bot quota, daily limit, nearby cities, timezone
+"""
+import logging
+import threading
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from helpers.gazetteer import TIMEZONES
+
+city_config_logger = logging.getLogger('database.city_config')
+
+DEFAULT_DAILY_LIMIT = 5
+DEFAULT_BOTS_PER_GENDER = 5
+
+
+class CityConfig(NamedTuple):
+    city_normalized: str
+    tier: Optional[int]
+    bots_per_gender: int
+    daily_limit: int
+    nearby: Tuple[str, ...]
+    timezone: Optional[str] = None
+
+
+class CitySnapshot:
+    """Immutable city lookup built from one read of the city_config table"""
+    __slots__ = ('_cities', 'rotation_cities')
+
+    def __init__(self, rows=()):
+        cities = {}
+        for city, tier, bots_per_gender, daily_limit, nearby, *timezone in rows:
+            neighbours = tuple(name.strip() for name in (nearby or '').split(',') if name.strip())
+            cities[city] = CityConfig(city, tier, bots_per_gender or 0, daily_limit, neighbours,
+                                      timezone[0] if timezone else None)
+        self._cities = MappingProxyType(cities)
+        # Rotated cities in table order (largest tier first)
+        self.rotation_cities: Tuple[str, ...] = tuple(c.city_normalized for c in cities.values() if c.bots_per_gender > 0)
+
+    def get(self, city_normalized: str) -> Optional[CityConfig]:
+        return self._cities.get(city_normalized)
+
+    def daily_limit(self, city_normalized: str) -> int:
+        city = self._cities.get(city_normalized)
+        return city.daily_limit if city else DEFAULT_DAILY_LIMIT
+
+    def bots_per_gender(self, city_normalized: str) -> int:
+        city = self._cities.get(city_normalized)
+        return city.bots_per_gender if city else DEFAULT_BOTS_PER_GENDER
+
+    def nearby(self, city_normalized: str) -> Tuple[str, ...]:
+        city = self._cities.get(city_normalized)
+        return city.nearby if city else ()
+
+    def timezone(self, city_normalized: str) -> Optional[str]:
+        """Configured zone, else the gazetteer's, else None (caller's default)"""
+        city = self._cities.get(city_normalized)
+        if city and city.timezone:
+            return city.timezone
+        return TIMEZONES.get(city_normalized)
+
+    def with_nearby(self, city_normalized: str) -> List[str]:
+        """The city itself followed by its neighbours"""
+        return [city_normalized, *self.nearby(city_normalized)]
+
+    def tiers(self) -> Dict[str, int]:
+        """city_normalized -> bots per gender for every rotated city"""
+        return {city: self._cities[city].bots_per_gender for city in self.rotation_cities}
+
+    def __contains__(self, city_normalized: str) -> bool:
+        return city_normalized in self._cities
+
+    def __len__(self):
+        return len(self._cities)
+
+
+def _read_rows(conn) -> list:
+    return [tuple(row) for row in conn.execute('''
+        SELECT city_normalized, tier, bots_per_gender, daily_limit, nearby, timezone
+        FROM city_config ORDER BY rowid
+    ''')]
+
+
+def load_snapshot(conn) -> CitySnapshot:
+    """Read the whole city_config table into a snapshot (for scripts with a raw connection)"""
+    return CitySnapshot(_read_rows(conn))
+
+
+class CityConfigStore:
+    """Holds the current CitySnapshot and swaps it on reload.
+
+    Readers take ``store.snapshot`` (or the shortcut methods) without locking:
+    ``reload`` builds a complete new snapshot first and then replaces the one
+    reference, so a reader sees either the old config or the new one, never a
+    mix. A failed reload keeps serving the previous snapshot.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.reloads = 0
+        self._rows = None
+        self._reload_lock = threading.Lock()
+        self.snapshot = CitySnapshot()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read city_config, True if the configuration changed"""
+        with self._reload_lock:
+            try:
+                with self.pool.connection() as conn:
+                    rows = _read_rows(conn)
+            except Exception as e:
+                city_config_logger.error(f"City config reload failed, keeping {len(self.snapshot)} cities: {e}")
+                return False
+
+            if rows == self._rows:
+                return False
+            changed = self._rows is not None
+            self.snapshot = CitySnapshot(rows)
+            self._rows = rows
+            self.reloads += 1
+            if changed:
+                city_config_logger.info(f"City config reloaded: {len(rows)} cities")
+            return changed
+
+    def get(self, city_normalized: str) -> Optional[CityConfig]:
+        return self.snapshot.get(city_normalized)
+
+    def daily_limit(self, city_normalized: str) -> int:
+        return self.snapshot.daily_limit(city_normalized)
+
+    def bots_per_gender(self, city_normalized: str) -> int:
+        return self.snapshot.bots_per_gender(city_normalized)
+
+    def nearby(self, city_normalized: str) -> Tuple[str, ...]:
+        return self.snapshot.nearby(city_normalized)
+
+    def timezone(self, city_normalized: str) -> Optional[str]:
+        return self.snapshot.timezone(city_normalized)
+
+    def with_nearby(self, city_normalized: str) -> List[str]:
+        return self.snapshot.with_nearby(city_normalized)
+
+    def tiers(self) -> Dict[str, int]:
+        return self.snapshot.tiers()
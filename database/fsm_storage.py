@@ -0,0 +1,231 @@
+"""
+Persistent aiogram FSM storage on a local SQLite file
+"""
+import asyncio
+import base64
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+fsm_logger = logging.getLogger('database.fsm_storage')
+
+
+def _encode(value):
+    """JSON for bytes values (packed swipe sessions)"""
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"FSM data value of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and '__bytes__' in obj:
+        return base64.b64decode(obj['__bytes__'])
+    return obj
+
+
+def dump_data(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_encode)
+
+
+def load_data(raw) -> dict:
+    return json.loads(raw, object_hook=_decode) if raw else {}
+
+
+class _Record:
+    __slots__ = ('state', 'data', 'updated_at', 'last_access')
+
+    def __init__(self, state: Optional[str] = None, data: Optional[dict] = None, updated_at: float = 0.0):
+        self.state = state
+        self.data = data if data is not None else {}
+        self.updated_at = updated_at
+        self.last_access = time.monotonic()
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage that survives restarts.
+
+    Reads and writes go to an in-memory hot layer (a miss is loaded on a
+    worker thread, data is stored as JSON); dirty keys are written to
+    SQLite in one transaction every ``flush_interval`` seconds (or sooner once
+    ``flush_batch`` keys are dirty), so a burst of ``update_data`` calls on one
+    key costs a single row write. Clean keys idle for ``idle_seconds`` are
+    evicted from memory and reloaded on next access; rows untouched for
+    ``ttl_seconds`` are deleted as abandoned.
+    """
+
+    def __init__(self, path: str = "fsm_state.db", flush_interval: float = 0.5, flush_batch: int = 500,
+                 idle_seconds: float = 600, ttl_seconds: float = 7 * 24 * 3600, cleanup_interval: float = 3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.idle_seconds = idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+
+        self._hot: Dict[str, _Record] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._writer_task = None
+        self._wake = None
+        self._last_evict = time.monotonic()
+        self._last_cleanup = 0.0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS fsm_state (
+                key TEXT PRIMARY KEY,
+                state TEXT,
+                data TEXT,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_fsm_state_updated ON fsm_state (updated_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        business_connection_id = getattr(key, 'business_connection_id', None)
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{business_connection_id or ''}:{key.destiny}"
+
+    def _load(self, key: str) -> _Record:
+        with self._lock:
+            row = self._conn.execute('SELECT state, data, updated_at FROM fsm_state WHERE key = ?', (key,)).fetchone()
+        if row is None or row[2] < time.time() - self.ttl_seconds:
+            return _Record()
+        try:
+            return _Record(row[0], load_data(row[1]), row[2])
+        except ValueError as e:
+            fsm_logger.error(f"Unreadable FSM data for {key}, starting over: {e}")
+            return _Record(row[0], {}, row[2])
+
+    async def _record(self, key: StorageKey):
+        str_key = self._key(key)
+        record = self._hot.get(str_key)
+        if record is None:
+            # Off the event loop: the writer thread may hold the connection lock mid-flush
+            loaded = await asyncio.to_thread(self._load, str_key)
+            record = self._hot.setdefault(str_key, loaded)  # another call may have loaded it meanwhile
+        record.last_access = time.monotonic()
+        return str_key, record
+
+    def _mark_dirty(self, str_key: str, record: _Record):
+        record.updated_at = time.time()
+        self._dirty.add(str_key)
+        if self._writer_task is None:
+            self._wake = asyncio.Event()
+            self._writer_task = asyncio.create_task(self._writer())
+        if len(self._dirty) >= self.flush_batch:
+            self._wake.set()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        str_key, record = await self._record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(str_key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._record(key))[1].state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        str_key, record = await self._record(key)
+        record.data = dict(data)
+        self._mark_dirty(str_key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._record(key))[1].data.copy()
+
+    def _write(self, rows: list, deletes: list):
+        with self._lock:
+            try:
+                self._conn.executemany('''
+                    INSERT INTO fsm_state (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET state = excluded.state, data = excluded.data,
+                                                   updated_at = excluded.updated_at
+                ''', rows)
+                self._conn.executemany('DELETE FROM fsm_state WHERE key = ?', deletes)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+
+    def _snapshot(self):
+        """Serialize dirty keys, return (keys, upsert rows, deleted keys)"""
+        keys, self._dirty = self._dirty, set()
+        rows, deletes = [], []
+        for str_key in keys:
+            record = self._hot.get(str_key)
+            if record is None:
+                continue
+            if record.state is None and not record.data:
+                deletes.append((str_key,))
+            else:
+                try:
+                    rows.append((str_key, record.state, dump_data(record.data), record.updated_at))
+                except TypeError as e:
+                    fsm_logger.error(f"FSM data for {str_key} is not saved: {e}")
+        return keys, rows, deletes
+
+    async def flush(self):
+        """Write all dirty keys in one transaction"""
+        if not self._dirty:
+            return
+        keys, rows, deletes = self._snapshot()
+        try:
+            await asyncio.to_thread(self._write, rows, deletes)
+        except sqlite3.Error as e:
+            fsm_logger.error(f"Error flushing FSM states: {e}")
+            self._dirty |= keys
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        idle = [k for k, record in self._hot.items() if record.last_access < cutoff and k not in self._dirty]
+        for str_key in idle:
+            del self._hot[str_key]
+        if idle:
+            fsm_logger.debug(f"Evicted {len(idle)} idle FSM states from memory")
+
+    def _cleanup_expired(self):
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM fsm_state WHERE updated_at < ?', (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+        if cursor.rowcount:
+            fsm_logger.info(f"Removed {cursor.rowcount} abandoned FSM states")
+
+    async def _writer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                now = time.monotonic()
+                if now - self._last_evict >= min(self.idle_seconds, 60):
+                    self._last_evict = now
+                    self._evict_idle()
+                if now - self._last_cleanup >= self.cleanup_interval:
+                    self._last_cleanup = now
+                    await asyncio.to_thread(self._cleanup_expired)
+            except Exception as e:
+                fsm_logger.error(f"FSM storage writer error: {e}")
+
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        keys, rows, deletes = self._snapshot()
+        self._write(rows, deletes)
+        self._conn.close()
+        fsm_logger.info(f"FSM storage closed, {len(rows)} states flushed")
@@ -0,0 +1,115 @@
+"""
+Nearby-city lookups over the city_geo spatial index
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from helpers.gazetteer import COORDINATES, bounding_box, haversine_km
+
+# k-NN widens the search box until it has enough cities or reaches this radius
+MAX_SEARCH_RADIUS_KM = 2500.0
+
+
+class GeoIndex:
+    """Radius and k-nearest queries for cities, answered from city_geo.
+
+    City coordinates are read into memory once and the offline gazetteer is
+    synced into city_geo on start, so a city added to helpers.gazetteer
+    reaches existing databases too. Each search is one R*Tree box query plus
+    an exact great-circle filter, and results per city are memoized because
+    the index only changes through ``sync`` and ``add``.
+    """
+
+    def __init__(self, pool, radius_km: float = 300.0, max_cities: int = 5,
+                 gazetteer: Dict[str, Tuple[float, float]] = COORDINATES):
+        self.pool = pool
+        self.radius_km = radius_km
+        self.max_cities = max_cities
+        self._lock = threading.Lock()
+        self._nearby: Dict[Tuple[str, float, int], Tuple[str, ...]] = {}
+        with self.pool.connection() as conn:
+            self._coordinates: Dict[str, Tuple[float, float]] = {
+                city: (lat, lon) for city, lat, lon in conn.execute('SELECT city_normalized, lat, lon FROM city_geo')
+            }
+        self.sync(gazetteer)
+
+    def sync(self, gazetteer: Dict[str, Tuple[float, float]]) -> int:
+        """Upsert gazetteer cities that are missing or moved, backfill their profiles' lat/lon; return rows written"""
+        changed = [(city, lat, lon) for city, (lat, lon) in gazetteer.items()
+                   if self._coordinates.get(city) != (lat, lon)]
+        if not changed:
+            return 0
+        with self.pool.connection() as conn:
+            conn.executemany('DELETE FROM city_geo WHERE city_normalized = ?', [(city,) for city, _, _ in changed])
+            conn.executemany('''
+                INSERT INTO city_geo (min_lat, max_lat, min_lon, max_lon, city_normalized, lat, lon)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(lat, lat, lon, lon, city, lat, lon) for city, lat, lon in changed])
+            conn.executemany(
+                'UPDATE profiles SET lat = ?, lon = ? WHERE city_normalized = ? AND lat IS NULL',
+                [(lat, lon, city) for city, lat, lon in changed]
+            )
+            conn.commit()
+        with self._lock:
+            self._coordinates.update((city, (lat, lon)) for city, lat, lon in changed)
+            self._nearby.clear()
+        return len(changed)
+
+    def coordinates(self, city_normalized: str) -> Optional[Tuple[float, float]]:
+        return self._coordinates.get(city_normalized)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[str, float]]:
+        """(city, km) inside the circle, closest first"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        with self.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT city_normalized, lat, lon FROM city_geo
+                WHERE min_lat <= ? AND max_lat >= ? AND min_lon <= ? AND max_lon >= ?
+            ''', (max_lat, min_lat, max_lon, min_lon)).fetchall()
+        found = []
+        for city, city_lat, city_lon in rows:
+            distance = haversine_km(lat, lon, city_lat, city_lon)
+            if distance <= radius_km:
+                found.append((city, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[str, float]]:
+        """k closest cities to a point (e.g. a shared location)"""
+        radius = 50.0
+        while True:
+            found = self.within(lat, lon, radius)
+            if len(found) >= k or radius >= MAX_SEARCH_RADIUS_KM:
+                return found[:k]
+            radius *= 2
+
+    def nearby(self, city_normalized: str, radius_km: float = None, limit: int = None) -> Tuple[str, ...]:
+        """Neighbouring cities within radius_km, closest first, the city itself excluded"""
+        radius_km = radius_km or self.radius_km
+        limit = limit or self.max_cities
+        key = (city_normalized, radius_km, limit)
+        cached = self._nearby.get(key)
+        if cached is not None:
+            return cached
+
+        point = self._coordinates.get(city_normalized)
+        if point is None:
+            result = ()
+        else:
+            result = tuple(city for city, _ in self.within(*point, radius_km) if city != city_normalized)[:limit]
+        with self._lock:
+            self._nearby[key] = result
+        return result
+
+    def add(self, city_normalized: str, lat: float, lon: float):
+        """Put a city (e.g. a geocoded one) into the index"""
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM city_geo WHERE city_normalized = ?', (city_normalized,))
+            conn.execute('''
+                INSERT INTO city_geo (min_lat, max_lat, min_lon, max_lon, city_normalized, lat, lon)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (lat, lat, lon, lon, city_normalized, lat, lon))
+            conn.commit()
+        with self._lock:
+            self._coordinates[city_normalized] = (lat, lon)
+            self._nearby.clear()
@@ -0,0 +1,197 @@
+"""
+Geocoding service: offline gazetteer and persistent cache first, network in the background
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from helpers.city_resolver import fold, normalize_city, resolve_city
+
+geocoding_logger = logging.getLogger('database.geocoding')
+
+
+class GeocodeResult(NamedTuple):
+    city_normalized: str
+    lat: Optional[float]
+    lon: Optional[float]
+    found: bool
+    source: str  # 'index' (gazetteer / geocoded before), 'cache' or the backend name
+
+
+class NominatimGeocoder:
+    """OpenStreetMap Nominatim via geopy, created on first use (never at import)"""
+    name = 'nominatim'
+
+    def __init__(self, user_agent: str = "drink_bot", timeout: float = 5.0):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._geolocator = None
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """Blocking HTTP call, run it off the event loop"""
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(user_agent=self.user_agent)
+        location = self._geolocator.geocode(query, timeout=self.timeout)
+        return (location.latitude, location.longitude) if location else None
+
+
+class LocalGeocoder:
+    """Stand-in geocoder for tests and offline runs: gazetteer plus optional extra places"""
+    name = 'local'
+
+    def __init__(self, places: Dict[str, Tuple[float, float]] = None, delay: float = 0.0):
+        from helpers.gazetteer import COORDINATES
+        self._coordinates = COORDINATES
+        self.places = {fold(name): point for name, point in (places or {}).items()}
+        self.delay = delay
+        self.calls = 0
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        city = resolve_city(query)
+        if city in self._coordinates:
+            return self._coordinates[city]
+        return self.places.get(fold(query))
+
+
+def make_geocoder(name: str = "nominatim"):
+    """Backend by GEOCODER setting: 'nominatim' (network) or 'local' (no network)"""
+    if name == 'local':
+        return LocalGeocoder()
+    return NominatimGeocoder()
+
+
+class GeocodingService:
+    """City -> coordinates without ever blocking a handler on HTTP.
+
+    ``lookup`` is offline only: known cities come from the gazetteer (GeoIndex),
+    everything looked up before from the ``geocode_cache`` table, including
+    negative answers (retried after ``negative_ttl_days``). ``geocode`` adds the
+    network backend on a miss: concurrent requests for the same city share one
+    call, calls are spaced at least ``min_interval`` seconds apart (Nominatim
+    allows one per second) and each runs in a worker thread. ``schedule`` fires
+    ``geocode`` as a background task so handlers don't wait for it.
+    """
+
+    def __init__(self, pool, geo_index, backend=None, min_interval: float = 1.0,
+                 timeout: float = 10.0, negative_ttl_days: int = 7):
+        self.pool = pool
+        self.geo = geo_index
+        self.backend = backend or NominatimGeocoder()
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.negative_ttl_days = negative_ttl_days
+        self.network_calls = 0
+        self.network_errors = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        self._rate_lock = None
+        self._rate_loop = None
+        self._last_call = 0.0
+
+    def lookup(self, query: str) -> Optional[GeocodeResult]:
+        """Offline answer, or None if the city was never geocoded"""
+        key = fold(query or '')
+        if not key:
+            return None
+        city = normalize_city(query)
+        point = self.geo.coordinates(city)
+        if point is not None:
+            return GeocodeResult(city, point[0], point[1], True, 'index')
+
+        with self.pool.connection() as conn:
+            row = conn.execute('''
+                SELECT city_normalized, lat, lon, found, updated_at < DATETIME('now', ?)
+                FROM geocode_cache WHERE query_key = ?
+            ''', (f'-{self.negative_ttl_days} days', key)).fetchone()
+        if row is None:
+            return None
+        city, lat, lon, found, expired = row
+        if not found and expired:
+            return None  # stale "not found", worth asking again
+        return GeocodeResult(city, lat, lon, bool(found), 'cache')
+
+    def store(self, query: str, result: GeocodeResult):
+        """Persist a network answer and index found cities for nearby search"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO geocode_cache (query_key, city_normalized, lat, lon, found, source, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(query_key) DO UPDATE SET
+                    city_normalized = excluded.city_normalized, lat = excluded.lat, lon = excluded.lon,
+                    found = excluded.found, source = excluded.source, updated_at = excluded.updated_at
+            ''', (fold(query), result.city_normalized, result.lat, result.lon, int(result.found), result.source))
+            conn.commit()
+        if result.found and self.geo.coordinates(result.city_normalized) is None:
+            self.geo.add(result.city_normalized, result.lat, result.lon)
+
+    async def geocode(self, query: str) -> Optional[GeocodeResult]:
+        """Offline lookup, then one shared, rate-limited network call on a miss"""
+        cached = await asyncio.to_thread(self.lookup, query)
+        if cached is not None:
+            return cached
+
+        key = fold(query)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._fetch(query)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters get it, don't warn when nobody waited
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _fetch(self, query: str) -> Optional[GeocodeResult]:
+        loop = asyncio.get_running_loop()
+        if self._rate_loop is not loop:
+            self._rate_lock, self._rate_loop = asyncio.Lock(), loop
+        async with self._rate_lock:
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                self.network_calls += 1
+                point = await asyncio.wait_for(asyncio.to_thread(self.backend.geocode, query), self.timeout)
+            except Exception as e:
+                # Timeouts and service errors are not cached, the next request retries
+                self.network_errors += 1
+                geocoding_logger.warning(f"Geocoding '{query}' failed: {e}")
+                return None
+            finally:
+                self._last_call = time.monotonic()
+
+        city = normalize_city(query)
+        if point is None:
+            result = GeocodeResult(city, None, None, False, self.backend.name)
+        else:
+            result = GeocodeResult(city, point[0], point[1], True, self.backend.name)
+        await asyncio.to_thread(self.store, query, result)
+        return result
+
+    def schedule(self, query: str):
+        """Geocode in the background (call from a running event loop)"""
+        task = asyncio.get_running_loop().create_task(self.geocode(query))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            geocoding_logger.error(f"Background geocoding failed: {task.exception()}")
+
+    async def drain(self):
+        """Wait for scheduled background lookups (shutdown, tests)"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -0,0 +1,62 @@
+"""
+In-process user_id -> language map
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+DEFAULT_LANGUAGE = 'ru'
+
+
+class LanguageResolver:
+    """Lazily filled LRU map of user languages.
+
+    A miss runs ``loader(user_id)`` once (a single SQL lookup) and remembers the
+    result; Database writes keep entries current via ``set``/``invalidate``, so
+    hot users never hit SQLite for their language again.
+    """
+
+    def __init__(self, loader: Callable[[int], str], max_entries: int = 100000):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._languages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def peek(self, user_id: int) -> Optional[str]:
+        """Cached language or None, never touches the database"""
+        with self._lock:
+            language = self._languages.get(user_id)
+            if language is not None:
+                self._languages.move_to_end(user_id)
+                self.hits += 1
+            return language
+
+    def get(self, user_id: int) -> str:
+        language = self.peek(user_id)
+        if language is not None:
+            return language
+        with self._lock:
+            self.misses += 1
+        language = self.loader(user_id) or DEFAULT_LANGUAGE
+        self.set(user_id, language)
+        return language
+
+    def set(self, user_id: int, language: str):
+        with self._lock:
+            self._languages[user_id] = language
+            self._languages.move_to_end(user_id)
+            while len(self._languages) > self.max_entries:
+                self._languages.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._languages.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._languages.clear()
+
+    def __len__(self):
+        return len(self._languages)
@@ -0,0 +1,504 @@
+"""
+Versioned schema migrations for drink_bot.db
+
+Every table and index the bot relies on is created here. Applied steps are
+recorded in ``schema_version``; on a warm start the only query is a single
+version read. Migrations only ever add tables, columns and indexes - they
+never drop or rewrite user data.
+"""
+import logging
+import sqlite3
+from datetime import datetime, timedelta
+
+from helpers.city_normalizer import normalize_city_name
+from helpers.gazetteer import TIMEZONES
+
+migrations_logger = logging.getLogger('database.migrations')
+
+
+def _columns(cursor, table: str) -> set:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {column[1] for column in cursor.fetchall()}
+
+
+def _add_columns(cursor, table: str, columns: list):
+    """Add (name, ddl) columns that older databases don't have yet"""
+    existing = _columns(cursor, table)
+    added = []
+    for name, ddl in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+            added.append(name)
+    if added:
+        migrations_logger.info(f"Added columns to {table}: {added}")
+    return added
+
+
+def _core_tables(cursor):
+    """Tables the bot has always created on startup"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER UNIQUE NOT NULL,
+            username TEXT,
+            name TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            gender TEXT NOT NULL DEFAULT('other') CHECK(gender IN ('male', 'female', 'other')),
+            city TEXT NOT NULL,
+            city_display TEXT,
+            city_normalized TEXT,
+            favorite_drink TEXT NOT NULL,
+            photo_id TEXT,
+            who_pays TEXT NOT NULL DEFAULT('each_self') CHECK(who_pays IN ('each_self', 'i_treat', 'someone_treats')),
+            language TEXT NOT NULL DEFAULT('ru') CHECK(language IN ('ru', 'ua', 'en')),
+            lat REAL,
+            lon REAL,
+            is_premium INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS likes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            from_user_id INTEGER NOT NULL,
+            to_user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(from_user_id, to_user_id),
+            FOREIGN KEY (from_user_id) REFERENCES profiles (user_id),
+            FOREIGN KEY (to_user_id) REFERENCES profiles (user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            place TEXT NOT NULL,
+            price_type TEXT NOT NULL CHECK(price_type IN ('free', 'paid')),
+            description TEXT NOT NULL,
+            city TEXT NOT NULL,
+            city_normalized TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            status TEXT NOT NULL DEFAULT('active') CHECK(status IN ('active', 'expired', 'cancelled')),
+            FOREIGN KEY (creator_id) REFERENCES profiles (user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS event_participants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(event_id, user_id),
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (user_id) REFERENCES profiles (user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user1_id INTEGER NOT NULL,
+            user2_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user1_id, user2_id),
+            FOREIGN KEY (user1_id) REFERENCES profiles (user_id),
+            FOREIGN KEY (user2_id) REFERENCES profiles (user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS companies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            creator_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            interests TEXT NOT NULL,
+            meeting_place TEXT NOT NULL,
+            max_members INTEGER NOT NULL DEFAULT 10,
+            city TEXT NOT NULL,
+            city_normalized TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT('active') CHECK(status IN ('active', 'full', 'cancelled')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (creator_id) REFERENCES profiles (user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS company_members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(company_id, user_id),
+            FOREIGN KEY (company_id) REFERENCES companies (id),
+            FOREIGN KEY (user_id) REFERENCES profiles (user_id)
+        )
+    ''')
+
+
+def _profile_columns(cursor):
+    """Columns added to profiles over time by startup code and fix scripts"""
+    _add_columns(cursor, 'profiles', [
+        ('username', 'TEXT'),
+        ('language', "TEXT NOT NULL DEFAULT('ru') CHECK(language IN ('ru', 'ua', 'en'))"),
+        ('who_pays', "TEXT NOT NULL DEFAULT('each_self') CHECK(who_pays IN ('each_self', 'i_treat', 'someone_treats'))"),
+        ('city_display', 'TEXT'),
+        ('city_normalized', 'TEXT'),
+        ('lat', 'REAL'),
+        ('lon', 'REAL'),
+        ('is_premium', 'INTEGER DEFAULT 0'),
+        ('gender', "TEXT NOT NULL DEFAULT('other') CHECK(gender IN ('male', 'female', 'other'))"),
+        ('is_bot', 'INTEGER DEFAULT 0'),
+        ('bot_photo_path', 'TEXT'),
+        ('last_rotation_date', 'TEXT'),
+        ('filter_gender', "TEXT DEFAULT 'all'"),
+        ('filter_who_pays', "TEXT DEFAULT 'any'"),
+        ('last_activity', 'TIMESTAMP'),
+    ])
+
+
+def _event_columns(cursor):
+    """Columns added to events after the first release"""
+    added = _add_columns(cursor, 'events', [
+        ('city_normalized', 'TEXT'),
+        ('expires_at', 'TIMESTAMP'),
+        ('status', "TEXT DEFAULT 'active'"),
+    ])
+
+    if 'city_normalized' in added:
+        # Update existing events with normalized city names
+        cursor.execute('SELECT id, city FROM events')
+        events = cursor.fetchall()
+        cursor.executemany(
+            'UPDATE events SET city_normalized = ? WHERE id = ?',
+            [(normalize_city_name(city), event_id) for event_id, city in events if city]
+        )
+        migrations_logger.info(f"Updated {len(events)} existing events with normalized city names")
+
+    if 'expires_at' in added:
+        # Existing events get 4 hours from now
+        future_time = datetime.now() + timedelta(hours=4)
+        cursor.execute('UPDATE events SET expires_at = ?', (future_time.isoformat(' '),))
+
+    if 'status' in added:
+        cursor.execute("UPDATE events SET status = 'active' WHERE status IS NULL")
+
+
+def _script_tables(cursor):
+    """Tables that used to be created only by setup scripts"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profile_views (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            profile_id INTEGER NOT NULL,
+            view_date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, profile_id, view_date)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_bot_order (
+            city_normalized TEXT,
+            bot_user_id INTEGER,
+            order_index INTEGER,
+            date TEXT,
+            PRIMARY KEY (city_normalized, bot_user_id, date)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_bot_order_lookup
+        ON daily_bot_order (city_normalized, date, order_index)
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_bot_limits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            city_normalized TEXT NOT NULL,
+            date TEXT NOT NULL,
+            bots_shown INTEGER DEFAULT 0,
+            daily_limit INTEGER DEFAULT 5,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, city_normalized, date)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_settings (
+            user_id INTEGER PRIMARY KEY,
+            language TEXT DEFAULT 'ru',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            notification_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_sent BOOLEAN DEFAULT FALSE,
+            UNIQUE(user_id, notification_type, sent_at)
+        )
+    ''')
+
+
+def _hot_query_indexes(cursor):
+    """Covering indexes for swipe, likes, views, bot order and event lookups"""
+    # Swipe candidates: city first, then bot/rotation flags and premium filters
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_profiles_city_bot_filters
+        ON profiles (city_normalized, is_bot, last_rotation_date, gender, who_pays)
+    ''')
+    # likes(from_user_id, to_user_id) is already covered by its UNIQUE index
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_likes_to_from
+        ON likes (to_user_id, from_user_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_profile_views_user_date
+        ON profile_views (user_id, view_date, profile_id)
+    ''')
+    # Same key as idx_daily_bot_order_lookup plus bot_user_id, so the join never touches the table
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_bot_order_covering
+        ON daily_bot_order (city_normalized, date, order_index, bot_user_id)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_daily_bot_order_lookup')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_bot_limits_city
+        ON daily_bot_limits (city_normalized, created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_city_status_expires
+        ON events (city_normalized, status, expires_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_creator
+        ON events (creator_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_event_participants_user
+        ON event_participants (user_id, event_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_matches_user2
+        ON matches (user2_id, user1_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_companies_city_status
+        ON companies (city_normalized, status)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_company_members_user
+        ON company_members (user_id, company_id)
+    ''')
+
+
+# (city_normalized, rotation tier, bots per gender, daily bot limit, nearby cities)
+# Values the bot shipped with; tune the table afterwards, not this list
+_CITY_CONFIG_SEED = [
+    ("Moscow", 1, 15, 15, "Saint Petersburg,Nizhny Novgorod,Kazan"),
+    ("Saint Petersburg", 1, 15, 12, "Moscow,Helsinki,Tallinn"),
+    ("Kyiv", 1, 15, 15, "Kharkiv,Odesa,Lviv,Dnipro"),
+    ("Minsk", 1, 15, 12, ""),
+    ("Novosibirsk", 2, 10, 10, ""), ("Yekaterinburg", 2, 10, 10, ""),
+    ("Tashkent", 2, 10, 10, ""), ("Kazan", 2, 10, 10, ""),
+    ("Kharkiv", 2, 10, 10, "Kyiv,Poltava,Sumy"), ("Nizhny Novgorod", 2, 10, 10, ""),
+    ("Chelyabinsk", 2, 10, 10, ""), ("Almaty", 2, 10, 10, ""),
+    ("Samara", 2, 10, 10, ""), ("Ufa", 2, 10, 10, ""),
+    ("Rostov-on-Don", 2, 10, 10, ""), ("Krasnoyarsk", 2, 10, 10, ""),
+    ("Omsk", 2, 10, 10, ""), ("Voronezh", 2, 10, 10, ""),
+    ("Perm", 2, 10, 10, ""), ("Volgograd", 2, 10, 10, ""),
+    ("Odesa", 3, 7, 8, "Kyiv,Mykolaiv,Kherson"), ("Krasnodar", 3, 7, 8, ""),
+    ("Dnipro", 3, 7, 8, "Kyiv,Zaporizhzhia,Kryvyi Rih"), ("Saratov", 3, 7, 8, ""),
+    ("Donetsk", 3, 7, 8, ""), ("Tyumen", 3, 7, 8, ""),
+    ("Tolyatti", 3, 7, 8, ""), ("Lviv", 3, 7, 8, "Kyiv,Ivano-Frankivsk,Ternopil"),
+    ("Zaporizhzhia", 3, 7, 8, ""), ("Izhevsk", 3, 7, 8, ""),
+    ("Barnaul", 3, 7, 8, ""), ("Kryvyi Rih", 3, 7, 5, ""),
+    ("Ulyanovsk", 3, 7, 8, ""), ("Irkutsk", 3, 7, 8, ""),
+    ("Khabarovsk", 3, 7, 8, ""),
+    ("Makhachkala", 4, 5, 8, ""), ("Vladivostok", 4, 5, 8, ""),
+    ("Yaroslavl", 4, 5, 8, ""), ("Orenburg", 4, 5, 8, ""),
+    ("Tomsk", 4, 5, 8, ""), ("Kemerovo", 4, 5, 8, ""),
+    ("Ryazan", 4, 5, 8, ""), ("Naberezhnye Chelny", 4, 5, 8, ""),
+    ("Astana", 4, 5, 8, ""), ("Penza", 4, 5, 8, ""),
+    ("Kirov", 4, 5, 8, ""), ("Lipetsk", 4, 5, 8, ""),
+    ("Cheboksary", 4, 5, 8, ""), ("Balashikha", 4, 5, 8, ""),
+    ("Mykolaiv", 4, 5, 8, ""),
+    # Not rotated, only searched together with their neighbours
+    ("Warsaw", None, 0, 5, "Krakow,Lodz,Wroclaw"),
+    ("Krakow", None, 0, 5, "Warsaw,Katowice,Gdansk"),
+]
+
+
+def _city_config(cursor):
+    """Per-city rotation tier, bot quota, daily limit and nearby cities"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS city_config (
+            city_normalized TEXT PRIMARY KEY,
+            tier INTEGER,
+            bots_per_gender INTEGER NOT NULL DEFAULT 0,
+            daily_limit INTEGER NOT NULL DEFAULT 5,
+            nearby TEXT NOT NULL DEFAULT '',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.executemany('''
+        INSERT OR IGNORE INTO city_config (city_normalized, tier, bots_per_gender, daily_limit, nearby)
+        VALUES (?, ?, ?, ?, ?)
+    ''', _CITY_CONFIG_SEED)
+
+
+def _city_geo(cursor):
+    """Spatial index of city coordinates; rows come from GeoIndex.sync, so gazetteer additions reach old databases"""
+    try:
+        # R*Tree: radius queries touch only the boxes that overlap the search box
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS city_geo USING rtree(
+                id, min_lat, max_lat, min_lon, max_lon,
+                +city_normalized TEXT, +lat REAL, +lon REAL
+            )
+        ''')
+    except sqlite3.OperationalError:
+        # SQLite built without RTREE: same columns, plain index on the box
+        migrations_logger.warning("SQLite has no RTREE module, city_geo uses a regular index")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS city_geo (
+                id INTEGER PRIMARY KEY,
+                min_lat REAL, max_lat REAL, min_lon REAL, max_lon REAL,
+                city_normalized TEXT, lat REAL, lon REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_city_geo_box ON city_geo (min_lat, min_lon)')
+
+
+def _geocode_cache(cursor):
+    """Answers of the network geocoder, so each place is looked up once"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            query_key TEXT PRIMARY KEY,
+            city_normalized TEXT NOT NULL,
+            lat REAL,
+            lon REAL,
+            found INTEGER NOT NULL,
+            source TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _rotation_runs(cursor):
+    """One row per (city, day) rotation, claimed by the instance that runs it"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rotation_runs (
+            city_normalized TEXT NOT NULL,
+            date TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            bots INTEGER,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            duration_ms INTEGER,
+            PRIMARY KEY (city_normalized, date)
+        )
+    ''')
+
+
+def _city_timezones(cursor):
+    """Timezone of each configured city, its business day starts at local midnight"""
+    _add_columns(cursor, 'city_config', [('timezone', 'TEXT')])
+    cursor.executemany('UPDATE city_config SET timezone = ? WHERE city_normalized = ? AND timezone IS NULL',
+                       [(zone, city) for city, zone in TIMEZONES.items()])
+
+
+def _outbox(cursor):
+    """Notifications waiting for delivery, kept across restarts"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            priority INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            coalesce_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            not_before REAL NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _match_page_indexes(cursor):
+    """A user's matches in id order from either side, so a page reads only its own rows"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_matches_user1_page
+        ON matches (user1_id, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_matches_user2_page
+        ON matches (user2_id, id)
+    ''')
+
+
+# (version, description, step) - append only, never edit an applied step
+MIGRATIONS = [
+    (1, "core tables", _core_tables),
+    (2, "profiles columns added since first release", _profile_columns),
+    (3, "events city_normalized, expires_at, status", _event_columns),
+    (4, "profile_views, daily_bot_order, daily_bot_limits, user_settings, user_notifications", _script_tables),
+    (5, "covering indexes for hot queries", _hot_query_indexes),
+    (6, "city_config: tiers, daily limits, nearby cities", _city_config),
+    (7, "city_geo spatial index, profiles lat/lon backfill", _city_geo),
+    (8, "geocode_cache", _geocode_cache),
+    (9, "rotation_runs", _rotation_runs),
+    (10, "city_config timezone", _city_timezones),
+    (11, "outbox", _outbox),
+    (12, "matches keyset indexes", _match_page_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Current schema version (0 for databases that predate migrations)"""
+    try:
+        row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def run_migrations(conn) -> int:
+    """Apply pending migrations in one transaction, return how many ran"""
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return 0
+
+    # Take the write lock first so two starting processes don't both migrate
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        current = get_schema_version(conn)
+        pending = [m for m in MIGRATIONS if m[0] > current]
+
+        for version, description, step in pending:
+            migrations_logger.info(f"Applying migration {version}: {description}")
+            step(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        migrations_logger.exception("Schema migration failed, database left unchanged")
+        raise
+
+    if pending:
+        migrations_logger.info(f"Schema migrated from version {current} to {LATEST_VERSION}")
+    return len(pending)
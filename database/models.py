@@ -1,23 +1,95 @@
 import sqlite3
 import os
+import atexit
+import threading
 import random
 import logging
-from typing import Optional, List, Dict, Any
-from datetime import datetime
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from typing import Optional, List, Dict, Any, Tuple
+from enum import Enum
 from helpers.city_normalizer import normalize_city_name, smart_city_to_english
+from database.pool import ConnectionPool
+from database.migrations import run_migrations
+from database.swipe_deck import SwipeDeck
+from database.profile_cache import MISSING, ProfileCache
+from database.language_resolver import LanguageResolver
+from database.write_behind import WriteBehindQueue
+from database.seen_set import SeenSets
+from database.city_config import CityConfigStore
+from database.geo_index import GeoIndex
+from database.geocoding import GeocodingService, make_geocoder
+from database.bot_order import BotOrder
+from database.business_day import BusinessDay
 
 # Create logger for database operations
 db_logger = logging.getLogger('database')
 
+class SwipeOutcome(str, Enum):
+    """Result of Database.record_swipe"""
+    VIEWED = 'viewed'        # dislike recorded
+    LIKED = 'liked'          # new one-sided like
+    MATCHED = 'matched'      # new like completed a mutual pair
+    DUPLICATE = 'duplicate'  # same swipe was already recorded
+
 class Database:
-    def __init__(self, db_path: str = "drink_bot.db"):
+    def __init__(self, db_path: str = "drink_bot.db", pool_size: int = None):
         self.db_path = db_path
-        self.geolocator = Nominatim(user_agent="drink_bot")
-        self.recreate_db_if_needed()
+        self.pool = ConnectionPool(
+            db_path,
+            size=pool_size or int(os.getenv("DB_POOL_SIZE", "7")),
+            cache_size_kb=int(os.getenv("DB_CACHE_SIZE_KB", "8192")),
+            synchronous=os.getenv("DB_SYNCHRONOUS", "NORMAL"),
+        )
         self.init_db()
-    
+        self.city_config = CityConfigStore(self.pool)
+        # Day keys in each city's timezone, shared by views, limits, decks and rotation
+        self.days = BusinessDay(self.city_config.timezone, default_tz=os.getenv("BUSINESS_TIMEZONE", "Europe/Kyiv"))
+        self.geo = GeoIndex(
+            self.pool,
+            radius_km=float(os.getenv("NEARBY_RADIUS_KM", "300")),
+            max_cities=int(os.getenv("NEARBY_MAX_CITIES", "5")),
+        )
+        # Network geocoding only ever runs in background tasks, see GeocodingService
+        self.geocoder = GeocodingService(
+            self.pool, self.geo,
+            backend=make_geocoder(os.getenv("GEOCODER", "nominatim")),
+            min_interval=float(os.getenv("GEOCODER_MIN_INTERVAL", "1.0")),
+        )
+        # Today's active bots per city, derived on demand instead of a nightly table rebuild
+        self.bot_order = BotOrder(
+            self._load_bot_roster, self._load_bot_order_table, self.city_config.bots_per_gender,
+            seed=os.getenv("BOT_ORDER_SEED", "drinkbot"),
+            mode=os.getenv("BOT_ORDER_MODE", "hash"),
+        )
+        self.write_behind = WriteBehindQueue(
+            self.pool,
+            flush_interval=float(os.getenv("WRITE_BEHIND_INTERVAL", "0.5")),
+            max_pending=int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000")),
+        )
+        # Scripts often exit without close(), buffered view marks must still land
+        atexit.register(self.write_behind.close)
+        self.seen = SeenSets(self._load_seen, max_users=int(os.getenv("SEEN_SET_USERS", "10000")),
+                             day_for=self.user_day)
+        self.swipe_deck = SwipeDeck(self, batch_size=int(os.getenv("SWIPE_DECK_BATCH", "30")))
+        self.profile_cache = ProfileCache(
+            max_entries=int(os.getenv("PROFILE_CACHE_SIZE", "5000")),
+            ttl_seconds=float(os.getenv("PROFILE_CACHE_TTL", "300")),
+            max_bytes=int(os.getenv("PROFILE_CACHE_MAX_MB", "16")) * 2**20,
+        )
+        self.languages = LanguageResolver(
+            self._load_user_language,
+            max_entries=int(os.getenv("LANGUAGE_CACHE_SIZE", "100000")),
+        )
+
+    def _connect(self):
+        """Borrow a pooled connection (use as a context manager)"""
+        return self.pool.connection()
+
+    def close(self):
+        """Drain buffered writes, stop deck refills and close all pooled connections"""
+        self.write_behind.close()
+        self.swipe_deck.close()
+        self.pool.close_all()
+
     def _log_query(self, query: str, params: tuple = None, user_id: int = None, step: str = None):
         """Log database query with details"""
         try:
@@ -52,272 +124,94 @@ class Database:
         """Normalize city name using unified function"""
         return normalize_city_name(city_text)
     
-    def recreate_db_if_needed(self):
-        """Check if all required columns exist, recreate DB if needed"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Check if profiles table exists
-                cursor.execute("""
-                    SELECT name FROM sqlite_master 
-                    WHERE type='table' AND name='profiles'
-                """)
-                table_exists = cursor.fetchone()
-                
-                if not table_exists:
-                    # Table doesn't exist, will be created by init_db
-                    print("Profiles table doesn't exist, will be created")
-                    return
-                
-                # Check if all required columns exist
-                cursor.execute("PRAGMA table_info(profiles)")
-                columns = [column[1] for column in cursor.fetchall()]
-                
-                required_columns = ['language', 'is_premium', 'lat', 'lon', 'who_pays', 'city_display', 'city_normalized']
-                missing_columns = [col for col in required_columns if col not in columns]
-                
-                if missing_columns:
-                    logging.warning(f"Missing columns detected: {missing_columns}")
-                    logging.info("Recreating database with correct structure...")
-                    
-                    # Close connection and delete database file
-                    conn.close()
-                    
-                    # Delete old database file
-                    if os.path.exists(self.db_path):
-                        os.remove(self.db_path)
-                        logging.info(f"Deleted old database file: {self.db_path}")
-                    
-                    logging.info("Database will be recreated with correct structure")
-                    
-        except Exception as e:
-            logging.error(f"Error checking database structure: {e}")
-            # If there's any error, try to recreate
-            if os.path.exists(self.db_path):
-                os.remove(self.db_path)
-                logging.warning(f"Deleted corrupted database file: {self.db_path}")
-    
     def init_db(self):
-        """Initialize the database and create tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        """Bring the schema up to date (single version read when already current)"""
+        with self._connect() as conn:
+            run_migrations(conn)
+    
+    def _profile_changed(self, user_id: int):
+        """Profile row changed: drop cached copy, rebuild own deck, leave others' decks"""
+        self.profile_cache.invalidate(user_id)
+        self.swipe_deck.invalidate_user(user_id)
+        self.swipe_deck.drop_candidate(user_id)
+    
+    def user_day(self, user_id: int) -> str:
+        """Business day of the user's home city (views and seen sets are keyed by it)"""
+        profile = self.get_profile(user_id)
+        return self.days.today(profile.get('city_normalized') if profile else None)
+
+    def _load_seen(self, user_id: int) -> tuple:
+        """Liked-ever and viewed-today ids of a user (SeenSets loader)"""
+        today = self.user_day(user_id)
+        with self._connect() as conn:
             cursor = conn.cursor()
-            
-            # Create profiles table with all required columns
+            cursor.execute('SELECT to_user_id FROM likes WHERE from_user_id = ?', (user_id,))
+            liked = [row[0] for row in cursor.fetchall()]
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS profiles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER UNIQUE NOT NULL,
-                    username TEXT,
-                    name TEXT NOT NULL,
-                    age INTEGER NOT NULL,
-                    gender TEXT NOT NULL DEFAULT('other') CHECK(gender IN ('male', 'female', 'other')),
-                    city TEXT NOT NULL,
-                    city_display TEXT,
-                    city_normalized TEXT,
-                    favorite_drink TEXT NOT NULL,
-                    photo_id TEXT,
-                    who_pays TEXT NOT NULL DEFAULT('each_self') CHECK(who_pays IN ('each_self', 'i_treat', 'someone_treats')),
-                    language TEXT NOT NULL DEFAULT('ru') CHECK(language IN ('ru', 'ua', 'en')),
-                    lat REAL,
-                    lon REAL,
-                    is_premium INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Check and add missing columns for existing tables
-            self._migrate_profile_table(cursor)
-            self._migrate_events_table(cursor)
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS likes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    from_user_id INTEGER NOT NULL,
-                    to_user_id INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(from_user_id, to_user_id),
-                    FOREIGN KEY (from_user_id) REFERENCES profiles (user_id),
-                    FOREIGN KEY (to_user_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    creator_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    place TEXT NOT NULL,
-                    price_type TEXT NOT NULL CHECK(price_type IN ('free', 'paid')),
-                    description TEXT NOT NULL,
-                    city TEXT NOT NULL,
-                    city_normalized TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    status TEXT NOT NULL DEFAULT('active') CHECK(status IN ('active', 'expired', 'cancelled')),
-                    FOREIGN KEY (creator_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS event_participants (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(event_id, user_id),
-                    FOREIGN KEY (event_id) REFERENCES events (id),
-                    FOREIGN KEY (user_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS matches (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user1_id INTEGER NOT NULL,
-                    user2_id INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user1_id, user2_id),
-                    FOREIGN KEY (user1_id) REFERENCES profiles (user_id),
-                    FOREIGN KEY (user2_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS companies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    creator_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    interests TEXT NOT NULL,
-                    meeting_place TEXT NOT NULL,
-                    max_members INTEGER NOT NULL DEFAULT 10,
-                    city TEXT NOT NULL,
-                    city_normalized TEXT NOT NULL,
-                    status TEXT NOT NULL DEFAULT('active') CHECK(status IN ('active', 'full', 'cancelled')),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (creator_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS company_members (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    company_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(company_id, user_id),
-                    FOREIGN KEY (company_id) REFERENCES companies (id),
-                    FOREIGN KEY (user_id) REFERENCES profiles (user_id)
-                )
-            ''')
-            conn.commit()
+                SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = ?
+            ''', (user_id, today))
+            viewed = [row[0] for row in cursor.fetchall()]
+        viewed.extend(self.write_behind.pending_views(user_id, today))
+        return liked, viewed
+
+    def _load_bot_roster(self, city_normalized: str) -> List[tuple]:
+        """(user_id, gender) of every bot in the city, input of the hash order"""
+        with self._connect() as conn:
+            return conn.execute('SELECT user_id, gender FROM profiles WHERE city_normalized = ? AND is_bot = 1',
+                                (city_normalized,)).fetchall()
+
+    def _load_bot_order_table(self, city_normalized: str, day: str) -> List[int]:
+        """Order written by the rotation scripts (BOT_ORDER_MODE=table)"""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT bot_user_id FROM daily_bot_order
+                WHERE city_normalized = ? AND date = ? ORDER BY order_index
+            ''', (city_normalized, day)).fetchall()
+        return [row[0] for row in rows]
+
+    def _active_bots(self, cities: List[str]) -> tuple:
+        """SQL condition on bots (the query's city filter bounds them), its params and today's display ranks.
+
+        Which bots are active today is decided in memory by ``_in_bot_order``
+        from the memoized order, so the statement text stays the same every day.
+        """
+        return "p.is_bot = 1", [], self.bot_order.ranks(cities, self.days.today)
+
+    @staticmethod
+    def _in_bot_order(rows, ranks: Dict[int, int]) -> list:
+        """Today's active bots among the candidate rows, sorted by the day's bot order"""
+        return sorted((row for row in rows if row['user_id'] in ranks), key=lambda row: ranks[row['user_id']])
+
+    def _take_unseen(self, cursor, user_id: int, limit: int, skip_viewed: bool = True) -> List[Dict[str, Any]]:
+        """Read rows of an executed candidate query until limit, skipping the user's seen set"""
+        seen = self.seen.get(user_id)
+        profiles = []
+        for row in cursor:
+            profile_id = row['user_id']
+            if seen.has_liked(profile_id) or (skip_viewed and seen.has_viewed(profile_id)):
+                continue
+            profiles.append(dict(row))
+            if len(profiles) >= limit:
+                break
+        return profiles
     
-    def _migrate_profile_table(self, cursor):
-        """Migrate existing profiles table to add missing columns"""
+    def open_swipe_deck(self, user_id: int, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None, exact: bool = False) -> int:
+        """Prepare the user's swipe deck, return number of queued candidates"""
         try:
-            # Get current table schema
-            cursor.execute("PRAGMA table_info(profiles)")
-            columns = [column[1] for column in cursor.fetchall()]
-
-            if 'username' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN username TEXT')
-                logging.info("Added 'username' column to profiles table")
-            
-            # Add missing columns
-            if 'language' not in columns:
-                cursor.execute('''
-                    ALTER TABLE profiles 
-                    ADD COLUMN language TEXT NOT NULL DEFAULT('ru') CHECK(language IN ('ru', 'ua', 'en'))
-                ''')
-                logging.info("Added 'language' column to profiles table")
-            
-            if 'who_pays' not in columns:
-                cursor.execute('''
-                    ALTER TABLE profiles 
-                    ADD COLUMN who_pays TEXT NOT NULL DEFAULT('each_self') CHECK(who_pays IN ('each_self', 'i_treat', 'someone_treats'))
-                ''')
-                logging.info("Added 'who_pays' column to profiles table")
-            
-            if 'city_display' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN city_display TEXT')
-                logging.info("Added 'city_display' column to profiles table")
-            
-            if 'city_normalized' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN city_normalized TEXT')
-                logging.info("Added 'city_normalized' column to profiles table")
-            
-            if 'lat' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN lat REAL')
-                logging.info("Added 'lat' column to profiles table")
-            
-            if 'lon' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN lon REAL')
-                logging.info("Added 'lon' column to profiles table")
-            
-            if 'is_premium' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN is_premium INTEGER DEFAULT 0')
-                logging.info("Added 'is_premium' column to profiles table")
-            
-            if 'gender' not in columns:
-                cursor.execute('''
-                    ALTER TABLE profiles 
-                    ADD COLUMN gender TEXT NOT NULL DEFAULT('other') CHECK(gender IN ('male', 'female', 'other'))
-                ''')
-                logging.info("Added 'gender' column to profiles table")
-            
-            if 'is_bot' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN is_bot INTEGER DEFAULT 0')
-                logging.info("Added 'is_bot' column to profiles table")
-            
-            if 'bot_photo_path' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN bot_photo_path TEXT')
-                logging.info("Added 'bot_photo_path' column to profiles table")
-            
-            if 'last_rotation_date' not in columns:
-                cursor.execute('ALTER TABLE profiles ADD COLUMN last_rotation_date TEXT')
-                logging.info("Added 'last_rotation_date' column to profiles table")
-                
+            key = self.swipe_deck.make_key(city_normalized, gender_filter, who_pays_filter, exact)
+            return self.swipe_deck.open(user_id, key)
         except sqlite3.Error as e:
-            logging.error(f"Migration error: {e}")
+            logging.error(f"Error opening swipe deck: {e}")
+            return 0
     
-    def _migrate_events_table(self, cursor):
-        """Migrate existing events table to add missing columns"""
+    def next_swipe_candidate(self, user_id: int, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None, exact: bool = False) -> Optional[int]:
+        """Pop the next candidate user_id from the user's swipe deck"""
         try:
-            # Get current table schema
-            cursor.execute("PRAGMA table_info(events)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            # Add missing columns
-            if 'city_normalized' not in columns:
-                cursor.execute('ALTER TABLE events ADD COLUMN city_normalized TEXT')
-                logging.info("Added 'city_normalized' column to events table")
-                
-                # Update existing events with normalized city names
-                cursor.execute('SELECT id, city FROM events')
-                events = cursor.fetchall()
-                for event_id, city in events:
-                    if city:
-                        city_normalized = self.normalize_city(city)
-                        cursor.execute('UPDATE events SET city_normalized = ? WHERE id = ?', 
-                                     (city_normalized, event_id))
-                logging.info(f"Updated {len(events)} existing events with normalized city names")
-            
-            if 'expires_at' not in columns:
-                # Add expires_at column (4 hours from now for existing events)
-                cursor.execute('ALTER TABLE events ADD COLUMN expires_at TIMESTAMP')
-                logging.info("Added 'expires_at' column to events table")
-                
-                # Set expires_at for existing events (4 hours from now)
-                import datetime
-                future_time = datetime.datetime.now() + datetime.timedelta(hours=4)
-                cursor.execute('UPDATE events SET expires_at = ?', (future_time,))
-                logging.info(f"Set expires_at for existing events to {future_time}")
-            
-            if 'status' not in columns:
-                cursor.execute('ALTER TABLE events ADD COLUMN status TEXT DEFAULT "active"')
-                logging.info("Added 'status' column to events table")
-                
-                # Set default value for existing rows
-                cursor.execute('UPDATE events SET status = "active" WHERE status IS NULL')
-                
+            key = self.swipe_deck.make_key(city_normalized, gender_filter, who_pays_filter, exact)
+            return self.swipe_deck.pop(user_id, key)
         except sqlite3.Error as e:
-            logging.error(f"Events migration error: {e}")
+            logging.error(f"Error getting next swipe candidate: {e}")
+            return None
     
     def create_profile(self, user_id: int, name: str, age: int, gender: str, city: str, favorite_drink: str, photo_id: str = None, who_pays: str = 'each_self', language: str = 'ru', username: str = None) -> bool:
         """Create a new user profile with unified city normalization and detailed logging"""
@@ -331,21 +225,25 @@ class Database:
             logging.info(f"DEBUG: Создан профиль пользователя {user_id}. Город в базе: '{city_normalized}', отображение: '{city_display}'")
             
             query = '''
-                INSERT OR REPLACE INTO profiles (user_id, username, name, age, gender, city, city_display, city_normalized, favorite_drink, photo_id, who_pays, language, is_bot)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+                INSERT OR REPLACE INTO profiles (user_id, username, name, age, gender, city, city_display, city_normalized, lat, lon, favorite_drink, photo_id, who_pays, language, is_bot)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
             '''
-            params = (user_id, username, name, age, gender, city_display, city_display, city_normalized, favorite_drink, photo_id, who_pays, language)
+            lat, lon = self.geo.coordinates(city_normalized) or (None, None)
+            params = (user_id, username, name, age, gender, city_display, city_display, city_normalized, lat, lon, favorite_drink, photo_id, who_pays, language)
             
             # Log the query before execution
             self._log_query(query, params, user_id, "CREATE_PROFILE")
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 conn.commit()
                 
                 success = cursor.rowcount > 0
                 if success:
+                    # INSERT OR REPLACE also re-creates existing profiles
+                    self._profile_changed(user_id)
+                    self.languages.invalidate(user_id)
                     logging.info(f"DEBUG: User {user_id} from city '{city}', saved as '{city_normalized}'")
                 else:
                     logging.warning(f"DEBUG: User {user_id} profile creation affected 0 rows")
@@ -366,14 +264,24 @@ class Database:
             return False
     
     def get_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Get user profile by user_id"""
+        """Get user profile by user_id (served from the profile cache when possible)"""
+        cached = self.profile_cache.get(user_id)
+        if cached is MISSING:
+            return None
+        if cached is not None:
+            return dict(cached)
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM profiles WHERE user_id = ?', (user_id,))
                 result = cursor.fetchone()
-                return dict(result) if result else None
+                if not result:
+                    self.profile_cache.put_missing(user_id)
+                    return None
+                profile = dict(result)
+                self.profile_cache.put(user_id, profile)
+                return dict(profile)
         except sqlite3.Error as e:
             logging.error(f"DB Error getting profile: {e}")
             return None
@@ -381,58 +289,40 @@ class Database:
     def find_profiles_for_swipe(self, user_id: int, city: str = None, gender: str = None, limit: int = 10) -> list:
         """Find profiles for swiping with proper error handling"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
-                # Get already liked user IDs
-                cursor.execute('SELECT to_user_id FROM likes WHERE from_user_id = ?', (user_id,))
-                liked_ids = [row[0] for row in cursor.fetchall()]
-                logging.info(f"DEBUG: User {user_id} already liked {len(liked_ids)} profiles")
-                
-                # Exclude own profile and already liked profiles - ensure all are integers
-                exclude_ids = [int(user_id)] + [int(liked_id) for liked_id in liked_ids if liked_id is not None]
-                placeholders = ','.join(['?' for _ in exclude_ids])
-                
                 # Ensure limit is integer
                 limit = int(limit) if limit else 10
                 
+                # Liked profiles are skipped in memory via the seen set, no ID list in SQL
                 if city and city.strip():
                     # Normalize the search city and search ONLY in city_normalized
                     city_normalized = self.normalize_city(city.strip())
                     logging.info(f"DEBUG: Searching in city_normalized='{city_normalized}' (from input: '{city}')")
                     
-                    # Build query safely
-                    query = f'''
+                    query = '''
                         SELECT * FROM profiles 
-                        WHERE city_normalized = ? AND user_id NOT IN ({placeholders})
+                        WHERE city_normalized = ? AND user_id != ?
                         ORDER BY created_at DESC 
-                        LIMIT ?
                     '''
-                    params = [city_normalized] + exclude_ids + [limit]
-                    
-                    logging.info(f"DEBUG: Query: {query}")
-                    logging.info(f"DEBUG: Params: {params}")
-                    
-                    cursor.execute(query, params)
+                    params = [city_normalized, user_id]
                 else:
                     logging.warning(f"DEBUG: No city provided for user {user_id}, searching all profiles")
                     
-                    query = f'''
+                    query = '''
                         SELECT * FROM profiles 
-                        WHERE user_id NOT IN ({placeholders})
+                        WHERE user_id != ?
                         ORDER BY created_at DESC 
-                        LIMIT ?
-                    '''.format(placeholders)
-                    params = exclude_ids + [limit]
-                    
-                    logging.info(f"DEBUG: Query: {query}")
-                    logging.info(f"DEBUG: Params: {params}")
-                    
-                    cursor.execute(query, params)
+                    '''
+                    params = [user_id]
                 
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                logging.info(f"DEBUG: Query: {query}")
+                logging.info(f"DEBUG: Params: {params}")
+                
+                cursor.execute(query, params)
+                profiles = self._take_unseen(cursor, user_id, limit, skip_viewed=False)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id}")
                 for profile in profiles:
@@ -449,7 +339,7 @@ class Database:
     def get_profile_likes(self, user_id: int) -> list:
         """Get profiles liked by user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -467,13 +357,15 @@ class Database:
     def like_profile(self, from_user_id: int, to_user_id: int) -> bool:
         """Like a profile"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR IGNORE INTO likes (from_user_id, to_user_id, created_at)
                     VALUES (?, ?, CURRENT_TIMESTAMP)
                 ''', (from_user_id, to_user_id))
                 conn.commit()
+                self.seen.add_liked(from_user_id, to_user_id)
+                self.swipe_deck.discard(from_user_id, to_user_id)
                 return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"Error liking profile: {e}")
@@ -482,7 +374,7 @@ class Database:
     def get_mutual_likes(self, user_id: int) -> list:
         """Get mutual likes"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -503,7 +395,7 @@ class Database:
         """Get count of bots in city"""
         try:
             city_normalized = self.normalize_city(city)
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT COUNT(*) FROM profiles 
@@ -519,7 +411,7 @@ class Database:
         """Get daily limits for city"""
         try:
             city_normalized = self.normalize_city(city)
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT daily_limit, bots_shown, date 
@@ -536,20 +428,66 @@ class Database:
                         'last_rotation_date': result[2]
                     }
                 else:
-                    return {'daily_limit': 5, 'current_count': 0, 'last_rotation_date': None}
+                    return {'daily_limit': self.city_config.daily_limit(city_normalized), 'current_count': 0, 'last_rotation_date': None}
         except sqlite3.Error as e:
             print(f"Error getting daily limits: {e}")
             return {'daily_limit': 5, 'current_count': 0, 'last_rotation_date': None}
     
+    def update_city_config(self, city_normalized: str, **fields) -> bool:
+        """Change tier / bots_per_gender / daily_limit / nearby / timezone for a city, live without restart"""
+        allowed = {'tier', 'bots_per_gender', 'daily_limit', 'nearby', 'timezone'}
+        if not fields or not set(fields) <= allowed:
+            raise ValueError(f"City config fields must be among {sorted(allowed)}")
+        if isinstance(fields.get('nearby'), (list, tuple)):
+            fields['nearby'] = ','.join(fields['nearby'])
+        try:
+            columns = ', '.join(fields)
+            updates = ', '.join(f"{name} = excluded.{name}" for name in fields)
+            with self._connect() as conn:
+                conn.execute(f'''
+                    INSERT INTO city_config (city_normalized, {columns})
+                    VALUES (?{', ?' * len(fields)})
+                    ON CONFLICT(city_normalized) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+                ''', (city_normalized, *fields.values()))
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.error(f"Error updating city config for {city_normalized}: {e}")
+            return False
+        self.city_config.reload()
+        return True
+
+    def reload_city_config(self) -> bool:
+        """Pick up city_config edits made by other processes, True if anything changed"""
+        return self.city_config.reload()
+
+    def lookup_city_location(self, city_text: str):
+        """Offline geocode (gazetteer, then geocode_cache): GeocodeResult or None if never looked up"""
+        try:
+            return self.geocoder.lookup(city_text)
+        except sqlite3.Error as e:
+            logging.error(f"Error looking up city location: {e}")
+            return None
+
+    def get_nearby_cities(self, city_normalized: str) -> List[str]:
+        """Neighbours searched together with a city: closest by distance, then city_config extras"""
+        nearby = list(self.geo.nearby(city_normalized))
+        for city in self.city_config.nearby(city_normalized):
+            if city not in nearby and city != city_normalized:
+                nearby.append(city)
+        return nearby
+    
     def delete_profile(self, user_id: int) -> bool:
         """Delete user profile"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM profiles WHERE user_id = ?', (user_id,))
                 cursor.execute('DELETE FROM likes WHERE from_user_id = ? OR to_user_id = ?', (user_id, user_id))
                 cursor.execute('DELETE FROM matches WHERE user1_id = ? OR user2_id = ?', (user_id, user_id))
                 conn.commit()
+                self._profile_changed(user_id)
+                self.languages.invalidate(user_id)
+                self.seen.invalidate(user_id)
                 return cursor.rowcount > 0
         except sqlite3.Error as e:
             print(f"Error deleting profile: {e}")
@@ -558,13 +496,15 @@ class Database:
     def add_like(self, from_user_id: int, to_user_id: int) -> bool:
         """Add a like from one user to another"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR IGNORE INTO likes (from_user_id, to_user_id)
                     VALUES (?, ?)
                 ''', (from_user_id, to_user_id))
                 conn.commit()
+                self.seen.add_liked(from_user_id, to_user_id)
+                self.swipe_deck.discard(from_user_id, to_user_id)
                 success = cursor.rowcount > 0
                 if success:
                     logging.info(f"Like added: {from_user_id} -> {to_user_id}")
@@ -578,7 +518,7 @@ class Database:
     def check_mutual_like(self, user1_id: int, user2_id: int) -> bool:
         """Check if two users have mutual likes"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT COUNT(*) FROM likes 
@@ -596,7 +536,7 @@ class Database:
     def create_match(self, user1_id: int, user2_id: int) -> bool:
         """Create a match between two users"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR IGNORE INTO matches (user1_id, user2_id)
@@ -608,10 +548,55 @@ class Database:
             print(f"Error creating match: {e}")
             return False
     
+    def record_swipe(self, from_user_id: int, to_user_id: int, action: str) -> Optional[SwipeOutcome]:
+        """Record a like/dislike with view mark, mutual check and match in one transaction"""
+        try:
+            if action != 'like':
+                # A dislike is only a view mark: buffered, committed with the next batch
+                queued = self.write_behind.mark_viewed(from_user_id, to_user_id, self.user_day(from_user_id))
+                outcome = SwipeOutcome.VIEWED if queued else SwipeOutcome.DUPLICATE
+            else:
+                with self._connect() as conn:
+                    # Write lock up front: two simultaneous likes are serialized, the second one sees the first
+                    if not conn.in_transaction:
+                        conn.execute('BEGIN IMMEDIATE')
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO profile_views (user_id, profile_id, view_date)
+                        VALUES (?, ?, ?)
+                    ''', (from_user_id, to_user_id, self.user_day(from_user_id)))
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO likes (from_user_id, to_user_id)
+                        VALUES (?, ?)
+                    ''', (from_user_id, to_user_id))
+                    if cursor.rowcount == 0:
+                        outcome = SwipeOutcome.DUPLICATE
+                    else:
+                        cursor.execute('''
+                            SELECT 1 FROM likes WHERE from_user_id = ? AND to_user_id = ?
+                        ''', (to_user_id, from_user_id))
+                        if cursor.fetchone():
+                            cursor.execute('''
+                                INSERT OR IGNORE INTO matches (user1_id, user2_id)
+                                VALUES (?, ?)
+                            ''', (min(from_user_id, to_user_id), max(from_user_id, to_user_id)))
+                            outcome = SwipeOutcome.MATCHED
+                        else:
+                            outcome = SwipeOutcome.LIKED
+                    conn.commit()
+                self.seen.add_liked(from_user_id, to_user_id)
+            self.seen.add_viewed(from_user_id, to_user_id)
+            self.swipe_deck.discard(from_user_id, to_user_id)
+            logging.info(f"Swipe {action}: {from_user_id} -> {to_user_id}: {outcome.value}")
+            return outcome
+        except sqlite3.Error as e:
+            logging.error(f"Error recording swipe {from_user_id} -> {to_user_id}: {e}")
+            return None
+
     def get_user_matches(self, user_id: int) -> List[Dict[str, Any]]:
         """Get all matches for a user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -625,6 +610,42 @@ class Database:
             print(f"Error getting user matches: {e}")
             return []
     
+    def get_user_matches_page(self, user_id: int, before_id: int = None, after_id: int = None,
+                              limit: int = 5) -> Tuple[List[Dict[str, Any]], bool]:
+        """One page of matches, newest first, and whether more exist past it.
+
+        Keyset pagination on matches.id: ``before_id`` pages to older matches,
+        ``after_id`` back to newer ones. Each side of the match is read through
+        its (user_id, id) index with LIMIT, so a page costs O(limit) rows
+        however many matches the user has. Rows carry ``match_id``.
+        """
+        newer = after_id is not None
+        bound = after_id if newer else (before_id if before_id is not None else 2 ** 63 - 1)
+        op, order = ('>', 'ASC') if newer else ('<', 'DESC')
+        try:
+            with self._connect() as conn:
+                # Up to limit + 1 matches from each side, merged: the extra one tells if more exist
+                side = f'SELECT id, {{}} FROM matches WHERE {{}} = ? AND id {op} ? ORDER BY id {order} LIMIT ?'
+                params = (user_id, bound, limit + 1)
+                rows = (conn.execute(side.format('user2_id', 'user1_id'), params).fetchall()
+                        + conn.execute(side.format('user1_id', 'user2_id'), params).fetchall())
+                rows.sort(reverse=not newer)
+                page = rows[:limit]
+                if newer:
+                    page.reverse()
+
+                if not page:
+                    return [], False
+                conn.row_factory = sqlite3.Row
+                other_ids = [other_id for _, other_id in page]
+                profiles = {row['user_id']: dict(row) for row in conn.execute(
+                    f"SELECT * FROM profiles WHERE user_id IN ({','.join('?' * len(other_ids))})", other_ids)}
+        except sqlite3.Error as e:
+            logging.error(f"Error getting user matches page: {e}")
+            return [], False
+        matches = [dict(profiles[other_id], match_id=match_id) for match_id, other_id in page if other_id in profiles]
+        return matches, len(rows) > limit
+
     def get_icebreaker(self) -> str:
         """Get a random icebreaker topic"""
         icebreakers = [
@@ -652,7 +673,7 @@ class Database:
             import datetime
             expires_at = datetime.datetime.now() + datetime.timedelta(hours=4)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 query = '''
                     INSERT INTO events (creator_id, name, place, price_type, description, city, city_normalized, expires_at)
@@ -697,7 +718,7 @@ class Database:
             import datetime
             now = datetime.datetime.now()
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -737,7 +758,7 @@ class Database:
     def is_user_participating(self, event_id: int, user_id: int) -> bool:
         """Check if user is participating in an event"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT 1 FROM event_participants WHERE event_id = ? AND user_id = ?', (event_id, user_id))
                 result = cursor.fetchone()
@@ -749,13 +770,14 @@ class Database:
     def update_user_language(self, user_id: int, language: str) -> bool:
         """Update user's language preference in user_settings table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO user_settings (user_id, language, updated_at)
                     VALUES (?, ?, CURRENT_TIMESTAMP)
                 ''', (user_id, language))
                 conn.commit()
+                self.languages.set(user_id, language)
                 logging.info(f"Language saved to user_settings for user {user_id}: {language}")
                 return True
         except sqlite3.Error as e:
@@ -765,16 +787,18 @@ class Database:
     def update_user_city_normalized(self, user_id: int, city_display: str, city_normalized: str) -> bool:
         """Update user's city_display and city_normalized"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
+                lat, lon = self.geo.coordinates(city_normalized) or (None, None)
                 cursor.execute('''
                     UPDATE profiles 
-                    SET city_display = ?, city_normalized = ? 
+                    SET city_display = ?, city_normalized = ?, lat = ?, lon = ? 
                     WHERE user_id = ?
-                ''', (city_display, city_normalized, user_id))
+                ''', (city_display, city_normalized, lat, lon, user_id))
                 conn.commit()
                 success = cursor.rowcount > 0
                 if success:
+                    self._profile_changed(user_id)
                     logging.info(f"Updated city for user {user_id}: display='{city_display}', normalized='{city_normalized}'")
                 else:
                     logging.warning(f"No profile found to update city for user {user_id}")
@@ -802,27 +826,25 @@ class Database:
         logging.debug(f"Selected icebreaker: {icebreaker}")
         return icebreaker
     
+    def _load_user_language(self, user_id: int) -> str:
+        """Resolve language in one query: user_settings first, then profiles"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COALESCE(
+                    (SELECT language FROM user_settings WHERE user_id = ?),
+                    (SELECT language FROM profiles WHERE user_id = ?),
+                    'ru'
+                )
+            ''', (user_id, user_id))
+            language = cursor.fetchone()[0]
+            logging.debug(f"Language loaded for user {user_id}: {language}")
+            return language
+
     def get_user_language(self, user_id: int) -> str:
         """Get user's language preference from user_settings first, then profiles"""
         try:
-            # First try user_settings table
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT language FROM user_settings WHERE user_id = ?', (user_id,))
-                result = cursor.fetchone()
-                if result:
-                    language = result[0]
-                    logging.debug(f"Language from user_settings for user {user_id}: {language}")
-                    return language
-            
-            # Fallback to profiles table
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT language FROM profiles WHERE user_id = ?', (user_id,))
-                result = cursor.fetchone()
-                language = result[0] if result else 'ru'
-                logging.debug(f"Language from profiles for user {user_id}: {language}")
-                return language
+            return self.languages.get(user_id)
         except sqlite3.Error as e:
             logging.error(f"DB Error getting user language: {e}")
             return 'ru'
@@ -830,7 +852,7 @@ class Database:
     def get_user_events(self, user_id: int) -> List[Dict[str, Any]]:
         """Get events created by a specific user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -847,7 +869,7 @@ class Database:
     def join_event(self, event_id: int, user_id: int) -> bool:
         """Join an event"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR IGNORE INTO event_participants (event_id, user_id)
@@ -867,7 +889,7 @@ class Database:
     def leave_event(self, event_id: int, user_id: int) -> bool:
         """Leave an event"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM event_participants 
@@ -887,7 +909,7 @@ class Database:
     def get_event_participants(self, event_id: int) -> List[Dict[str, Any]]:
         """Get all participants of an event"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -905,7 +927,7 @@ class Database:
     def is_user_in_event(self, event_id: int, user_id: int) -> bool:
         """Check if user is already in event"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT 1 FROM event_participants 
@@ -919,7 +941,7 @@ class Database:
     def get_events_with_participation(self, city: str, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
         """Get events in city with user participation status"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
@@ -944,7 +966,7 @@ class Database:
             city_normalized = self.normalize_city(city)
             logging.info(f"DEBUG: Создана компания '{name}'. Город в базе: '{city_normalized}'")
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO companies (creator_id, name, description, interests, meeting_place, max_members, city, city_normalized)
@@ -968,7 +990,7 @@ class Database:
     def get_user_companies(self, user_id: int) -> List[Dict[str, Any]]:
         """Get companies where user is a member (including creator)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
 
@@ -999,7 +1021,7 @@ class Database:
             city_normalized = self.normalize_city(city)
             logging.info(f"DEBUG: Поиск компаний в городе: '{city_normalized}'")
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -1027,7 +1049,7 @@ class Database:
     def join_company(self, company_id: int, user_id: int) -> bool:
         """Join a company"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Check if company is not full
@@ -1072,7 +1094,7 @@ class Database:
     def leave_company(self, company_id: int, user_id: int) -> bool:
         """Leave a company"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     DELETE FROM company_members 
@@ -1097,7 +1119,7 @@ class Database:
     def is_user_in_company(self, company_id: int, user_id: int) -> bool:
         """Check if user is in a company"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT 1 FROM company_members WHERE company_id = ? AND user_id = ?', (company_id, user_id))
                 result = cursor.fetchone()
@@ -1109,7 +1131,7 @@ class Database:
     def get_event_by_id(self, event_id: int) -> Optional[Dict[str, Any]]:
         """Get event by ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 query = '''
@@ -1134,7 +1156,7 @@ class Database:
     def get_user_events(self, user_id: int) -> List[Dict[str, Any]]:
         """Get events created by user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 query = '''
@@ -1188,7 +1210,7 @@ class Database:
             logging.error(f"Error calculating time remaining: {e}")
             return "??:??"
     
-    def update_profile(self, user_id: int, name: str = None, age: int = None, city: str = None, favorite_drink: str = None, photo_id: str = None, who_pays: str = None, language: str = None, username: str = None, is_premium: int = None) -> bool:
+    def update_profile(self, user_id: int, name: str = None, age: int = None, city: str = None, favorite_drink: str = None, photo_id: str = None, who_pays: str = None, language: str = None, username: str = None, is_premium: int = None, gender: str = None) -> bool:
         """Update user profile with detailed logging"""
         try:
             # Get current profile first
@@ -1209,6 +1231,10 @@ class Database:
                 updates.append("age = ?")
                 params.append(age)
             
+            if gender is not None:
+                updates.append("gender = ?")
+                params.append(gender)
+            
             if city is not None:
                 city_normalized = self.normalize_city(city)
                 updates.append("city = ?")
@@ -1217,6 +1243,9 @@ class Database:
                 params.append(city)
                 updates.append("city_normalized = ?")
                 params.append(city_normalized)
+                lat, lon = self.geo.coordinates(city_normalized) or (None, None)
+                updates.append("lat = ?, lon = ?")
+                params.extend((lat, lon))
             
             if favorite_drink is not None:
                 updates.append("favorite_drink = ?")
@@ -1254,13 +1283,17 @@ class Database:
             # Log the query before execution
             self._log_query(query, tuple(params), user_id, "UPDATE_PROFILE")
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, tuple(params))
                 conn.commit()
                 
                 success = cursor.rowcount > 0
                 if success:
+                    self._profile_changed(user_id)
+                    if language is not None:
+                        # user_settings may still override profiles.language, re-resolve lazily
+                        self.languages.invalidate(user_id)
                     logging.info(f"DEBUG: Profile updated for user {user_id}")
                 else:
                     logging.warning(f"DEBUG: Profile update affected 0 rows for user {user_id}")
@@ -1283,7 +1316,7 @@ class Database:
     def get_user_events(self, user_id: int) -> List[Dict[str, Any]]:
         """Get events created by user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 query = '''
@@ -1314,7 +1347,7 @@ class Database:
     def delete_event(self, event_id: int, creator_id: int) -> bool:
         """Delete event if user is creator"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 query = '''
                     DELETE FROM events 
@@ -1352,7 +1385,7 @@ class Database:
     def get_company_members_with_usernames(self, company_id: int) -> List[Dict[str, Any]]:
         """Get company members with usernames and names"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 query = '''
@@ -1390,63 +1423,35 @@ class Database:
             if not user_city_normalized:
                 return []
             
-            # Define nearby cities mapping (simplified version)
-            nearby_cities = {
-                'Kyiv': ['Kharkiv', 'Odesa', 'Lviv', 'Dnipro'],
-                'Kharkiv': ['Kyiv', 'Poltava', 'Sumy'],
-                'Odesa': ['Kyiv', 'Mykolaiv', 'Kherson'],
-                'Lviv': ['Kyiv', 'Ivano-Frankivsk', 'Ternopil'],
-                'Dnipro': ['Kyiv', 'Zaporizhzhia', 'Kryvyi Rih'],
-                'Moscow': ['Saint Petersburg', 'Nizhny Novgorod', 'Kazan'],
-                'Saint Petersburg': ['Moscow', 'Helsinki', 'Tallinn'],
-                'Warsaw': ['Krakow', 'Lodz', 'Wroclaw'],
-                'Krakow': ['Warsaw', 'Katowice', 'Gdansk'],
-                # Add more city mappings as needed
-            }
-            
             # Get nearby cities list
-            nearby = nearby_cities.get(user_city_normalized, [])
+            nearby = self.get_nearby_cities(user_city_normalized)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
                 # First try exact city match
-                cursor.execute('''
+                active, active_params, ranks = self._active_bots([user_city_normalized])
+                cursor.execute(f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
-                    WHERE p.user_id != ? AND p.city_normalized = ?
-                    AND dbo.city_normalized = ? AND dbo.date = DATE('now')
-                    AND p.user_id NOT IN (
-                        SELECT to_user_id FROM likes WHERE from_user_id = ?
-                    )
-                    ORDER BY dbo.order_index
-                    LIMIT ?
-                ''', (user_id, user_city_normalized, user_city_normalized, user_id, limit))
-                
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
-                
+                    WHERE p.user_id != ? AND p.city_normalized = ? AND {active}
+                ''', [user_id, user_city_normalized] + active_params)
+
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, limit, skip_viewed=False)
+
                 # If not enough profiles, try nearby cities
                 if len(profiles) < limit and nearby:
                     remaining_limit = limit - len(profiles)
                     placeholders = ','.join(['?' for _ in nearby])
-                    
+                    active, active_params, ranks = self._active_bots(nearby)
+
                     cursor.execute(f'''
                         SELECT p.* FROM profiles p
-                        JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
-                        WHERE p.user_id != ? AND p.city_normalized IN ({placeholders})
-                        AND dbo.city_normalized IN ({placeholders})
-                        AND dbo.date = DATE('now')
-                        AND p.user_id NOT IN (
-                            SELECT to_user_id FROM likes WHERE from_user_id = ?
-                        )
-                        ORDER BY dbo.order_index
-                        LIMIT ?
-                    ''', [user_id] + nearby + nearby + [user_id, remaining_limit])
-                    
-                    nearby_results = cursor.fetchall()
-                    profiles.extend([dict(row) for row in nearby_results])
+                        WHERE p.user_id != ? AND p.city_normalized IN ({placeholders}) AND {active}
+                    ''', [user_id] + nearby + active_params)
+
+                    profiles.extend(self._take_unseen(self._in_bot_order(cursor, ranks), user_id, remaining_limit,
+                                                      skip_viewed=False))
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} (including nearby cities)")
                 return profiles
@@ -1462,27 +1467,14 @@ class Database:
             city_normalized = self.normalize_city(city)
             logging.info(f"DEBUG: Поиск тусовок в городе и рядом: '{city_normalized}'")
             
-            # Define nearby cities mapping
-            nearby_cities = {
-                'Kyiv': ['Kharkiv', 'Odesa', 'Lviv', 'Dnipro'],
-                'Kharkiv': ['Kyiv', 'Poltava', 'Sumy'],
-                'Odesa': ['Kyiv', 'Mykolaiv', 'Kherson'],
-                'Lviv': ['Kyiv', 'Ivano-Frankivsk', 'Ternopil'],
-                'Dnipro': ['Kyiv', 'Zaporizhzhia', 'Kryvyi Rih'],
-                'Moscow': ['Saint Petersburg', 'Nizhny Novgorod', 'Kazan'],
-                'Saint Petersburg': ['Moscow', 'Helsinki', 'Tallinn'],
-                'Warsaw': ['Krakow', 'Lodz', 'Wroclaw'],
-                'Krakow': ['Warsaw', 'Katowice', 'Gdansk'],
-            }
-            
             # Get nearby cities list
-            nearby = nearby_cities.get(city_normalized, [])
+            nearby = self.get_nearby_cities(city_normalized)
             all_cities = [city_normalized] + nearby
             
             import datetime
             now = datetime.datetime.now()
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
@@ -1516,7 +1508,7 @@ class Database:
     def delete_profile(self, user_id: int) -> bool:
         """Delete user profile and all related data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Delete related data
@@ -1536,6 +1528,9 @@ class Database:
                 cursor.execute('DELETE FROM profiles WHERE user_id = ?', (user_id,))
                 
                 conn.commit()
+                self._profile_changed(user_id)
+                self.languages.invalidate(user_id)
+                self.seen.invalidate(user_id)
                 
                 success = cursor.rowcount > 0
                 if success:
@@ -1559,30 +1554,19 @@ class Database:
     def get_profiles_for_swiping_by_city_exact(self, user_id: int, city_normalized: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get profiles for swiping in specific city only (no nearby cities)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
-                cursor.execute('''
+                active, active_params, ranks = self._active_bots([city_normalized])
+                cursor.execute(f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
-                    WHERE p.user_id != ? 
+                    WHERE p.user_id != ?
                     AND p.city_normalized = ?
-                    AND dbo.city_normalized = ?
-                    AND dbo.date = DATE('now')
-                    AND p.user_id NOT IN (
-                        SELECT to_user_id FROM likes WHERE from_user_id = ?
-                    )
-                    AND p.user_id NOT IN (
-                        SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = DATE('now')
-                    )
-                    AND (p.is_bot = 0 OR (p.city_normalized = ? AND p.last_rotation_date = DATE('now')))
-                    ORDER BY dbo.order_index
-                    LIMIT ?
-                ''', (user_id, city_normalized, city_normalized, user_id, user_id, city_normalized, limit))
-                
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                    AND {active}
+                ''', [user_id, city_normalized] + active_params)
+
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, limit)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} in exact city '{city_normalized}'")
                 return profiles
@@ -1594,49 +1578,27 @@ class Database:
     def get_profiles_for_swiping_nearby_by_city(self, user_id: int, city_normalized: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get profiles for swiping in specific city and nearby cities"""
         try:
-            # Define nearby cities mapping
-            nearby_cities = {
-                'Kyiv': ['Kharkiv', 'Odesa', 'Lviv', 'Dnipro'],
-                'Kharkiv': ['Kyiv', 'Poltava', 'Sumy'],
-                'Odesa': ['Kyiv', 'Mykolaiv', 'Kherson'],
-                'Lviv': ['Kyiv', 'Ivano-Frankivsk', 'Ternopil'],
-                'Dnipro': ['Kyiv', 'Zaporizhzhia', 'Kryvyi Rih'],
-                'Moscow': ['Saint Petersburg', 'Nizhny Novgorod', 'Kazan'],
-                'Saint Petersburg': ['Moscow', 'Helsinki', 'Tallinn'],
-                'Warsaw': ['Krakow', 'Lodz', 'Wroclaw'],
-                'Krakow': ['Warsaw', 'Katowice', 'Gdansk'],
-                # Add more city mappings as needed
-            }
-            
             # Get nearby cities list
-            nearby = nearby_cities.get(city_normalized, [])
+            nearby = self.get_nearby_cities(city_normalized)
             all_cities = [city_normalized] + nearby
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
                 placeholders = ','.join(['?' for _ in all_cities])
+                active, active_params, ranks = self._active_bots(all_cities)
                 query = f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
-                    WHERE p.user_id != ? AND p.city_normalized IN ({placeholders})
-                    AND dbo.city_normalized IN ({placeholders})
-                    AND dbo.date = DATE('now')
-                    AND p.user_id NOT IN (
-                        SELECT to_user_id FROM likes WHERE from_user_id = ?
-                    )
-                    ORDER BY dbo.order_index
-                    LIMIT ?
+                    WHERE p.user_id != ? AND p.city_normalized IN ({placeholders}) AND {active}
                 '''
-                params = [user_id] + all_cities + all_cities + [user_id, limit]
-                
+                params = [user_id] + all_cities + active_params
+
                 # Log the query before execution
                 self._log_query(query, params, user_id, "GET_PROFILES_BY_CITY")
-                
+
                 cursor.execute(query, params)
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, limit, skip_viewed=False)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} in city '{city_normalized}' and nearby")
                 return profiles
@@ -1648,7 +1610,7 @@ class Database:
     def save_user_filters(self, user_id: int, gender_filter: str = None, who_pays_filter: str = None) -> bool:
         """Save user's dating filters"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 updates = []
@@ -1667,6 +1629,8 @@ class Database:
                     query = f"UPDATE profiles SET {', '.join(updates)} WHERE user_id = ?"
                     cursor.execute(query, params)
                     conn.commit()
+                    self.profile_cache.invalidate(user_id)
+                    self.swipe_deck.invalidate_user(user_id)
                     return cursor.rowcount > 0
                 
                 return False
@@ -1677,7 +1641,7 @@ class Database:
     def get_user_filters(self, user_id: int) -> Dict[str, str]:
         """Get user's dating filters"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('SELECT filter_gender, filter_who_pays FROM profiles WHERE user_id = ?', (user_id,))
@@ -1694,16 +1658,12 @@ class Database:
             return {'gender': 'all', 'who_pays': 'any'}
 
     def mark_profile_as_viewed(self, user_id: int, profile_id: int) -> bool:
-        """Mark a profile as viewed for today"""
+        """Mark a profile as viewed for today (buffered, see WriteBehindQueue)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR IGNORE INTO profile_views (user_id, profile_id, view_date)
-                    VALUES (?, ?, DATE('now'))
-                ''', (user_id, profile_id))
-                conn.commit()
-                return cursor.rowcount > 0
+            queued = self.write_behind.mark_viewed(user_id, profile_id, self.user_day(user_id))
+            self.seen.add_viewed(user_id, profile_id)
+            self.swipe_deck.discard(user_id, profile_id)
+            return queued
         except sqlite3.Error as e:
             logging.error(f"Error marking profile as viewed: {e}")
             return False
@@ -1711,13 +1671,17 @@ class Database:
     def get_viewed_profiles_today(self, user_id: int) -> List[int]:
         """Get list of profile IDs viewed today"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            today = self.user_day(user_id)
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT profile_id FROM profile_views 
-                    WHERE user_id = ? AND view_date = DATE('now')
-                ''', (user_id,))
-                return [row[0] for row in cursor.fetchall()]
+                    SELECT profile_id FROM profile_views
+                    WHERE user_id = ? AND view_date = ?
+                ''', (user_id, today))
+                viewed = [row[0] for row in cursor.fetchall()]
+                # Unflushed view marks count too
+                viewed.extend(self.write_behind.pending_views(user_id, today).difference(viewed))
+                return viewed
         except sqlite3.Error as e:
             logging.error(f"Error getting viewed profiles: {e}")
             return []
@@ -1725,19 +1689,19 @@ class Database:
     def get_profiles_for_swiping_exact_city_all_data(self, user_id: int, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None) -> List[Dict[str, Any]]:
         """Get profiles for swiping in exact city only with filters - optimized version"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
                 # Build WHERE conditions for exact city only
+                # Liked / viewed today profiles are skipped in memory via the seen set
+                active, active_params, ranks = self._active_bots([city_normalized])
                 conditions = [
-                    "p.user_id != ?", 
+                    "p.user_id != ?",
                     "p.city_normalized = ?",
-                    "p.user_id NOT IN (SELECT to_user_id FROM likes WHERE from_user_id = ?)",
-                    "p.user_id NOT IN (SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = DATE('now'))",
-                    "(p.is_bot = 0 OR (p.city_normalized = ? AND p.last_rotation_date = DATE('now')))"
+                    active
                 ]
-                params = [user_id, city_normalized, user_id, user_id, city_normalized]
+                params = [user_id, city_normalized] + active_params
                 
                 # Add gender filter
                 if gender_filter and gender_filter != 'all':
@@ -1758,19 +1722,11 @@ class Database:
                 
                 query = f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
                     WHERE {' AND '.join(conditions)}
-                    AND dbo.city_normalized = ?
-                    AND dbo.date = DATE('now')
-                    ORDER BY dbo.order_index
-                    LIMIT 10
                 '''
-                
-                params.append(city_normalized)
-                
+
                 cursor.execute(query, params)
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, 10)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} in exact city '{city_normalized}' with filters (optimized)")
                 return profiles
@@ -1779,33 +1735,17 @@ class Database:
             logging.error(f"Error getting profiles by exact city with filters (optimized): {e}")
             return []
 
-    def get_profiles_for_swiping_exact_city(self, user_id: int, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None) -> List[Dict[str, Any]]:
+    def get_profiles_for_swiping_exact_city(self, user_id: int, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Get profiles for swiping in exact city only with daily limits"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
                 # Check daily limits first
-                today = datetime.now().strftime('%Y-%m-%d')
-                
-                # Get city limit
-                city_limits = {
-                    "Kyiv": 15, "Moscow": 15, "Saint Petersburg": 12, "Minsk": 12,
-                    "Novosibirsk": 10, "Yekaterinburg": 10, "Tashkent": 10, "Kazan": 10,
-                    "Kharkiv": 10, "Nizhny Novgorod": 10, "Chelyabinsk": 10, "Almaty": 10,
-                    "Samara": 10, "Ufa": 10, "Rostov-on-Don": 10, "Krasnoyarsk": 10,
-                    "Omsk": 10, "Voronezh": 10, "Perm": 10, "Volgograd": 10,
-                    "Odesa": 8, "Krasnodar": 8, "Dnipro": 8, "Saratov": 8, "Donetsk": 8,
-                    "Tyumen": 8, "Tolyatti": 8, "Lviv": 8, "Zaporizhzhia": 8, "Izhevsk": 8,
-                    "Barnaul": 8, "Ulyanovsk": 8, "Irkutsk": 8, "Khabarovsk": 8, "Makhachkala": 8,
-                    "Vladivostok": 8, "Yaroslavl": 8, "Orenburg": 8, "Tomsk": 8, "Kemerovo": 8,
-                    "Ryazan": 8, "Naberezhnye Chelny": 8, "Astana": 8, "Penza": 8, "Kirov": 8,
-                    "Lipetsk": 8, "Cheboksary": 8, "Balashikha": 8, "Mykolaiv": 8,
-                    "default": 5
-                }
-                
-                daily_limit = city_limits.get(city_normalized, city_limits["default"])
+                today = self.days.today(city_normalized)
+                
+                daily_limit = self.city_config.daily_limit(city_normalized)
                 
                 # Check current daily usage
                 cursor.execute('''
@@ -1815,8 +1755,11 @@ class Database:
                 
                 result = cursor.fetchone()
                 
+                # Unflushed increments count too
+                pending = self.write_behind.pending_bots_shown(user_id, city_normalized, today)
+                
                 if result:
-                    bots_shown = result[0]
+                    bots_shown = result[0] + pending
                     if bots_shown >= daily_limit:
                         logging.info(f"User {user_id} reached daily limit of {daily_limit} bots in {city_normalized}")
                         return []  # No more bots today
@@ -1827,20 +1770,22 @@ class Database:
                         INSERT INTO daily_bot_limits (user_id, city_normalized, date, daily_limit)
                         VALUES (?, ?, ?, ?)
                     ''', (user_id, city_normalized, today, daily_limit))
-                    remaining_limit = daily_limit
+                    remaining_limit = daily_limit - pending
+                    if remaining_limit <= 0:
+                        return []
                 
                 # Adjust query limit to remaining bots
-                actual_limit = min(10, remaining_limit)
+                actual_limit = min(limit, remaining_limit)
                 
                 # Build WHERE conditions for exact city only
+                # Liked / viewed today profiles are skipped in memory via the seen set
+                active, active_params, ranks = self._active_bots([city_normalized])
                 conditions = [
-                    "p.user_id != ?", 
+                    "p.user_id != ?",
                     "p.city_normalized = ?",
-                    "p.user_id NOT IN (SELECT to_user_id FROM likes WHERE from_user_id = ?)",
-                    "p.user_id NOT IN (SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = DATE('now'))",
-                    "(p.is_bot = 0 OR (p.city_normalized = ? AND p.last_rotation_date = DATE('now')))"
+                    active
                 ]
-                params = [user_id, city_normalized, user_id, user_id, city_normalized]
+                params = [user_id, city_normalized] + active_params
                 
                 # Add gender filter
                 if gender_filter and gender_filter != 'all':
@@ -1861,19 +1806,11 @@ class Database:
                 
                 query = f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
                     WHERE {' AND '.join(conditions)}
-                    AND dbo.city_normalized = ?
-                    AND dbo.date = DATE('now')
-                    ORDER BY dbo.order_index
-                    LIMIT ?
                 '''
-                
-                params.extend([city_normalized, actual_limit])
-                
+
                 cursor.execute(query, params)
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, actual_limit)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} in exact city '{city_normalized}' with filters (limit: {actual_limit})")
                 return profiles
@@ -1883,47 +1820,14 @@ class Database:
             return []
 
     def increment_daily_bot_count(self, user_id: int, city_normalized: str) -> bool:
-        """Increment daily bot counter for user"""
+        """Increment daily bot counter for user (buffered, see WriteBehindQueue)"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
+            today = self.days.today(city_normalized)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Update or insert daily limit record
-                cursor.execute('''
-                    UPDATE daily_bot_limits 
-                    SET bots_shown = bots_shown + 1
-                    WHERE user_id = ? AND city_normalized = ? AND date = ?
-                ''', (user_id, city_normalized, today))
-                
-                if cursor.rowcount == 0:
-                    # Create new record if doesn't exist
-                    city_limits = {
-                        "Kyiv": 15, "Moscow": 15, "Saint Petersburg": 12, "Minsk": 12,
-                        "Novosibirsk": 10, "Yekaterinburg": 10, "Tashkent": 10, "Kazan": 10,
-                        "Kharkiv": 10, "Nizhny Novgorod": 10, "Chelyabinsk": 10, "Almaty": 10,
-                        "Samara": 10, "Ufa": 10, "Rostov-on-Don": 10, "Krasnoyarsk": 10,
-                        "Omsk": 10, "Voronezh": 10, "Perm": 10, "Volgograd": 10,
-                        "Odesa": 8, "Krasnodar": 8, "Dnipro": 8, "Saratov": 8, "Donetsk": 8,
-                        "Tyumen": 8, "Tolyatti": 8, "Lviv": 8, "Zaporizhzhia": 8, "Izhevsk": 8,
-                        "Barnaul": 8, "Ulyanovsk": 8, "Irkutsk": 8, "Khabarovsk": 8, "Makhachkala": 8,
-                        "Vladivostok": 8, "Yaroslavl": 8, "Orenburg": 8, "Tomsk": 8, "Kemerovo": 8,
-                        "Ryazan": 8, "Naberezhnye Chelny": 8, "Astana": 8, "Penza": 8, "Kirov": 8,
-                        "Lipetsk": 8, "Cheboksary": 8, "Balashikha": 8, "Mykolaiv": 8,
-                        "default": 5
-                    }
-                    
-                    daily_limit = city_limits.get(city_normalized, city_limits["default"])
-                    
-                    cursor.execute('''
-                        INSERT INTO daily_bot_limits (user_id, city_normalized, date, daily_limit, bots_shown)
-                        VALUES (?, ?, ?, ?, 1)
-                    ''', (user_id, city_normalized, today, daily_limit))
-                
-                conn.commit()
-                logging.info(f"Incremented daily bot count for user {user_id} in {city_normalized}")
-                return True
+            daily_limit = self.city_config.daily_limit(city_normalized)
+            self.write_behind.increment_bots_shown(user_id, city_normalized, today, daily_limit)
+            logging.info(f"Incremented daily bot count for user {user_id} in {city_normalized}")
+            return True
                 
         except sqlite3.Error as e:
             logging.error(f"Error incrementing daily bot count: {e}")
@@ -1932,9 +1836,9 @@ class Database:
     def get_daily_bot_status(self, user_id: int, city_normalized: str) -> Dict[str, Any]:
         """Get daily bot status for user"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
+            today = self.days.today(city_normalized)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -1943,9 +1847,12 @@ class Database:
                 ''', (user_id, city_normalized, today))
                 
                 result = cursor.fetchone()
+                # Unflushed increments count too
+                pending = self.write_behind.pending_bots_shown(user_id, city_normalized, today)
                 
                 if result:
                     bots_shown, daily_limit = result
+                    bots_shown += pending
                     remaining = max(0, daily_limit - bots_shown)
                     return {
                         "shown": bots_shown,
@@ -1954,29 +1861,13 @@ class Database:
                         "reached_limit": bots_shown >= daily_limit
                     }
                 else:
-                    # New user - get default limit
-                    city_limits = {
-                        "Kyiv": 15, "Moscow": 15, "Saint Petersburg": 12, "Minsk": 12,
-                        "Novosibirsk": 10, "Yekaterinburg": 10, "Tashkent": 10, "Kazan": 10,
-                        "Kharkiv": 10, "Nizhny Novgorod": 10, "Chelyabinsk": 10, "Almaty": 10,
-                        "Samara": 10, "Ufa": 10, "Rostov-on-Don": 10, "Krasnoyarsk": 10,
-                        "Omsk": 10, "Voronezh": 10, "Perm": 10, "Volgograd": 10,
-                        "Odesa": 8, "Krasnodar": 8, "Dnipro": 8, "Saratov": 8, "Donetsk": 8,
-                        "Tyumen": 8, "Tolyatti": 8, "Lviv": 8, "Zaporizhzhia": 8, "Izhevsk": 8,
-                        "Barnaul": 8, "Ulyanovsk": 8, "Irkutsk": 8, "Khabarovsk": 8, "Makhachkala": 8,
-                        "Vladivostok": 8, "Yaroslavl": 8, "Orenburg": 8, "Tomsk": 8, "Kemerovo": 8,
-                        "Ryazan": 8, "Naberezhnye Chelny": 8, "Astana": 8, "Penza": 8, "Kirov": 8,
-                        "Lipetsk": 8, "Cheboksary": 8, "Balashikha": 8, "Mykolaiv": 8,
-                        "default": 5
-                    }
-                    
-                    daily_limit = city_limits.get(city_normalized, city_limits["default"])
+                    daily_limit = self.city_config.daily_limit(city_normalized)
                     
                     return {
-                        "shown": 0,
+                        "shown": pending,
                         "limit": daily_limit,
-                        "remaining": daily_limit,
-                        "reached_limit": False
+                        "remaining": max(0, daily_limit - pending),
+                        "reached_limit": pending >= daily_limit
                     }
                 
         except sqlite3.Error as e:
@@ -1988,44 +1879,36 @@ class Database:
                 "reached_limit": False
             }
 
-    def get_profiles_for_swiping_with_filters(self, user_id: int, city_normalized: str = None, gender_filter: str = None, who_pays_filter: str = None) -> List[Dict[str, Any]]:
+    def get_profiles_for_swiping_with_filters(self, user_id: int, city_normalized: str = None, gender_filter: str = None, who_pays_filter: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Get profiles for swiping with premium filters applied"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 
-                # Build WHERE conditions
-                conditions = ["p.user_id != ?", "p.user_id NOT IN (SELECT to_user_id FROM likes WHERE from_user_id = ?)"]
-                params = [user_id, user_id]
-                
-                # Exclude profiles viewed today
-                conditions.append("p.user_id NOT IN (SELECT profile_id FROM profile_views WHERE user_id = ? AND view_date = DATE('now'))")
-                params.append(user_id)
+                # Build WHERE conditions; liked / viewed today profiles are skipped in memory via the seen set
+                conditions = ["p.user_id != ?"]
+                params = [user_id]
                 
                 # Add city filter
                 if city_normalized:
-                    # For real users: include nearby cities for premium users
-                    # For bots: only show in their own city
-                    nearby_cities = {
-                        'Kyiv': ['Kharkiv', 'Odesa', 'Lviv', 'Dnipro'],
-                        'Kharkiv': ['Kyiv', 'Poltava', 'Sumy'],
-                        'Odesa': ['Kyiv', 'Mykolaiv', 'Kherson'],
-                        'Lviv': ['Kyiv', 'Ivano-Frankivsk', 'Ternopil'],
-                        'Dnipro': ['Kyiv', 'Zaporizhzhia', 'Kryvyi Rih'],
-                    }
-                    
                     # Separate logic for real users vs bots
                     # For real users: include nearby cities
                     # For bots: only their own city
-                    all_cities = [city_normalized] + nearby_cities.get(city_normalized, [])
+                    all_cities = [city_normalized] + self.get_nearby_cities(city_normalized)
                     city_placeholders = ','.join(['?' for _ in all_cities])
                     conditions.append(f"p.city_normalized IN ({city_placeholders})")
                     params.extend(all_cities)
                     
-                    # Add additional condition: if it's a bot, only show in their own city AND only if active today
-                    conditions.append("(p.is_bot = 0 OR (p.city_normalized = ? AND p.last_rotation_date = DATE('now')))")
-                    params.append(city_normalized)
+                    # Bots are only shown in their own city, and only the ones active today
+                    active, active_params, ranks = self._active_bots([city_normalized])
+                else:
+                    rotation_cities = self.city_config.snapshot.rotation_cities
+                    conditions.append(f"p.city_normalized IN ({','.join('?' * len(rotation_cities))})")
+                    params.extend(rotation_cities)
+                    active, active_params, ranks = self._active_bots(rotation_cities)
+                conditions.append(active)
+                params.extend(active_params)
                 
                 # Add gender filter
                 if gender_filter and gender_filter != 'all':
@@ -2046,17 +1929,11 @@ class Database:
                 
                 query = f'''
                     SELECT p.* FROM profiles p
-                    JOIN daily_bot_order dbo ON p.user_id = dbo.bot_user_id
                     WHERE {' AND '.join(conditions)}
-                    AND dbo.city_normalized = p.city_normalized
-                    AND dbo.date = DATE('now')
-                    ORDER BY dbo.order_index
-                    LIMIT 10
                 '''
-                
+
                 cursor.execute(query, params)
-                results = cursor.fetchall()
-                profiles = [dict(row) for row in results]
+                profiles = self._take_unseen(self._in_bot_order(cursor, ranks), user_id, limit)
                 
                 logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id} with filters: gender={gender_filter}, who_pays={who_pays_filter}")
                 return profiles
@@ -2065,5 +1942,25 @@ class Database:
             logging.error(f"Error getting profiles with filters: {e}")
             return []
 
+class LazyDatabase:
+    """Global Database that opens (and migrates) drink_bot.db on first use, not on import"""
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._db: Optional[Database] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> Database:
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = Database(*self._args, **self._kwargs)
+        return self._db
+
+    def __getattr__(self, name):
+        return getattr(self.open(), name)
+
+
 # Global database instance
-db = Database()
+db = LazyDatabase()
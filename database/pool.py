@@ -0,0 +1,133 @@
+"""
+SQLite connection pool for the Database class
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+pool_logger = logging.getLogger('database.pool')
+
+
+class ConnectionPool:
+    """Bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily and configured once (journal mode, synchronous,
+    cache size), so page cache and prepared statements survive between calls.
+    A thread that already holds a connection gets the same one back on nested
+    use instead of waiting for a second one.
+    """
+
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0,
+                 journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 cache_size_kb: int = 8192, cached_statements: int = 256):
+        self.db_path = db_path
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.cached_statements = cached_statements
+
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection and apply per-connection settings once"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        if self.cache_size_kb:
+            # Negative value means size in KiB instead of pages
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        pool_logger.debug(f"Opened pooled connection #{len(self._connections) + 1} to {self.db_path}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = len(self._connections) < self.size
+            if can_open:
+                conn = self._open()
+                self._connections.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Connection pool exhausted ({self.size} connections busy for {self.timeout}s)"
+            )
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn not in self._connections:
+                # Pool was closed while the connection was in use
+                conn.close()
+                return
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commit on success, roll back on error.
+
+        Mirrors ``with sqlite3.connect(...) as conn`` semantics so existing
+        code keeps working, but the connection goes back to the pool.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            row_factory = held.row_factory
+            try:
+                yield held
+            finally:
+                held.row_factory = row_factory
+            return
+
+        conn = self._acquire()
+        conn.row_factory = None
+        self._local.conn = conn
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Close idle connections and forget busy ones (they close on release)"""
+        with self._lock:
+            self._connections = []
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                pool_logger.warning(f"Error closing pooled connection: {e}")
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._connections)
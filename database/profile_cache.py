@@ -0,0 +1,98 @@
+"""
+Shared in-process cache of profile rows
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Cached "no profiles row" for unregistered users, returned by ProfileCache.get
+MISSING = object()
+
+
+def _sizeof(profile: Dict[str, Any]) -> int:
+    """Approximate heap size of a profile dict with its keys and values"""
+    if profile is MISSING:
+        return sys.getsizeof(profile)
+    return sys.getsizeof(profile) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in profile.items())
+
+
+class ProfileCache:
+    """Bounded LRU/TTL cache of profile dicts keyed by user_id.
+
+    Entries expire after ``ttl_seconds`` so writes made by other processes
+    (bot scripts) show up eventually; writes through Database invalidate
+    immediately. A user without a profile row is cached as ``MISSING`` with
+    the same TTL, so unregistered users don't query on every lookup. The
+    least recently used entries are evicted once either ``max_entries`` or
+    ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 300, max_bytes: int = 16 * 2**20):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()  # user_id -> (profile, expires_at, size)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(user_id)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put_missing(self, user_id: int):
+        """Remember that user_id has no profile row"""
+        self.put(user_id, MISSING)
+
+    def put(self, user_id: int, profile: Dict[str, Any]):
+        size = _sizeof(profile)
+        with self._lock:
+            self._remove(user_id)
+            self._entries[user_id] = (profile, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._remove(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,151 @@
+"""
+In-process daily bot rotation: per-city day boundary, staggered, claimed once across instances
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from database.business_day import utc_today
+
+rotation_logger = logging.getLogger('database.rotation_scheduler')
+
+# _run_city result when another instance is rotating the city right now
+BUSY = 'busy'
+
+
+class RotationScheduler:
+    """Rotates each city once per day, as soon as its day starts.
+
+    Every ``poll_interval`` seconds the cities whose ``day_for(city)`` moved
+    on since their last rotation are rotated one by one, ``stagger`` seconds
+    apart, so midnight is not a single write spike. ``rotate(city, day)``
+    runs in a worker thread and returns the number of active bots. A
+    ``rotation_runs`` row is claimed first: another instance (or a restart)
+    that finds the row done skips the city, one that finds it running looks
+    again on the next poll; a failed run, or one stuck in 'running' for
+    ``stale_after`` seconds, can be claimed again.
+    """
+
+    def __init__(self, pool, rotate: Callable[[str, str], int], cities: Callable[[], Iterable[str]],
+                 day_for: Callable[[str], str] = None, stagger: float = 2.0, poll_interval: float = 30.0,
+                 stale_after: float = 600.0, owner: str = None):
+        self.pool = pool
+        self.rotate = rotate
+        self.cities = cities
+        self.day_for = day_for or (lambda city_normalized: utc_today())
+        self.stagger = stagger
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.runs = 0
+        self.skipped = 0
+        self.busy = 0
+        self.failures = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self._rotated: Dict[str, str] = {}
+
+    def due(self) -> Dict[str, str]:
+        """city -> day for cities not rotated by this instance on their current day"""
+        due = {}
+        for city in self.cities():
+            day = self.day_for(city)
+            if self._rotated.get(city) != day:
+                due[city] = day
+        return due
+
+    def claim(self, city_normalized: str, day: str) -> bool:
+        """Take the (city, day) run; False if it is done or running elsewhere"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO rotation_runs (city_normalized, date, owner) VALUES (?, ?, ?)
+                ON CONFLICT(city_normalized, date) DO UPDATE SET
+                    owner = excluded.owner, status = 'running', started_at = CURRENT_TIMESTAMP,
+                    finished_at = NULL, duration_ms = NULL
+                WHERE rotation_runs.status = 'failed'
+                   OR (rotation_runs.status = 'running' AND rotation_runs.started_at < DATETIME('now', ?))
+            ''', (city_normalized, day, self.owner, f'-{int(self.stale_after)} seconds'))
+            conn.commit()
+            return cursor.rowcount == 1
+
+    def finish(self, city_normalized: str, day: str, bots: Optional[int], seconds: float, ok: bool):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                UPDATE rotation_runs
+                SET status = ?, bots = ?, finished_at = CURRENT_TIMESTAMP, duration_ms = ?
+                WHERE city_normalized = ? AND date = ? AND owner = ?
+            ''', ('done' if ok else 'failed', bots, int(seconds * 1000), city_normalized, day, self.owner))
+            conn.commit()
+
+    def run_status(self, city_normalized: str, day: str) -> Optional[str]:
+        with self.pool.connection() as conn:
+            row = conn.execute('SELECT status FROM rotation_runs WHERE city_normalized = ? AND date = ?',
+                               (city_normalized, day)).fetchone()
+        return row[0] if row else None
+
+    def _run_city(self, city_normalized: str, day: str) -> Union[float, str, None]:
+        """Claim and rotate one city (worker thread): seconds spent, None if done elsewhere, BUSY if running elsewhere"""
+        if not self.claim(city_normalized, day):
+            if self.run_status(city_normalized, day) != 'done':
+                return BUSY  # look again on the next poll
+            return None
+        started = time.perf_counter()
+        try:
+            bots = self.rotate(city_normalized, day)
+        except Exception:
+            self.finish(city_normalized, day, None, time.perf_counter() - started, ok=False)
+            raise
+        seconds = time.perf_counter() - started
+        self.finish(city_normalized, day, bots, seconds, ok=True)
+        rotation_logger.info(f"Rotated {city_normalized} for {day}: {bots} bots in {seconds * 1000:.0f} ms")
+        return seconds
+
+    async def run_once(self) -> int:
+        """Rotate every due city, return how many this instance rotated"""
+        rotated = 0
+        for city, day in self.due().items():
+            if rotated and self.stagger:
+                await asyncio.sleep(self.stagger)
+            try:
+                seconds = await asyncio.to_thread(self._run_city, city, day)
+            except Exception as e:
+                self.failures += 1
+                rotation_logger.error(f"Rotation of {city} for {day} not done: {e}")
+                continue  # retried on the next poll
+            if seconds == BUSY:
+                self.busy += 1
+                rotation_logger.debug(f"Rotation of {city} for {day} is running in another instance")
+                continue
+            self._rotated[city] = day
+            if seconds is None:
+                self.skipped += 1
+                continue
+            rotated += 1
+            self.runs += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+        return rotated
+
+    async def run_forever(self):
+        """Background task: catch up on start, then follow each city's day boundary"""
+        while True:
+            try:
+                if await self.run_once():
+                    rotation_logger.info(f"Rotation stats: {self.stats()}")
+            except Exception as e:
+                rotation_logger.error(f"Rotation scheduler error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'busy': self.busy,
+            'failures': self.failures,
+            'total_seconds': self.total_seconds,
+            'max_seconds': self.max_seconds,
+            'avg_seconds': self.total_seconds / self.runs if self.runs else 0.0,
+        }
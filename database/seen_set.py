@@ -0,0 +1,117 @@
+"""
+Per-user exclusion sets for swipe candidate selection
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Iterable, Tuple
+
+from database.business_day import utc_today
+
+
+def _contains(ids: array, profile_id: int) -> bool:
+    i = bisect_left(ids, profile_id)
+    return i < len(ids) and ids[i] == profile_id
+
+
+def _insert(ids: array, profile_id: int):
+    i = bisect_left(ids, profile_id)
+    if i == len(ids) or ids[i] != profile_id:
+        ids.insert(i, profile_id)
+
+
+class SeenSet:
+    """Profiles one user must not be offered: liked ever, viewed on ``day``.
+
+    Ids are kept in sorted ``array('q')`` (8 bytes each) with binary-search
+    membership, so checks stay O(log n) however long the like history gets.
+    """
+    __slots__ = ('liked', 'viewed', 'day')
+
+    def __init__(self, liked: Iterable[int] = (), viewed: Iterable[int] = (), day: str = None):
+        self.liked = array('q', sorted(set(liked)))
+        self.viewed = array('q', sorted(set(viewed)))
+        self.day = day or utc_today()
+
+    def has_liked(self, profile_id: int) -> bool:
+        return _contains(self.liked, profile_id)
+
+    def has_viewed(self, profile_id: int) -> bool:
+        return _contains(self.viewed, profile_id)
+
+    def __contains__(self, profile_id: int) -> bool:
+        return self.has_liked(profile_id) or self.has_viewed(profile_id)
+
+    def __len__(self):
+        return len(self.liked) + len(self.viewed)
+
+
+class SeenSets:
+    """LRU of SeenSet per user, loaded once and then kept current by writes.
+
+    ``loader(user_id)`` returns ``(liked_ids, viewed_today_ids)``. Writes that
+    arrive while a user's set is loading are replayed on top of the result, so
+    a swipe racing with the first load is never lost. Viewed ids reset when
+    the user's day (``day_for(user_id)``, UTC by default) changes, one user at
+    a time on their next read.
+    """
+
+    def __init__(self, loader: Callable[[int], Tuple[Iterable[int], Iterable[int]]], max_users: int = 10000,
+                 day_for: Callable[[int], str] = None):
+        self.loader = loader
+        self.max_users = max_users
+        self.day_for = day_for or (lambda user_id: utc_today())
+        self.loads = 0
+        self._sets = OrderedDict()
+        self._loading = {}  # user_id -> [(kind, profile_id)] seen during load
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> SeenSet:
+        today = self.day_for(user_id)
+        with self._lock:
+            seen = self._sets.get(user_id)
+            if seen is not None:
+                self._sets.move_to_end(user_id)
+                if seen.day != today:
+                    seen.viewed = array('q')
+                    seen.day = today
+                return seen
+            self._loading.setdefault(user_id, [])
+
+        try:
+            liked, viewed = self.loader(user_id)
+            seen = SeenSet(liked, viewed, today)
+        finally:
+            with self._lock:
+                replay = self._loading.pop(user_id, [])
+        with self._lock:
+            for kind, profile_id in replay:
+                _insert(seen.liked if kind == 'liked' else seen.viewed, profile_id)
+            self._sets[user_id] = seen
+            self.loads += 1
+            while len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+        return seen
+
+    def _add(self, kind: str, user_id: int, profile_id: int):
+        with self._lock:
+            if user_id in self._loading:
+                self._loading[user_id].append((kind, profile_id))
+            seen = self._sets.get(user_id)
+            if seen is not None:
+                _insert(seen.liked if kind == 'liked' else seen.viewed, profile_id)
+
+    def add_liked(self, user_id: int, profile_id: int):
+        self._add('liked', user_id, profile_id)
+
+    def add_viewed(self, user_id: int, profile_id: int):
+        self._add('viewed', user_id, profile_id)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._sets.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
@@ -0,0 +1,162 @@
+"""
+Precomputed swipe decks: an ordered queue of candidate user_ids per swiper
+"""
+import logging
+import threading
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+deck_logger = logging.getLogger('database.swipe_deck')
+
+# The city's business day is part of the key: when a city's day rolls over only its decks go stale
+DeckKey = namedtuple('DeckKey', 'city_normalized gender_filter who_pays_filter exact date')
+
+
+class _Deck:
+    __slots__ = ('key', 'queue', 'served', 'exhausted', 'refilling')
+
+    def __init__(self, key: DeckKey):
+        self.key = key
+        self.queue = deque()
+        self.served = set()  # popped ids, never re-queued for this key
+        self.exhausted = False
+        self.refilling = False
+
+
+class SwipeDeck:
+    """Materialized swipe queues, one per active swiper.
+
+    Opening the feed with an existing deck costs a dict lookup; each swipe
+    pops one id. When a queue drops to ``low_watermark`` the next batch is
+    fetched on a background thread. Likes and views discard ids, profile and
+    filter edits drop whole decks, rotation drops the rotated cities' decks.
+    """
+
+    def __init__(self, database, batch_size: int = 30, low_watermark: int = 5, max_decks: int = 10000):
+        self.db = database
+        self.batch_size = batch_size
+        self.low_watermark = low_watermark
+        self.max_decks = max_decks
+        self._decks = OrderedDict()  # user_id -> _Deck, least recently used first
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='swipe-deck')
+
+    def make_key(self, city_normalized: str, gender_filter: str = None, who_pays_filter: str = None, exact: bool = False) -> DeckKey:
+        # 'all' / 'any' mean "no filter", same as in the swipe queries
+        if gender_filter == 'all':
+            gender_filter = None
+        if who_pays_filter == 'any':
+            who_pays_filter = None
+        today = self.db.days.today(city_normalized)
+        return DeckKey(city_normalized, gender_filter, who_pays_filter, bool(exact), today)
+
+    def _fetch(self, user_id: int, key: DeckKey) -> list:
+        """Run the swipe query for one batch of candidates"""
+        if key.exact:
+            rows = self.db.get_profiles_for_swiping_exact_city(
+                user_id, key.city_normalized, gender_filter=key.gender_filter,
+                who_pays_filter=key.who_pays_filter, limit=self.batch_size)
+        else:
+            rows = self.db.get_profiles_for_swiping_with_filters(
+                user_id, city_normalized=key.city_normalized, gender_filter=key.gender_filter,
+                who_pays_filter=key.who_pays_filter, limit=self.batch_size)
+        return [row['user_id'] for row in rows]
+
+    def _merge(self, user_id: int, deck: _Deck, ids: list):
+        """Append fetched ids that are neither queued nor served (caller holds the lock)"""
+        if self._decks.get(user_id) is not deck:
+            return  # invalidated while the batch was loading
+        queued = set(deck.queue)
+        deck.queue.extend(i for i in ids if i not in queued and i not in deck.served)
+        deck.exhausted = len(ids) < self.batch_size
+
+    def _deck_for(self, user_id: int, key: DeckKey) -> _Deck:
+        """Return the user's deck for key, building it synchronously if needed"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None and deck.key == key:
+                self._decks.move_to_end(user_id)
+                return deck
+            deck = _Deck(key)
+            self._decks[user_id] = deck
+            while len(self._decks) > self.max_decks:
+                self._decks.popitem(last=False)
+
+        ids = self._fetch(user_id, key)
+        with self._lock:
+            self._merge(user_id, deck, ids)
+        deck_logger.debug(f"Built swipe deck for user {user_id}: {len(deck.queue)} candidates")
+        return deck
+
+    def _refill(self, user_id: int, deck: _Deck):
+        try:
+            ids = self._fetch(user_id, deck.key)
+            with self._lock:
+                self._merge(user_id, deck, ids)
+        except Exception as e:
+            deck_logger.error(f"Error refilling swipe deck for user {user_id}: {e}")
+        finally:
+            deck.refilling = False
+
+    def open(self, user_id: int, key: DeckKey) -> int:
+        """Make sure the deck exists, return how many candidates are queued"""
+        return len(self._deck_for(user_id, key).queue)
+
+    def pop(self, user_id: int, key: DeckKey) -> Optional[int]:
+        """Take the next candidate id, or None when the deck is empty"""
+        deck = self._deck_for(user_id, key)
+        with self._lock:
+            candidate_id = deck.queue.popleft() if deck.queue else None
+            if candidate_id is not None:
+                deck.served.add(candidate_id)
+            needs_refill = (len(deck.queue) <= self.low_watermark
+                            and not deck.exhausted and not deck.refilling)
+            if needs_refill:
+                deck.refilling = True
+
+        if needs_refill:
+            self._executor.submit(self._refill, user_id, deck)
+        return candidate_id
+
+    def discard(self, user_id: int, candidate_id: int):
+        """Drop one candidate from the user's deck (liked or viewed elsewhere)"""
+        with self._lock:
+            deck = self._decks.get(user_id)
+            if deck is not None:
+                deck.served.add(candidate_id)
+                try:
+                    deck.queue.remove(candidate_id)
+                except ValueError:
+                    pass
+
+    def invalidate_user(self, user_id: int):
+        """Forget the user's own deck (their city or filters changed)"""
+        with self._lock:
+            self._decks.pop(user_id, None)
+
+    def drop_candidate(self, candidate_id: int):
+        """Remove a changed profile from every deck; refills re-add it if it still matches"""
+        with self._lock:
+            for deck in self._decks.values():
+                try:
+                    deck.queue.remove(candidate_id)
+                except ValueError:
+                    pass
+
+    def invalidate_city(self, city_normalized: str, day: str):
+        """Forget the decks a city's rotation for that day changes (its own, and city-less ones that show every city)"""
+        with self._lock:
+            stale = [user_id for user_id, deck in self._decks.items()
+                     if deck.key.city_normalized is None
+                     or (deck.key.city_normalized == city_normalized and deck.key.date == day)]
+            for user_id in stale:
+                del self._decks[user_id]
+
+    def invalidate_all(self):
+        """Forget every deck (bot rotation changes who is visible)"""
+        with self._lock:
+            self._decks.clear()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,172 @@
+"""
+Write-behind queue for high-frequency idempotent writes
+"""
+import logging
+import threading
+import time
+from typing import Dict, Set, Tuple
+
+from database.business_day import utc_today
+
+wb_logger = logging.getLogger('database.write_behind')
+
+
+class WriteBehindQueue:
+    """Buffers view marks and daily bot counters, commits them in batches.
+
+    Writes land in memory and are flushed by a background thread in one
+    ``executemany`` transaction every ``flush_interval`` seconds, or as soon as
+    ``max_pending`` entries are buffered. Reads consult ``pending_views`` and
+    ``pending_bots_shown`` so unflushed entries are visible immediately.
+    ``flush_interval <= 0`` disables buffering: every write is committed at once.
+    """
+
+    def __init__(self, pool, flush_interval: float = 0.5, max_pending: int = 1000):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushes = 0
+        self.flushed_rows = 0
+
+        # (profile_id, view_date) per viewer, (user_id, city, date) -> [delta, daily_limit]
+        self._views: Dict[int, Set[Tuple[int, str]]] = {}
+        self._counters: Dict[Tuple[int, str, str], list] = {}
+        self._pending = 0
+        # Batch being written: still visible to reads until committed
+        self._inflight_views: Dict[int, Set[Tuple[int, str]]] = {}
+        self._inflight_counters: Dict[Tuple[int, str, str], list] = {}
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _added(self):
+        """Start the flusher lazily, wake it on size threshold (caller holds the lock)"""
+        self._pending += 1
+        if self._thread is None and self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+        if self._pending >= self.max_pending:
+            self._wake.set()
+
+    def _write_through(self):
+        if self.flush_interval <= 0 or self._closed:
+            self.flush()
+
+    def mark_viewed(self, user_id: int, profile_id: int, view_date: str = None) -> bool:
+        """Queue a profile_views row, False if it is already pending"""
+        entry = (profile_id, view_date or utc_today())
+        with self._lock:
+            views = self._views.setdefault(user_id, set())
+            if entry in views or entry in self._inflight_views.get(user_id, ()):
+                return False
+            views.add(entry)
+            self._added()
+        self._write_through()
+        return True
+
+    def increment_bots_shown(self, user_id: int, city_normalized: str, date: str, daily_limit: int):
+        """Queue +1 to daily_bot_limits.bots_shown, repeated increments coalesce"""
+        key = (user_id, city_normalized, date)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                self._counters[key] = [1, daily_limit]
+                self._added()
+            else:
+                counter[0] += 1
+        self._write_through()
+
+    def pending_views(self, user_id: int, view_date: str = None) -> Set[int]:
+        """Profile ids marked as viewed on view_date but not yet committed"""
+        view_date = view_date or utc_today()
+        with self._lock:
+            entries = self._views.get(user_id, set()) | self._inflight_views.get(user_id, set())
+        return {profile_id for profile_id, day in entries if day == view_date}
+
+    def pending_bots_shown(self, user_id: int, city_normalized: str, date: str) -> int:
+        key = (user_id, city_normalized, date)
+        with self._lock:
+            return self._counters.get(key, (0,))[0] + self._inflight_counters.get(key, (0,))[0]
+
+    def __len__(self):
+        return self._pending
+
+    def flush(self) -> int:
+        """Commit everything buffered in one transaction, return rows written"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                views, self._views = self._views, {}
+                counters, self._counters = self._counters, {}
+                self._inflight_views, self._inflight_counters = views, counters
+                self._pending = 0
+
+            view_rows = [(user_id, profile_id, day) for user_id, entries in views.items() for profile_id, day in entries]
+            counter_rows = [(user_id, city, day, limit, delta) for (user_id, city, day), (delta, limit) in counters.items()]
+            try:
+                with self.pool.connection() as conn:
+                    conn.executemany('''
+                        INSERT OR IGNORE INTO profile_views (user_id, profile_id, view_date)
+                        VALUES (?, ?, ?)
+                    ''', view_rows)
+                    conn.executemany('''
+                        INSERT INTO daily_bot_limits (user_id, city_normalized, date, daily_limit, bots_shown)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(user_id, city_normalized, date)
+                        DO UPDATE SET bots_shown = bots_shown + excluded.bots_shown
+                    ''', counter_rows)
+                    conn.commit()
+            except Exception as e:
+                wb_logger.error(f"Write-behind flush failed, {len(view_rows) + len(counter_rows)} rows kept: {e}")
+                with self._lock:
+                    self._requeue(views, counters)
+                raise
+            finally:
+                with self._lock:
+                    self._inflight_views, self._inflight_counters = {}, {}
+
+            written = len(view_rows) + len(counter_rows)
+            self.flushes += 1
+            self.flushed_rows += written
+            return written
+
+    def _requeue(self, views: dict, counters: dict):
+        """Put a failed batch back in front of newer writes (caller holds the lock)"""
+        for user_id, entries in views.items():
+            merged = self._views.setdefault(user_id, set())
+            self._pending += len(entries - merged)
+            merged |= entries
+        for key, (delta, limit) in counters.items():
+            counter = self._counters.get(key)
+            if counter is None:
+                self._counters[key] = [delta, limit]
+                self._pending += 1
+            else:
+                counter[0] += delta
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.flush_interval)  # keep the batch, retry on next tick
+
+    def close(self):
+        """Stop the flusher and drain everything still buffered"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            written = self.flush()
+            if written:
+                wb_logger.info(f"Write-behind queue drained, {written} rows flushed")
+        except Exception as e:
+            wb_logger.error(f"Error draining write-behind queue: {e}")
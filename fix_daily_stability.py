@@ -1,6 +1,8 @@
 import sqlite3
 from datetime import datetime
 
+from database.migrations import run_migrations
+
 def fix_daily_stability():
     """Фиксируем порядок ботов на весь день"""
     
@@ -12,16 +14,8 @@ def fix_daily_stability():
     print("FIXING DAILY STABILITY:")
     print("=" * 50)
     
-    # 1. Создаем временную таблицу для daily order
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_bot_order (
-            city_normalized TEXT,
-            bot_user_id INTEGER,
-            order_index INTEGER,
-            date TEXT,
-            PRIMARY KEY (city_normalized, bot_user_id, date)
-        )
-    ''')
+    # 1. Таблица daily_bot_order и ее индекс создаются миграциями
+    run_migrations(conn)
     
     # 2. Получаем все города с ботами
     cursor.execute('''
@@ -84,12 +78,6 @@ def fix_daily_stability():
         user_id, name, gender, order_index = bot
         print(f"    {order_index}. {name} ({gender})")
     
-    # 5. Создаем индекс для быстрого поиска
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_daily_bot_order_lookup 
-        ON daily_bot_order (city_normalized, date, order_index)
-    ''')
-    
     conn.commit()
     conn.close()
     
@@ -1,32 +1,50 @@
 from aiogram import Router, types, F, Bot
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, LabeledPrice
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, LabeledPrice, InputMediaPhoto
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import Command
 from aiogram.filters.state import StateFilter
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import logging
 from datetime import datetime
 
-from database.models import db
+from database.async_db import async_db as db
+from database.models import SwipeOutcome
 from locales import get_message
+from helpers.swipe_session import SwipeSession
+from helpers.outbox import PRIORITY_LIKE, PRIORITY_MATCH
+from helpers.swipe_card import render_card
+from middlewares.language import update_language, remember_language
 
 router = Router()
-geolocator = Nominatim(user_agent="drink_bot")
 bot_instance = None  # Global bot instance for notifications
+outbox_instance = None  # Rate-limited notification queue (helpers.outbox)
 
 PREMIUM_STARS_PRICE = 150
 PREMIUM_PAYLOAD_PREFIX = "premium_150:"
 
-def set_bot_instance(bot: Bot):
-    """Set global bot instance for notifications"""
-    global bot_instance
+def set_bot_instance(bot: Bot, outbox=None):
+    """Set global bot instance (and notification outbox) for notifications"""
+    global bot_instance, outbox_instance
     bot_instance = bot
+    outbox_instance = outbox
+
+async def send_notification(chat_id: int, text: str, reply_markup=None, priority: int = PRIORITY_LIKE,
+                            coalesce_key: str = None):
+    """Queue a notification to another user; sent inline when no outbox is running"""
+    if outbox_instance is not None:
+        await outbox_instance.enqueue(chat_id, text, priority=priority, reply_markup=reply_markup,
+                                      parse_mode='HTML', coalesce_key=coalesce_key)
+    else:
+        await bot_instance.send_message(chat_id, text, reply_markup=reply_markup, parse_mode='HTML')
 
 async def get_lang(user_id: int, state: FSMContext = None) -> str:
     """Get user language from state first, then database"""
     try:
+        # Already resolved for this update by LanguageMiddleware
+        resolved = update_language(user_id, with_state=state is not None)
+        if resolved is not None:
+            return resolved
+
         # First try to get from state
         if state:
             data = await state.get_data()
@@ -35,7 +53,7 @@ async def get_lang(user_id: int, state: FSMContext = None) -> str:
                 return data['language']
         
         # Then try to get from database
-        lang = db.get_user_language(user_id)
+        lang = await db.get_user_language(user_id)
         if lang != 'ru':  # If not fallback
             logging.info(f"DEBUG: Got language '{lang}' from database for user {user_id}")
             return lang
@@ -46,10 +64,10 @@ async def get_lang(user_id: int, state: FSMContext = None) -> str:
         logging.error(f"Error getting language for user {user_id}: {e}")
         return 'ru'  # Fallback to Russian
 
-def get_user_language(user_id: int) -> str:
-    """Get user language from database (synchronous version)"""
+async def get_user_language(user_id: int) -> str:
+    """Get user language from database (no FSM state lookup)"""
     try:
-        lang = db.get_user_language(user_id)
+        lang = update_language(user_id, with_state=False) or await db.get_user_language(user_id)
         if lang != 'ru':  # If not fallback
             return lang
         return 'ru'  # Fallback to Russian
@@ -145,7 +163,7 @@ async def show_profile_screen(message: types.Message, state: FSMContext):
     try:
         user_id = message.from_user.id
         lang = await get_lang(user_id, state)
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if not profile:
             await message.answer(
                 get_message("need_profile_first", lang),
@@ -343,11 +361,11 @@ async def cmd_start(message: types.Message, state: FSMContext):
         # Update username in DB if profile exists (Telegram usernames can change)
         try:
             if message.from_user.username:
-                db.update_profile(user_id, username=message.from_user.username)
+                await db.update_profile(user_id, username=message.from_user.username)
         except Exception as e:
             logging.warning(f"Failed to update username for user {user_id}: {e}")
 
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         logging.info(f"User profile: {user_profile}")
         
         # Check if user exists and has language set
@@ -404,7 +422,8 @@ async def language_selection_callback(callback: types.CallbackQuery, state: FSMC
     await state.update_data(language=lang_code)
     
     # Save to database
-    db.update_user_language(user_id, lang_code)
+    await db.update_user_language(user_id, lang_code)
+    remember_language(user_id, lang_code)
     
     # Get localized messages
     language_name = {
@@ -423,7 +442,7 @@ async def language_selection_callback(callback: types.CallbackQuery, state: FSMC
     await callback.answer(success_messages.get(lang_code, success_messages['ru']))
     
     # Check if user already has a profile
-    existing_profile = db.get_profile(user_id)
+    existing_profile = await db.get_profile(user_id)
     if existing_profile and existing_profile.get('name'):
         # User has a profile - show main menu
         success_messages_main = {
@@ -476,7 +495,7 @@ async def fill_profile_start(message: types.Message, state: FSMContext):
     language = await get_lang(user_id, state)  # Use state-aware function
     
     # Check if profile already exists
-    existing_profile = db.get_profile(user_id)
+    existing_profile = await db.get_profile(user_id)
     if existing_profile and existing_profile.get('name'):  # Check if profile is actually filled
         language = existing_profile.get('language', language)  # Use profile language if available
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -664,7 +683,7 @@ async def process_gender(callback: types.CallbackQuery, state: FSMContext):
 
 @router.message(RegistrationStates.waiting_for_city)
 async def process_city(message: types.Message, state: FSMContext):
-    """Process city input with geopy validation"""
+    """Process city input, validated against the offline gazetteer and geocode cache"""
     try:
         user_id = message.from_user.id
         logging.info(f"🏙️ process_city called for user {user_id}")
@@ -683,15 +702,13 @@ async def process_city(message: types.Message, state: FSMContext):
             await message.answer(get_message("profile_city_error", lang), parse_mode='HTML')
             return
         
-        # Validate city with geopy (optional)
-        try:
-            location = geolocator.geocode(city_text, timeout=5)
-            if not location:
-                await message.answer(get_message("city_not_found", lang), parse_mode='HTML')
-                return
-        except (GeocoderTimedOut, GeocoderServiceError):
-            # If geopy fails, still accept the city
-            pass
+        # Validate city offline; unknown places are accepted and geocoded in the background
+        location = await db.lookup_city_location(city_text)
+        if location is not None and not location.found:
+            await message.answer(get_message("city_not_found", lang), parse_mode='HTML')
+            return
+        if location is None:
+            db.geocoder.schedule(city_text)
         
         # Save city to state
         city = city_text.lower()
@@ -804,7 +821,7 @@ async def process_photo(message: types.Message, state: FSMContext):
         
         # Save profile to database with error handling
         try:
-            success = db.create_profile(
+            success = await db.create_profile(
                 user_id=message.from_user.id,
                 name=user_data['name'],
                 age=user_data['age'],
@@ -891,7 +908,7 @@ async def show_next_profile(message: types.Message, state: FSMContext):
         
         logging.info(f"DEBUG: Starting search for user {user_id}")
         
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         if not user_profile:
             logging.error(f"DEBUG: User {user_id} has no profile")
             await message.answer(
@@ -909,74 +926,32 @@ async def show_next_profile(message: types.Message, state: FSMContext):
         
         if not user_city_normalized:
             logging.error(f"DEBUG: User {user_id} has no city_normalized, trying to normalize")
-            user_city_normalized = db.normalize_city(user_city or "")
+            user_city_normalized = await db.normalize_city(user_city or "")
             # Update user profile with normalized city
-            db.update_user_city_normalized(user_id, user_city, user_city_normalized)
+            await db.update_user_city_normalized(user_id, user_city, user_city_normalized)
             logging.info(f"DEBUG: Updated user {user_id} city_normalized to '{user_city_normalized}'")
         
-        # Search for profiles using city_normalized
-        logging.info(f"DEBUG: Searching profiles in city_normalized='{user_city_normalized}' for user {user_id}")
-        profiles = db.find_profiles_for_swipe(user_id, city=user_city, limit=50)
-        
-        logging.info(f"DEBUG: Found {len(profiles)} profiles for user {user_id}")
-        if profiles:
-            for i, p in enumerate(profiles[:3]):  # Log first 3 profiles
-                logging.info(f"DEBUG: Profile {i+1}: user_id={p.get('user_id')}, city_normalized='{p.get('city_normalized')}', name='{p.get('name')}'")
-        
-        if not profiles:
-            logging.info(f"DEBUG: No profiles found for user {user_id} in city '{user_city_normalized}'")
-            await message.answer(
-                get_message("no_profiles_nearby", lang, city=user_city.title()),
-                reply_markup=get_dating_keyboard(lang),
-                parse_mode='HTML'
-            )
-            return
+        # The first card comes from the same deck (and saved filters) as every later swipe
+        user_filters = await db.get_user_filters(user_id)
+        deck = {
+            'city_normalized': user_city_normalized,
+            'gender_filter': user_filters.get('gender'),
+            'who_pays_filter': user_filters.get('who_pays'),
+            'exact': False,
+        }
+        available = await db.open_swipe_deck(user_id, **deck)
+        logging.info(f"DEBUG: Swipe deck has {available} profiles for user {user_id} in '{user_city_normalized}'")
         
-        # Check if this is the last profile - show empty message instead
-        if len(profiles) == 1:
-            logging.info(f"DEBUG: Only 1 profile available in nearby cities, showing empty message instead")
+        if not available:
             await message.answer(
-                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
+                get_message("no_profiles_nearby", lang, city=(user_city or '').title()),
                 reply_markup=get_dating_keyboard(lang),
                 parse_mode='HTML'
             )
             return
         
-        profile = profiles[0]
-        lang = await get_lang(message.from_user.id, state)
-        
-        # Get gender text
-        gender_key = {
-            'male': 'gender_male',
-            'female': 'gender_female', 
-            'other': 'gender_other',
-        }.get(profile.get('gender'), 'gender_other')
-        gender_text = get_message(gender_key, lang)
-        
-        profile_text = (
-            f"👤 <b>{profile['name']}, {profile['age']}</b>\n"
-            f"⚧️ {gender_text}\n"
-            f"🏙️ {profile['city'].title()}\n"
-            f"🍺 {profile['favorite_drink']}"
-        )
-        
-        # Add photo if available
-        if profile.get('photo_id'):
-            await message.answer_photo(
-                photo=profile['photo_id'],
-                caption=profile_text,
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
-        else:
-            await message.answer(
-                get_message("no_photo", lang) + f"\n\n{profile_text}",
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
-        
-        # Update current index
-        await state.update_data(current_index=1)
+        await state.update_data(deck=deck, swipe=None, card=None)
+        await show_next_swipe_card(message, user_id, state)
         
     except Exception as e:
         logging.error(f"Error in show_next_profile: {e}")
@@ -989,7 +964,7 @@ async def create_company_start(message: types.Message, state: FSMContext):
     try:
         user_id = message.from_user.id
         lang = await get_lang(user_id, state)
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         if not user_profile:
             await message.answer(
                 get_message("need_profile_first", lang),
@@ -1083,7 +1058,7 @@ async def process_company_max_members(message: types.Message, state: FSMContext)
     try:
         lang = await get_lang(message.from_user.id, state)
         user_id = message.from_user.id
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
 
         try:
             max_members = int((message.text or '').strip())
@@ -1097,7 +1072,7 @@ async def process_company_max_members(message: types.Message, state: FSMContext)
 
         data = await state.get_data()
         city_value = (user_profile.get('city_display') or user_profile.get('city') or '')
-        success = db.create_company(
+        success = await db.create_company(
             creator_id=user_id,
             name=data['company_name'],
             description=data['company_description'],
@@ -1132,7 +1107,7 @@ async def find_companies_start(message: types.Message, state: FSMContext):
     try:
         user_id = message.from_user.id
         lang = await get_lang(user_id, state)
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         if not user_profile:
             await message.answer(
                 get_message("need_profile_first", lang),
@@ -1142,7 +1117,7 @@ async def find_companies_start(message: types.Message, state: FSMContext):
             return
 
         city_value = (user_profile.get('city_display') or user_profile.get('city') or '')
-        companies = db.get_companies_by_city(city_value, limit=10)
+        companies = await db.get_companies_by_city(city_value, limit=10)
         if not companies:
             await message.answer(
                 get_message("no_companies_in_city", lang, city=city_value.title()),
@@ -1157,7 +1132,7 @@ async def find_companies_start(message: types.Message, state: FSMContext):
         )
 
         for company in companies:
-            is_member = db.is_user_in_company(company['id'], user_id)
+            is_member = await db.is_user_in_company(company['id'], user_id)
             button_text = get_message("leave_company", lang) if is_member else get_message("join_company", lang)
             button_callback = f"leave_company_{company['id']}" if is_member else f"join_company_{company['id']}"
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -1183,7 +1158,7 @@ async def show_my_companies(message: types.Message):
     """Show user's companies with member list"""
     try:
         lang = await get_lang(message.from_user.id)
-        companies = db.get_user_companies(message.from_user.id)
+        companies = await db.get_user_companies(message.from_user.id)
         
         if not companies:
             await message.answer(
@@ -1198,7 +1173,7 @@ async def show_my_companies(message: types.Message):
         
         for company in companies:
             # Get company members with usernames
-            members = db.get_company_members_with_usernames(company['id'])
+            members = await db.get_company_members_with_usernames(company['id'])
             
             # Create member list text
             member_list = []
@@ -1234,13 +1209,13 @@ async def join_company_callback(callback: types.CallbackQuery, state: FSMContext
         company_id = int(callback.data.split("_")[2])
         user_id = callback.from_user.id
         
-        success = db.join_company(company_id, user_id)
+        success = await db.join_company(company_id, user_id)
         
         if success:
             await callback.answer("Вы присоединились к компании!")
             await callback.message.answer(
                 "Вы присоединились к компании!",
-                reply_markup=get_companies_keyboard(get_user_language(user_id)),
+                reply_markup=get_companies_keyboard(await get_user_language(user_id)),
                 parse_mode='HTML'
             )
             logging.info(f"DEBUG: User {user_id} successfully joined company {company_id}")
@@ -1258,13 +1233,13 @@ async def leave_company_callback(callback: types.CallbackQuery, state: FSMContex
         company_id = int(callback.data.split("_")[2])
         user_id = callback.from_user.id
         
-        success = db.leave_company(company_id, user_id)
+        success = await db.leave_company(company_id, user_id)
         
         if success:
             await callback.answer("Вы покинули компанию")
             await callback.message.answer(
                 "Вы покинули компанию",
-                reply_markup=get_companies_keyboard(get_user_language(user_id)),
+                reply_markup=get_companies_keyboard(await get_user_language(user_id)),
                 parse_mode='HTML'
             )
             logging.info(f"DEBUG: User {user_id} successfully left company {company_id}")
@@ -1283,7 +1258,7 @@ async def find_company_start(message: types.Message, state: FSMContext):
         
         logging.info(f"DEBUG: find_company_start called for user {user_id}")
         
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         if not user_profile:
             logging.error(f"DEBUG: User {user_id} has no profile in find_company_start")
             await message.answer(
@@ -1332,20 +1307,13 @@ async def send_profile_with_photo(message, profile, user_id, state):
         # Format profile text
         profile_text = f"👤 {profile['name']}, {profile['age']}\n🏙️ {profile['city'].title()}\n🍺 {profile['favorite_drink']}"
         
-        # Send with photo if available
-        if profile.get('photo_id'):
-            await message.answer_photo(
-                photo=profile['photo_id'],
-                caption=profile_text,
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
-        else:
-            await message.answer(
-                get_message("no_photo", lang) + f"\n\n{profile_text}",
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
+        # Replace the current card, with photo if available
+        if not profile.get('photo_id'):
+            profile_text = get_message("no_photo", lang) + f"\n\n{profile_text}"
+        data = await state.get_data()
+        card = await render_card(message.bot, message.chat.id, data.get('card'), profile_text,
+                                 profile.get('photo_id'), get_swipe_keyboard(lang))
+        await state.update_data(card=card)
         
         logging.info(f"DEBUG: Profile sent to user {user_id}")
         
@@ -1363,20 +1331,17 @@ async def handle_back_profile(callback: types.CallbackQuery, state: FSMContext):
         
         # Get current state data
         data = await state.get_data()
-        profiles = data.get('profiles', [])
-        current_index = data.get('current_index', 0)
+        session = SwipeSession.load(data.get('swipe'))
         
-        logging.info(f"DEBUG: Back button pressed. Current index: {current_index}, Total profiles: {len(profiles)}")
+        logging.info(f"DEBUG: Back button pressed. Current position: {session.cursor}, shown profiles: {len(session.ids)}")
         
         # Check if we can go back
-        if current_index > 0 and len(profiles) > 1:
+        prev_id = session.back()
+        prev_profile = await db.get_profile(prev_id) if prev_id is not None else None
+        if prev_profile:
             # Move to previous profile
-            new_index = current_index - 1
-            await state.update_data(current_index=new_index)
-            
-            # Get previous profile
-            prev_profile = profiles[new_index]
-            logging.info(f"DEBUG: Moving back to profile {new_index}: {prev_profile.get('name')}")
+            await state.update_data(swipe=session.pack())
+            logging.info(f"DEBUG: Moving back to profile {prev_id}: {prev_profile.get('name')}")
             
             # Send previous profile
             await send_profile_with_photo(callback.message, prev_profile, user_id, state)
@@ -1385,7 +1350,7 @@ async def handle_back_profile(callback: types.CallbackQuery, state: FSMContext):
             # At first profile or no profiles - return to main menu
             logging.info(f"DEBUG: At first profile or no profiles, returning to main menu")
             
-            lang = get_user_language(user_id)
+            lang = await get_user_language(user_id)
             await callback.message.answer(
                 "Возвращаемся в главное меню...",
                 reply_markup=get_main_keyboard(lang),
@@ -1397,7 +1362,7 @@ async def handle_back_profile(callback: types.CallbackQuery, state: FSMContext):
         
     except Exception as e:
         logging.error(f"Error in handle_back_profile: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer("Ошибка при возврате")
 
 @router.callback_query(F.data.in_(["like", "dislike"]), SwipeStates.swiping)
@@ -1407,24 +1372,11 @@ async def handle_swipe_action(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer()
         
         data = await state.get_data()
-        profiles = data.get('profiles', [])
-        current_index = data.get('current_index', 0)
-        
-        logging.info(f"DEBUG: Swipe action - profiles: {len(profiles)}, current_index: {current_index}")
+        current_profile_id = SwipeSession.load(data.get('swipe')).current
         
-        if not profiles or current_index >= len(profiles):
-            lang = await get_lang(callback.from_user.id, state)
-            await callback.message.answer(
-                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
-                reply_markup=get_dating_keyboard(lang),
-                parse_mode='HTML'
-            )
-            await state.clear()
-            return
+        logging.info(f"DEBUG: Swipe action - current profile: {current_profile_id}")
         
-        # Check if this is the last profile - show empty message instead of showing it
-        if current_index == len(profiles) - 1:
-            logging.info(f"DEBUG: Last profile reached, showing empty message instead")
+        if not current_profile_id:
             lang = await get_lang(callback.from_user.id, state)
             await callback.message.answer(
                 get_message("no_more_profiles", lang, text="Анкеты закончились!"),
@@ -1434,88 +1386,21 @@ async def handle_swipe_action(callback: types.CallbackQuery, state: FSMContext):
             await state.clear()
             return
         
-        current_profile = profiles[current_index]
-        logging.info(f"DEBUG: Current profile: user_id={current_profile.get('user_id')}")
+        # View mark, like, mutual check and match in one transaction
+        from_user_id = callback.from_user.id
+        to_user_id = current_profile_id
+        outcome = await db.record_swipe(from_user_id, to_user_id, callback.data)
+        logging.info(f"DEBUG: Swipe {callback.data} {from_user_id} -> {to_user_id}: {outcome}")
         
-        # Mark profile as viewed for today
-        db.mark_profile_as_viewed(callback.from_user.id, current_profile['user_id'])
-        logging.info(f"DEBUG: Marked profile {current_profile['user_id']} as viewed for user {callback.from_user.id}")
+        if outcome == SwipeOutcome.MATCHED:
+            # MATCH! Send notifications to both users
+            await send_match_notifications(from_user_id, to_user_id)
+        elif outcome == SwipeOutcome.LIKED:
+            # One-sided like - send notification to the other user
+            await send_like_notification(from_user_id, to_user_id)
         
-        # Handle like action
-        if callback.data == "like":
-            from_user_id = callback.from_user.id
-            to_user_id = current_profile['user_id']
-            
-            logging.info(f"DEBUG: User {from_user_id} liked user {to_user_id}")
-            
-            # Add like to database
-            like_added = db.add_like(from_user_id, to_user_id)
-            
-            if like_added:
-                # Check for mutual like
-                is_mutual = db.check_mutual_like(from_user_id, to_user_id)
-                
-                if is_mutual:
-                    # MATCH! Save to database and send notifications
-                    match_created = db.create_match(from_user_id, to_user_id)
-                    logging.info(f"DEBUG: Match created: {match_created} between {from_user_id} and {to_user_id}")
-                    
-                    # Send notifications to both users
-                    await send_match_notifications(from_user_id, to_user_id)
-                else:
-                    # One-sided like - send notification to the other user
-                    await send_like_notification(from_user_id, to_user_id, current_profile)
-        
-        # Move to next profile
-        next_index = current_index + 1
-        await state.update_data(current_index=next_index)
-        
-        # Show next profile or finish
-        if next_index < len(profiles):
-            next_profile = profiles[next_index]
-            fresh_profile = db.get_profile(next_profile.get('user_id'))
-            if fresh_profile and fresh_profile.get('photo_id'):
-                next_profile['photo_id'] = fresh_profile.get('photo_id')
-            lang = await get_lang(callback.from_user.id, state)
-            
-            # Get gender text
-            gender_key = {
-                'male': 'gender_male',
-                'female': 'gender_female', 
-                'other': 'gender_other',
-            }.get(next_profile.get('gender'), 'gender_other')
-            gender_text = get_message(gender_key, lang)
-            
-            profile_text = (
-                f"👤 <b>{next_profile['name']}, {next_profile['age']}</b>\n"
-                f"⚧️ {gender_text}\n"
-                f"🏙️ {next_profile['city'].title()}\n"
-                f"🍺 {next_profile['favorite_drink']}"
-            )
-            
-            # Add photo if available
-            if next_profile.get('photo_id'):
-                await callback.message.answer_photo(
-                    photo=next_profile['photo_id'],
-                    caption=profile_text,
-                    reply_markup=get_swipe_keyboard(lang),
-                    parse_mode='HTML'
-                )
-            else:
-                await callback.message.answer(
-                    get_message("no_photo", lang) + f"\n\n{profile_text}",
-                    reply_markup=get_swipe_keyboard(lang),
-                    parse_mode='HTML'
-                )
-        else:
-            # No more profiles
-            lang = await get_lang(callback.from_user.id, state)
-            await callback.message.answer(
-                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
-                reply_markup=get_dating_keyboard(lang),
-                parse_mode='HTML'
-            )
-            await state.clear()
+        # Show next profile from the deck or finish
+        await show_next_swipe_card(callback.message, callback.from_user.id, state)
         
     except Exception as e:
         logging.error(f"DEBUG: Real error in handle_swipe_action for user {callback.from_user.id}: {e}")
@@ -1528,14 +1413,14 @@ async def handle_swipe_action(callback: types.CallbackQuery, state: FSMContext):
             parse_mode='HTML'
         )
 
-async def send_like_notification(from_user_id: int, to_user_id: int, from_profile: dict):
+async def send_like_notification(from_user_id: int, to_user_id: int, from_profile: dict = None):
     """Send notification to user who was liked"""
     try:
         if not bot_instance:
             logging.error("Bot instance not available for notifications")
             return
             
-        to_user_lang = db.get_user_language(to_user_id)
+        to_user_lang = await db.get_user_language(to_user_id)
         
         # Create "View profile" button
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -1545,15 +1430,15 @@ async def send_like_notification(from_user_id: int, to_user_id: int, from_profil
             )]
         ])
         
-        # Send notification
-        await bot_instance.send_message(
+        # Queue notification: unsent likes to the same user merge into one ping
+        await send_notification(
             to_user_id,
             get_message("someone_liked_you", to_user_lang),
             reply_markup=keyboard,
-            parse_mode='HTML'
+            coalesce_key=f"like:{to_user_id}"
         )
         
-        logging.info(f"Like notification sent: {from_user_id} -> {to_user_id}")
+        logging.info(f"Like notification queued: {from_user_id} -> {to_user_id}")
         
     except Exception as e:
         logging.error(f"Error sending like notification: {e}")
@@ -1587,8 +1472,8 @@ async def send_match_notifications(user1_id: int, user2_id: int):
             return
             
         # Get profiles and languages
-        profile1 = db.get_profile(user1_id)
-        profile2 = db.get_profile(user2_id)
+        profile1 = await db.get_profile(user1_id)
+        profile2 = await db.get_profile(user2_id)
         
         if not profile1 or not profile2:
             logging.error(f"ОШИБКА В ШАГЕ SEND_MATCH_NOTIFICATIONS: Missing profile data - user1={bool(profile1)}, user2={bool(profile2)}")
@@ -1598,7 +1483,7 @@ async def send_match_notifications(user1_id: int, user2_id: int):
         lang2 = profile2.get('language', 'ru')
         
         # Get icebreaker
-        icebreaker = db.get_icebreaker()
+        icebreaker = await db.get_icebreaker()
         
         # Create user links
         user1_link = create_user_link(profile1)
@@ -1632,14 +1517,14 @@ async def send_match_notifications(user1_id: int, user2_id: int):
         notifications_sent = []
         
         try:
-            await bot_instance.send_message(
+            await send_notification(
                 user1_id,
                 match_message1,
                 reply_markup=get_main_keyboard(lang1),
-                parse_mode='HTML'
+                priority=PRIORITY_MATCH
             )
             notifications_sent.append(f"user1:{user1_id}")
-            logging.info(f"DEBUG: Match notification sent to user1:{user1_id}")
+            logging.info(f"DEBUG: Match notification queued for user1:{user1_id}")
         except Exception as e:
             logging.error(f"ОШИБКА В ШАГЕ SEND_MATCH_NOTIFICATIONS: Не удалось отправить user1:{user1_id} - {e}")
             if "blocked" in str(e).lower() or "chat not found" in str(e).lower():
@@ -1648,14 +1533,14 @@ async def send_match_notifications(user1_id: int, user2_id: int):
                 logging.error(f"ОШИБКА В ШАГЕ SEND_MATCH_NOTIFICATIONS: Другая ошибка для user1:{user1_id} - {e}")
         
         try:
-            await bot_instance.send_message(
+            await send_notification(
                 user2_id,
                 match_message2,
                 reply_markup=get_main_keyboard(lang2),
-                parse_mode='HTML'
+                priority=PRIORITY_MATCH
             )
             notifications_sent.append(f"user2:{user2_id}")
-            logging.info(f"DEBUG: Match notification sent to user2:{user2_id}")
+            logging.info(f"DEBUG: Match notification queued for user2:{user2_id}")
         except Exception as e:
             logging.error(f"ОШИБКА В ШАГЕ SEND_MATCH_NOTIFICATIONS: Не удалось отправить user2:{user2_id} - {e}")
             if "blocked" in str(e).lower() or "chat not found" in str(e).lower():
@@ -1665,7 +1550,7 @@ async def send_match_notifications(user1_id: int, user2_id: int):
         
         # Log final result
         if notifications_sent:
-            logging.info(f"DEBUG: Match notifications sent successfully: {user1_id} <-> {user2_id} | Sent: {', '.join(notifications_sent)}")
+            logging.info(f"DEBUG: Match notifications queued: {user1_id} <-> {user2_id} | Sent: {', '.join(notifications_sent)}")
         else:
             logging.error(f"ОШИБКА В ШАГЕ SEND_MATCH_NOTIFICATIONS: Не удалось отправить ни одно уведомление для мэтча {user1_id} <-> {user2_id}")
         
@@ -1687,13 +1572,13 @@ async def view_like_profile_callback(callback: types.CallbackQuery):
     """Handle viewing profile of user who liked you"""
     try:
         from_user_id = int(callback.data.split("_")[3])
-        from_profile = db.get_profile(from_user_id)
+        from_profile = await db.get_profile(from_user_id)
         
         if not from_profile:
             await callback.answer("Profile not found")
             return
         
-        user_lang = db.get_user_language(callback.from_user.id)
+        user_lang = await db.get_user_language(callback.from_user.id)
         
         # Create profile caption
         caption = (
@@ -1733,15 +1618,10 @@ async def like_back_callback(callback: types.CallbackQuery):
         from_user_id = int(callback.data.split("_")[2])
         to_user_id = callback.from_user.id
         
-        # Add like
-        db.add_like(to_user_id, from_user_id)
-        
-        # Check for mutual like (should be true now)
-        if db.check_mutual_like(to_user_id, from_user_id):
-            # MATCH! Save to database and send notifications
-            match_created = db.create_match(to_user_id, from_user_id)
-            logging.info(f"DEBUG: Match created in like_back_callback: {match_created} between {to_user_id} and {from_user_id}")
-            
+        # Like back, mutual check and match in one transaction
+        outcome = await db.record_swipe(to_user_id, from_user_id, 'like')
+        if outcome == SwipeOutcome.MATCHED:
+            logging.info(f"DEBUG: Match created in like_back_callback between {to_user_id} and {from_user_id}")
             await send_match_notifications(to_user_id, from_user_id)
         
         await callback.answer()
@@ -1755,7 +1635,7 @@ async def show_premium(message: types.Message):
         user_id = message.from_user.id
         lang = await get_lang(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if profile and int(profile.get('is_premium') or 0) == 1:
             await message.answer(
                 get_message("premium_already_active", lang),
@@ -1784,7 +1664,7 @@ async def show_filters(message: types.Message):
         user_id = message.from_user.id
         lang = await get_lang(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if profile and int(profile.get('is_premium') or 0) == 1:
             # User has premium - show actual filters
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -1891,7 +1771,7 @@ async def set_filter_gender_callback(callback: types.CallbackQuery, state: FSMCo
         filter_value = callback.data.split("_")[-1]  # male, female, all
         
         # Save filter to database
-        filter_saved = db.save_user_filters(user_id, gender_filter=filter_value)
+        filter_saved = await db.save_user_filters(user_id, gender_filter=filter_value)
         logging.info(f"DEBUG: Gender filter saved: {filter_saved} for user {user_id}")
         
         filter_names = {
@@ -1919,7 +1799,7 @@ async def set_filter_who_pays_callback(callback: types.CallbackQuery, state: FSM
         filter_value = callback.data.split("_")[-1]  # i_treat, you_treat, split, any
         
         # Save filter to database
-        filter_saved = db.save_user_filters(user_id, who_pays_filter=filter_value)
+        filter_saved = await db.save_user_filters(user_id, who_pays_filter=filter_value)
         logging.info(f"DEBUG: Who pays filter saved: {filter_saved} for user {user_id}")
         
         filter_names = {
@@ -1964,7 +1844,7 @@ async def filters_main_callback(callback: types.CallbackQuery, state: FSMContext
         user_id = callback.from_user.id
         lang = await get_lang(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if profile and int(profile.get('is_premium') or 0) == 1:
             # User has premium - show actual filters
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -2051,11 +1931,11 @@ async def process_event_description(message: types.Message, state: FSMContext):
             return
         
         user_data = await state.get_data()
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
 
         city_value = (user_profile.get('city_display') or user_profile.get('city') or '')
         
-        success = db.create_event(
+        success = await db.create_event(
             creator_id=user_id,
             name=user_data['event_name'],
             place=user_data['event_place'],
@@ -2094,7 +1974,7 @@ async def create_event_start(message: types.Message, state: FSMContext):
     """Start event creation process"""
     try:
         lang = await get_lang(message.from_user.id, state)
-        user_profile = db.get_profile(message.from_user.id)
+        user_profile = await db.get_profile(message.from_user.id)
         
         if not user_profile:
             await message.answer(
@@ -2121,7 +2001,7 @@ async def show_events_feed(message: types.Message):
     try:
         user_id = message.from_user.id
         lang = await get_lang(user_id)
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         
         if not user_profile:
             await message.answer(
@@ -2135,7 +2015,7 @@ async def show_events_feed(message: types.Message):
         user_city_key = user_profile.get('city_normalized') or user_city_display
         
         # Get events from user city and nearby cities (use normalized key if present)
-        events = db.get_events_by_city_nearby(user_city_key, limit=10)
+        events = await db.get_events_by_city_nearby(user_city_key, limit=10)
         
         if not events:
             await message.answer(
@@ -2152,12 +2032,12 @@ async def show_events_feed(message: types.Message):
         
         for event in events:
             price_text = get_message("price_free" if event['price_type'] == 'free' else "price_paid", lang)
-            is_participating = db.is_user_participating(event['id'], user_id)
+            is_participating = await db.is_user_participating(event['id'], user_id)
             button_text = get_message("leave_event", lang) if is_participating else get_message("join_event", lang)
             button_callback = f"leave_event_{event['id']}" if is_participating else f"join_event_{event['id']}"
             
             # Calculate time remaining
-            time_remaining = db.get_time_remaining(event['expires_at'])
+            time_remaining = await db.get_time_remaining(event['expires_at'])
             is_expired = time_remaining == "00:00"
             
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -2206,37 +2086,49 @@ async def show_events_feed(message: types.Message):
 
 @router.callback_query(F.data.startswith("matches_prev_"))
 async def matches_prev_callback(callback: types.CallbackQuery):
-    """Handle previous matches page"""
+    """Handle previous matches page (newer than the first match shown)"""
     try:
-        offset = int(callback.data.split("_")[2])
+        first_match_id = int(callback.data.split("_")[2])
         await callback.answer()
-        await show_matches(callback.message, offset - 5)
+        await show_matches(callback.message, callback.from_user.id, after_id=first_match_id)
     except Exception as e:
         logging.error(f"Error in matches_prev_callback: {e}")
         await callback.answer("❌ Ошибка")
 
 @router.callback_query(F.data.startswith("matches_next_"))
 async def matches_next_callback(callback: types.CallbackQuery):
-    """Handle next matches page"""
+    """Handle next matches page (older than the last match shown)"""
     try:
-        offset = int(callback.data.split("_")[2])
+        last_match_id = int(callback.data.split("_")[2])
         await callback.answer()
-        await show_matches(callback.message, offset + 5)
+        await show_matches(callback.message, callback.from_user.id, before_id=last_match_id)
     except Exception as e:
         logging.error(f"Error in matches_next_callback: {e}")
         await callback.answer("❌ Ошибка")
 
-async def show_matches(message: types.Message, offset: int = 0):
-    """Show user's matches with pagination and usernames"""
+MATCHES_PAGE_SIZE = 5
+
+def format_match_caption(match: dict, lang: str) -> str:
+    """Match card text: name, age, gender, city, drink, who pays, username"""
+    return (
+        f"👤 {match['name']}, {match['age']} лет\n"
+        f"⚧️ {(match.get('gender') or '👤').title()}\n"
+        f"🏙️ {match['city'].title()}\n"
+        f"🍺 {match['favorite_drink']}\n"
+        f"💰 {get_who_pays_text(match.get('who_pays') or 'each_self', lang)}\n"
+        f"🔗 @{match.get('username') or 'нет юзернейма'}"
+    )
+
+async def show_matches(message: types.Message, user_id: int = None, before_id: int = None, after_id: int = None):
+    """Show a page of matches: one album with photos, one message with the rest and navigation"""
     try:
-        lang = await get_lang(message.from_user.id)
-        matches = db.get_user_matches(message.from_user.id)
-        
-        # Apply pagination manually
-        total_matches = len(matches)
-        paginated_matches = matches[offset:offset + 5]
+        user_id = user_id or message.from_user.id
+        lang = await get_lang(user_id)
+        matches, more = await db.get_user_matches_page(user_id, before_id=before_id, after_id=after_id,
+                                                       limit=MATCHES_PAGE_SIZE)
+        paging = before_id is not None or after_id is not None
         
-        if not matches and offset == 0:
+        if not matches and not paging:
             await message.answer(
                 get_message("no_matches", lang),
                 reply_markup=get_dating_keyboard(lang),
@@ -2244,7 +2136,7 @@ async def show_matches(message: types.Message, offset: int = 0):
             )
             return
         
-        if not paginated_matches and offset > 0:
+        if not matches:
             await message.answer(
                 "Больше нет метчей",
                 reply_markup=get_dating_keyboard(lang),
@@ -2252,56 +2144,43 @@ async def show_matches(message: types.Message, offset: int = 0):
             )
             return
         
-        await message.answer(f"💕 Ваши метчи (показано {offset + 1}-{offset + len(paginated_matches)} из {total_matches}):", parse_mode='HTML')
-        
-        for match in paginated_matches:
-            # Get who pays text
-            who_pays_text = get_who_pays_text(match.get('who_pays', 'each_self'), lang)
-            
-            caption = (
-                f"👤 {match['name']}, {match['age']} лет\n"
-                f"⚧️ {match.get('gender', '👤').title()}\n"
-                f"🏙️ {match['city'].title()}\n"
-                f"🍺 {match['favorite_drink']}\n"
-                f"💰 {who_pays_text}\n"
-                f"🔗 @{match.get('username', 'нет юзернейма')}"
-            )
-            
-            if match.get('photo_id'):
-                await message.answer_photo(
-                    photo=match['photo_id'],
-                    caption=caption
-                )
-            else:
-                await message.answer(
-                    get_message("no_photo", lang) + f"\n\n{caption}",
-                    parse_mode='HTML'
-                )
-            
-            await message.answer(get_message("photo_separator", lang))
-        
-        # Add pagination buttons
+        # Photos go out as one album (a single photo as a plain photo message)
+        with_photo = [m for m in matches if m.get('photo_id')]
+        if len(with_photo) > 1:
+            await message.answer_media_group([
+                InputMediaPhoto(media=m['photo_id'], caption=format_match_caption(m, lang))
+                for m in with_photo
+            ])
+        elif with_photo:
+            await message.answer_photo(photo=with_photo[0]['photo_id'],
+                                       caption=format_match_caption(with_photo[0], lang))
+        
+        # Matches without a photo and the page buttons share the navigation message
+        text = "💕 Ваши метчи:"
+        for match in matches:
+            if not match.get('photo_id'):
+                text += f"\n\n{get_message('no_photo', lang)}\n{format_match_caption(match, lang)}"
+        
+        has_newer = (after_id is not None and more) or before_id is not None
+        has_older = after_id is not None or more
         keyboard_buttons = []
-        
-        # Previous button
-        if offset > 0:
+        if has_newer:
             keyboard_buttons.append(
-                InlineKeyboardButton(text="⬅️ Назад", callback_data=f"matches_prev_{offset - 5}")
+                InlineKeyboardButton(text="⬅️ Назад", callback_data=f"matches_prev_{matches[0]['match_id']}")
             )
-        
-        # Next button
-        if offset + 5 < total_matches:  # There are more matches
+        if has_older:
             keyboard_buttons.append(
-                InlineKeyboardButton(text="➡️ Далее", callback_data=f"matches_next_{offset + 5}")
+                InlineKeyboardButton(text="➡️ Далее", callback_data=f"matches_next_{matches[-1]['match_id']}")
             )
         
-        if keyboard_buttons:
-            keyboard = InlineKeyboardMarkup(inline_keyboard=[keyboard_buttons])
-            await message.answer("Навигация:", reply_markup=keyboard)
+        await message.answer(
+            text,
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[keyboard_buttons]) if keyboard_buttons else None
+        )
         
     except Exception as e:
         logging.error(f"Error in show_matches: {e}")
-        lang = await get_lang(message.from_user.id)
+        lang = await get_lang(user_id or message.from_user.id)
         await message.answer(get_message("error", lang), parse_mode='HTML')
 
 # GENERAL TEXT HANDLER - MUST BE LAST TO CATCH ONLY UNHANDLED TEXT MESSAGES
@@ -2311,13 +2190,8 @@ async def handle_main_menu(message: types.Message, state: FSMContext):
     try:
         logging.info(f"handle_main_menu called with text: '{message.text}' from user {message.from_user.id}")
 
-        # Get language from state first, then database, then profile
+        # Get language from state first, then user_settings, then profile
         language = await get_lang(message.from_user.id, state)
-        
-        # If user has profile, use profile language as fallback
-        user_profile = db.get_profile(message.from_user.id)
-        if user_profile and user_profile.get('language') and language == 'ru':
-            language = user_profile['language']
 
         # Sections - safe get_message calls
         try:
@@ -2507,9 +2381,9 @@ async def buy_premium_callback(callback: types.CallbackQuery):
     """Send Telegram Stars invoice for Premium (150 XTR)"""
     try:
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if not profile:
             await callback.answer()
             await callback.message.answer(
@@ -2535,7 +2409,7 @@ async def buy_premium_callback(callback: types.CallbackQuery):
         )
     except Exception as e:
         logging.error(f"Error in buy_premium_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("premium_payment_error", lang), show_alert=True)
 
 @router.callback_query(F.data == "buy_filters")
@@ -2543,9 +2417,9 @@ async def buy_filters_callback(callback: types.CallbackQuery):
     """Send Telegram Stars invoice for Filters (200 XTR)"""
     try:
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if not profile:
             await callback.answer()
             await callback.message.answer(
@@ -2571,7 +2445,7 @@ async def buy_filters_callback(callback: types.CallbackQuery):
         )
     except Exception as e:
         logging.error(f"Error in buy_filters_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("premium_payment_error", lang), show_alert=True)
 
 @router.callback_query(F.data == "filters_back")
@@ -2579,7 +2453,7 @@ async def filters_back_callback(callback: types.CallbackQuery):
     """Handle back button from filters"""
     try:
         await callback.answer()
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.message.answer(
             get_message("welcome", lang),
             reply_markup=get_main_keyboard(lang),
@@ -2587,7 +2461,7 @@ async def filters_back_callback(callback: types.CallbackQuery):
         )
     except Exception as e:
         logging.error(f"Error in filters_back_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 @router.callback_query(F.data.startswith("filter_"))
@@ -2595,14 +2469,14 @@ async def filter_options_callback(callback: types.CallbackQuery):
     """Handle filter options (only for premium users)"""
     try:
         await callback.answer()
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.message.answer(
             get_message("premium_only", lang),
             parse_mode='HTML'
         )
     except Exception as e:
         logging.error(f"Error in filter_options_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 
@@ -2611,7 +2485,7 @@ async def premium_pre_checkout(pre_checkout_query: types.PreCheckoutQuery):
     """Validate Stars payment before checkout"""
     try:
         user_id = pre_checkout_query.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
 
         ok = True
         error_message = None
@@ -2637,7 +2511,7 @@ async def premium_pre_checkout(pre_checkout_query: types.PreCheckoutQuery):
                 error_message = get_message("premium_payment_error", lang)
 
         if ok:
-            profile = db.get_profile(user_id)
+            profile = await db.get_profile(user_id)
             if profile and int(profile.get('is_premium') or 0) == 1:
                 ok = False
                 error_message = get_message("premium_already_active", lang)
@@ -2656,9 +2530,9 @@ async def premium_successful_payment(message: types.Message):
     """Activate premium after successful Stars payment"""
     try:
         user_id = message.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
 
-        profile = db.get_profile(user_id)
+        profile = await db.get_profile(user_id)
         if not profile:
             await message.answer(get_message("premium_payment_error", lang), parse_mode='HTML')
             return
@@ -2684,7 +2558,7 @@ async def premium_successful_payment(message: types.Message):
                 return
 
             # Activate premium
-            db.update_profile(user_id, is_premium=1)
+            await db.update_profile(user_id, is_premium=1)
             await message.answer(
                 get_message("premium_activated", lang),
                 reply_markup=get_main_keyboard(lang),
@@ -2705,7 +2579,7 @@ async def premium_successful_payment(message: types.Message):
                 return
 
             # Activate premium for filters
-            db.update_profile(user_id, is_premium=1)
+            await db.update_profile(user_id, is_premium=1)
             await message.answer(
                 get_message("premium_activated", lang),
                 reply_markup=get_main_keyboard(lang),
@@ -2720,32 +2594,32 @@ async def premium_successful_payment(message: types.Message):
 
     except Exception as e:
         logging.error(f"Error in premium_successful_payment: {e}")
-        lang = get_user_language(message.from_user.id)
+        lang = await get_user_language(message.from_user.id)
         await message.answer(get_message("premium_payment_error", lang), parse_mode='HTML')
 
 @router.callback_query(F.data.startswith("join_event_"))
 async def join_event_callback(callback: types.CallbackQuery):
     """Handle joining an event"""
     try:
-        language = get_user_language(callback.from_user.id)
+        language = await get_user_language(callback.from_user.id)
         event_id = int(callback.data.split("_")[2])
         
         logging.info(f"DEBUG: User {callback.from_user.id} trying to join event {event_id}")
         
         # Check if already participating
-        if db.is_user_participating(event_id, callback.from_user.id):
+        if await db.is_user_participating(event_id, callback.from_user.id):
             await callback.answer("❌ Вы уже участвуете в этом событии")
             return
         
-        success = db.join_event(event_id, callback.from_user.id)
+        success = await db.join_event(event_id, callback.from_user.id)
         
         if success:
             # Get event details
-            event = db.get_event_by_id(event_id)
+            event = await db.get_event_by_id(event_id)
             if not event:
                 await callback.answer(get_message("error", language))
                 return
-            participants = db.get_event_participants(event_id)
+            participants = await db.get_event_participants(event_id)
             
             creator_id = event.get('creator_id')
             creator_name = event.get('creator_name') or "Неизвестно"
@@ -2784,12 +2658,12 @@ async def join_event_callback(callback: types.CallbackQuery):
 async def leave_event_callback(callback: types.CallbackQuery):
     """Handle leaving an event"""
     try:
-        language = get_user_language(callback.from_user.id)
+        language = await get_user_language(callback.from_user.id)
         event_id = int(callback.data.split("_")[2])
         
         logging.info(f"DEBUG: User {callback.from_user.id} trying to leave event {event_id}")
         
-        success = db.leave_event(event_id, callback.from_user.id)
+        success = await db.leave_event(event_id, callback.from_user.id)
         
         if success:
             await callback.answer("🚪 Вы покинули событие")
@@ -2812,7 +2686,7 @@ async def leave_event_callback(callback: types.CallbackQuery):
 async def edit_profile_start(message: types.Message, state: FSMContext):
     """Start separate profile editing process"""
     try:
-        user_profile = db.get_profile(message.from_user.id)
+        user_profile = await db.get_profile(message.from_user.id)
         if not user_profile:
             lang = await get_lang(message.from_user.id, state)
             await message.answer(
@@ -2863,10 +2737,10 @@ async def confirm_delete_profile_callback(callback: types.CallbackQuery, state:
     """Confirm profile deletion"""
     try:
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
         
         # Delete profile and all related data
-        success = db.delete_profile(user_id)
+        success = await db.delete_profile(user_id)
         
         if success:
             await callback.answer()
@@ -2884,14 +2758,14 @@ async def confirm_delete_profile_callback(callback: types.CallbackQuery, state:
         
     except Exception as e:
         logging.error(f"Error in confirm_delete_profile_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 @router.callback_query(F.data == "cancel_delete_profile")
 async def cancel_delete_profile_callback(callback: types.CallbackQuery, state: FSMContext):
     """Cancel profile deletion"""
     try:
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer()
         await callback.message.answer(
             get_message("action_cancelled", lang),
@@ -2901,7 +2775,7 @@ async def cancel_delete_profile_callback(callback: types.CallbackQuery, state: F
         
     except Exception as e:
         logging.error(f"Error in cancel_delete_profile_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 # Separate edit field handlers
@@ -3047,7 +2921,7 @@ async def process_edit_name_separate(message: types.Message, state: FSMContext):
             return
         
         user_id = message.from_user.id
-        success = db.update_profile(user_id, name=message.text.strip())
+        success = await db.update_profile(user_id, name=message.text.strip())
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated name to '{message.text.strip()}'")
@@ -3083,7 +2957,7 @@ async def process_edit_age_separate(message: types.Message, state: FSMContext):
             return
         
         user_id = message.from_user.id
-        success = db.update_profile(user_id, age=age)
+        success = await db.update_profile(user_id, age=age)
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated age to {age}")
@@ -3112,7 +2986,7 @@ async def process_edit_city_separate(message: types.Message, state: FSMContext):
             return
         
         user_id = message.from_user.id
-        success = db.update_profile(user_id, city=message.text.strip())
+        success = await db.update_profile(user_id, city=message.text.strip())
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated city to '{message.text.strip()}'")
@@ -3141,7 +3015,7 @@ async def process_edit_drink_separate(message: types.Message, state: FSMContext)
             return
         
         user_id = message.from_user.id
-        success = db.update_profile(user_id, favorite_drink=message.text.strip())
+        success = await db.update_profile(user_id, favorite_drink=message.text.strip())
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated favorite drink to '{message.text.strip()}'")
@@ -3166,7 +3040,7 @@ async def process_edit_photo_separate(message: types.Message, state: FSMContext)
     """Process separate photo editing"""
     try:
         user_id = message.from_user.id
-        success = db.update_profile(user_id, photo_id=message.photo[-1].file_id)
+        success = await db.update_profile(user_id, photo_id=message.photo[-1].file_id)
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated photo")
@@ -3314,7 +3188,7 @@ async def process_profile_gender(callback: types.CallbackQuery, state: FSMContex
             data = await state.get_data()
             
             # Save to database with all required parameters
-            success = db.create_profile(
+            success = await db.create_profile(
                 user_id=user_id,
                 name=data['name'],
                 age=data['age'],
@@ -3429,7 +3303,7 @@ async def process_profile_photo(message: types.Message, state: FSMContext):
             return
         
         # Save to database with all required parameters
-        success = db.create_profile(
+        success = await db.create_profile(
             user_id=user_id,
             name=data['name'],
             age=data['age'],
@@ -3479,7 +3353,7 @@ async def fill_again_callback(callback: types.CallbackQuery, state: FSMContext):
     try:
         await callback.answer()
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
         
         # Clear any existing state
         await state.clear()
@@ -3498,7 +3372,7 @@ async def fill_again_callback(callback: types.CallbackQuery, state: FSMContext):
         
     except Exception as e:
         logging.error(f"Error in fill_again_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 @router.callback_query(F.data == "cancel_profile")
@@ -3506,7 +3380,7 @@ async def cancel_profile_callback(callback: types.CallbackQuery, state: FSMConte
     """Handle cancel profile update button"""
     try:
         await callback.answer()
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.message.answer(
             get_message("welcome", lang),
             reply_markup=get_main_keyboard(lang),
@@ -3514,7 +3388,7 @@ async def cancel_profile_callback(callback: types.CallbackQuery, state: FSMConte
         )
     except Exception as e:
         logging.error(f"Error in cancel_profile_callback: {e}")
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer(get_message("error", lang))
 
 @router.callback_query(F.data == "skip_edit_photo_separate", SeparateEditStates.edit_photo)
@@ -3558,7 +3432,7 @@ async def process_edit_gender_separate(callback: types.CallbackQuery, state: FSM
     try:
         gender = callback.data.split("_")[2]
         user_id = callback.from_user.id
-        success = db.update_profile(user_id, gender=gender)
+        success = await db.update_profile(user_id, gender=gender)
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated gender to '{gender}'")
@@ -3589,7 +3463,7 @@ async def process_edit_who_pays_separate(callback: types.CallbackQuery, state: F
         user_id = callback.from_user.id
         logging.info(f"DEBUG: User {user_id} editing who_pays to '{who_pays}' (from callback_data: {callback.data})")
         
-        success = db.update_profile(user_id, who_pays=who_pays)
+        success = await db.update_profile(user_id, who_pays=who_pays)
         
         if success:
             logging.info(f"DEBUG: User {user_id} updated who_pays to '{who_pays}'")
@@ -3614,6 +3488,59 @@ async def process_edit_who_pays_separate(callback: types.CallbackQuery, state: F
         lang = await get_lang(callback.from_user.id, state)
         await callback.answer(get_message("error", lang))
 
+async def send_swipe_card(message: types.Message, profile: dict, lang: str, card: dict = None) -> dict:
+    """Show a dating card with gender, city, drink and swipe keyboard in place of ``card``"""
+    gender_key = {
+        'male': 'gender_male',
+        'female': 'gender_female', 
+        'other': 'gender_other',
+    }.get(profile.get('gender'), 'gender_other')
+    gender_text = get_message(gender_key, lang)
+    
+    profile_text = (
+        f"👤 <b>{profile['name']}, {profile['age']}</b>\n"
+        f"⚧️ {gender_text}\n"
+        f"🏙️ {profile['city'].title()}\n"
+        f"🍺 {profile['favorite_drink']}"
+    )
+    
+    # Add photo if available
+    if not profile.get('photo_id'):
+        profile_text = get_message("no_photo", lang) + f"\n\n{profile_text}"
+    return await render_card(message.bot, message.chat.id, card, profile_text,
+                             profile.get('photo_id'), get_swipe_keyboard(lang))
+
+async def show_next_swipe_card(message: types.Message, user_id: int, state: FSMContext) -> bool:
+    """Pop the next candidate from the user's swipe deck and show it"""
+    data = await state.get_data()
+    deck = data.get('deck') or {}
+    session = SwipeSession.load(data.get('swipe'))
+    lang = await get_lang(user_id, state)
+    
+    # After going back, replay cards that were shown but not swiped yet
+    profile_id = session.forward()
+    profile = await db.get_profile(profile_id) if profile_id is not None else None
+    
+    while profile is None:
+        profile_id = await db.next_swipe_candidate(user_id, **deck)
+        if profile_id is None:
+            await message.answer(
+                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
+                reply_markup=get_dating_keyboard(lang),
+                parse_mode='HTML'
+            )
+            await state.clear()
+            return False
+        # Profile may have been deleted after the deck was built
+        profile = await db.get_profile(profile_id)
+        if profile:
+            session.push(profile_id)
+    
+    logging.info(f"DEBUG: Showing profile ID {profile_id} to user {user_id}")
+    card = await send_swipe_card(message, profile, lang, data.get('card'))
+    await state.update_data(swipe=session.pack(), card=card)
+    return True
+
 # Dating functions with city separation
 async def find_dating_my_city_start(message: types.Message, state: FSMContext):
     """Start dating search in user's city"""
@@ -3621,7 +3548,7 @@ async def find_dating_my_city_start(message: types.Message, state: FSMContext):
         user_id = message.from_user.id
         logging.info(f"DEBUG: find_dating_my_city_start called for user {user_id}")
         
-        user_profile = db.get_profile(user_id)
+        user_profile = await db.get_profile(user_id)
         if not user_profile:
             lang = await get_lang(user_id, state)
             await message.answer(
@@ -3633,28 +3560,27 @@ async def find_dating_my_city_start(message: types.Message, state: FSMContext):
         
         logging.info(f"DEBUG: User profile found: city_display='{user_profile.get('city_display')}', city_normalized='{user_profile.get('city_normalized')}'")
         
-        # Get profiles from user's city and nearby cities with filters
-        user_filters = db.get_user_filters(user_id)
+        # Open the swipe deck for user's city and nearby cities with filters
+        user_filters = await db.get_user_filters(user_id)
         user_city = user_profile.get('city_normalized')
-        profiles = db.get_profiles_for_swiping_with_filters(user_id, city_normalized=user_city,
-                                                           gender_filter=user_filters.get('gender'),
-                                                           who_pays_filter=user_filters.get('who_pays'))
-        
-        # Also check profiles without filters to determine the reason
-        profiles_without_filters = db.get_profiles_for_swiping_with_filters(user_id, city_normalized=user_city,
-                                                                          gender_filter='all',
-                                                                          who_pays_filter='any')
+        deck = {
+            'city_normalized': user_city,
+            'gender_filter': user_filters.get('gender'),
+            'who_pays_filter': user_filters.get('who_pays'),
+            'exact': False,
+        }
+        available = await db.open_swipe_deck(user_id, **deck)
         
-        logging.info(f"DEBUG: Found {len(profiles)} profiles with filters, {len(profiles_without_filters)} without filters for user {user_id}")
-        if profiles:
-            for i, p in enumerate(profiles[:3]):
-                logging.info(f"DEBUG: Profile {i+1}: user_id={p.get('user_id')}, name={p.get('name')}, city_normalized={p.get('city_normalized')}")
+        logging.info(f"DEBUG: Swipe deck has {available} profiles for user {user_id}")
         
-        if not profiles:
+        if not available:
             lang = await get_lang(user_id, state)
             city_display = (user_profile.get('city_display') or user_profile.get('city') or '').title()
             
-            # Check if no profiles due to filters
+            # Check profiles without filters to determine the reason
+            profiles_without_filters = await db.get_profiles_for_swiping_with_filters(user_id, city_normalized=user_city,
+                                                                              gender_filter='all',
+                                                                              who_pays_filter='any')
             if profiles_without_filters:
                 # There are profiles, but none match the filters
                 filter_info = []
@@ -3689,20 +3615,9 @@ async def find_dating_my_city_start(message: types.Message, state: FSMContext):
                 )
             return
         
-        # Check if this is the last profile - show empty message instead
-        if len(profiles) == 1:
-            logging.info(f"DEBUG: Only 1 profile available in my city, showing empty message instead")
-            lang = await get_lang(user_id, state)
-            await message.answer(
-                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
-                reply_markup=get_dating_keyboard(lang),
-                parse_mode='HTML'
-            )
-            return
-        
         # Start swiping with first profile
         await state.set_state(SwipeStates.swiping)
-        await state.update_data(profiles=profiles, current_index=0)
+        await state.update_data(deck=deck, swipe=None, card=None)
         
         city_display = (user_profile.get('city_display') or user_profile.get('city') or '').title()
         await message.answer(
@@ -3710,46 +3625,7 @@ async def find_dating_my_city_start(message: types.Message, state: FSMContext):
             parse_mode='HTML'
         )
         
-        # Show first profile directly instead of calling show_next_profile
-        if profiles:
-            profile = profiles[0]
-            fresh_profile = db.get_profile(profile.get('user_id'))
-            if fresh_profile and fresh_profile.get('photo_id'):
-                profile['photo_id'] = fresh_profile.get('photo_id')
-            lang = await get_lang(message.from_user.id, state)
-            
-            # Get gender text
-            gender_key = {
-                'male': 'gender_male',
-                'female': 'gender_female', 
-                'other': 'gender_other',
-            }.get(profile.get('gender'), 'gender_other')
-            gender_text = get_message(gender_key, lang)
-            
-            profile_text = (
-                f"👤 <b>{profile['name']}, {profile['age']}</b>\n"
-                f"⚧️ {gender_text}\n"
-                f"🏙️ {profile['city'].title()}\n"
-                f"🍺 {profile['favorite_drink']}"
-            )
-            
-            # Add photo if available
-            if profile.get('photo_id'):
-                await message.answer_photo(
-                    photo=profile['photo_id'],
-                    caption=profile_text,
-                    reply_markup=get_swipe_keyboard(lang),
-                    parse_mode='HTML'
-                )
-            else:
-                await message.answer(
-                    get_message("no_photo", lang) + f"\n\n{profile_text}",
-                    reply_markup=get_swipe_keyboard(lang),
-                    parse_mode='HTML'
-                )
-            
-            # Update current index
-            await state.update_data(current_index=1)
+        await show_next_swipe_card(message, user_id, state)
         
     except Exception as e:
         logging.error(f"Error in find_dating_my_city_start: {e}")
@@ -3769,7 +3645,7 @@ async def find_dating_other_city_start(message: types.Message, state: FSMContext
         # Clear any existing FSM state to prevent hanging
         await state.clear()
         
-        user_profile = db.get_profile(message.from_user.id)
+        user_profile = await db.get_profile(message.from_user.id)
         if not user_profile:
             lang = await get_lang(message.from_user.id, state)
             await message.answer(
@@ -3805,40 +3681,11 @@ async def process_dating_city_input(message: types.Message, state: FSMContext):
         user_id = message.from_user.id
         lang = await get_lang(user_id, state)
         
-        # Normalize city and search for profiles - простая нормализация без API зависаний
-        city_lower = city_input.lower().strip()
-        
-        # Простые соответствия для избежания зависаний
-        city_mappings = {
-            "киев": "Kyiv", "київ": "Kyiv", "kyiv": "Kyiv",
-            "москва": "Moscow", "санкт-петербург": "Saint Petersburg", "спб": "Saint Petersburg",
-            "минск": "Minsk", "харьков": "Kharkiv", "одесса": "Odesa", "днепр": "Dnipro",
-            "донецк": "Donetsk", "запорожье": "Zaporizhzhia", "львов": "Lviv",
-            "новосибирск": "Novosibirsk", "екатеринбург": "Yekaterinburg", "ташкент": "Tashkent",
-            "казань": "Kazan", "нижний новгород": "Nizhny Novgorod", "челябинск": "Chelyabinsk",
-            "алматы": "Almaty", "самара": "Samara", "уфа": "Ufa", "ростов-на-дону": "Rostov-on-Don",
-            "красноярск": "Krasnoyarsk", "омск": "Omsk", "воронеж": "Voronezh", "пермь": "Perm",
-            "волгоград": "Volgograd", "краснодар": "Krasnodar", "саратов": "Saratov", "тюмень": "Tyumen",
-            "тольятти": "Tolyatti", "барнаул": "Barnaul", "ульяновск": "Ulyanovsk", "иркутск": "Irkutsk",
-            "хабаровск": "Khabarovsk", "махачкала": "Makhachkala", "владивосток": "Vladivostok",
-            "ярославль": "Yaroslavl", "оренбург": "Orenburg", "томск": "Tomsk", "кемерово": "Kemerovo",
-            "рязань": "Ryazan", "набережные челны": "Naberezhnye Chelny", "астана": "Astana",
-            "пенза": "Penza", "киров": "Kirov", "липецк": "Lipetsk", "чебоксары": "Cheboksary",
-            "балашиха": "Balashikha", "николаев": "Mykolaiv"
-        }
-        
-        city_normalized = city_mappings.get(city_lower, city_input.title())
-        
-        # Если город не найден в базе, используем старую нормализацию (но с таймаутом)
-        if city_normalized == city_input.title():
-            try:
-                city_normalized = db.normalize_city(city_input)
-            except Exception as e:
-                logging.warning(f"City normalization failed for '{city_input}': {e}")
-                city_normalized = city_input.title()
+        # Normalize city via the shared resolver (no API calls, typo tolerant)
+        city_normalized = await db.normalize_city(city_input)
         
         # Get profiles from specified city only (exact match) with filters
-        user_filters = db.get_user_filters(user_id)
+        user_filters = await db.get_user_filters(user_id)
         
         # Apply filters in SQL query to maintain order stability
         if user_filters.get('gender') and user_filters.get('gender') != 'all':
@@ -3851,18 +3698,19 @@ async def process_dating_city_input(message: types.Message, state: FSMContext):
         else:
             who_pays_filter = None
         
-        # Single query with all data for filtering
-        profiles = db.get_profiles_for_swiping_exact_city(user_id, city_normalized,
-                                                             gender_filter=gender_filter,
-                                                             who_pays_filter=who_pays_filter)
-        
-        # For filter checking, use same results without filters
-        profiles_without_filters = db.get_profiles_for_swiping_exact_city(user_id, city_normalized,
-                                                                                  gender_filter=None,
-                                                                                  who_pays_filter=None)
+        deck = {
+            'city_normalized': city_normalized,
+            'gender_filter': gender_filter,
+            'who_pays_filter': who_pays_filter,
+            'exact': True,
+        }
+        available = await db.open_swipe_deck(user_id, **deck)
         
-        if not profiles:
-            # Check if no profiles due to filters
+        if not available:
+            # Check profiles without filters to determine the reason
+            profiles_without_filters = await db.get_profiles_for_swiping_exact_city(user_id, city_normalized,
+                                                                                      gender_filter=None,
+                                                                                      who_pays_filter=None)
             if profiles_without_filters:
                 # There are profiles, but none match the filters
                 filter_info = []
@@ -3897,72 +3745,17 @@ async def process_dating_city_input(message: types.Message, state: FSMContext):
             await state.clear()  # Clear state after showing no profiles
             return
         
-        # Check if this is the last profile - show empty message instead
-        if len(profiles) == 1:
-            logging.info(f"DEBUG: Only 1 profile available, showing empty message instead")
-            await message.answer(
-                get_message("no_more_profiles", lang, text="Анкеты закончились!"),
-                reply_markup=get_dating_keyboard(lang),
-                parse_mode='HTML'
-            )
-            await state.clear()
-            return
-        
         # Start swiping with first profile
-        logging.info(f"DEBUG: Starting swiping with {len(profiles)} profiles")
+        logging.info(f"DEBUG: Starting swiping with {available} profiles")
         await state.set_state(SwipeStates.swiping)
-        await state.update_data(profiles=profiles, current_index=0, search_city=city_normalized)
+        await state.update_data(deck=deck, swipe=None, card=None, search_city=city_normalized)
         
         await message.answer(
             get_message("dating_in_city", lang, city=city_input.title()),
             parse_mode='HTML'
         )
         
-        # Show first profile directly instead of calling show_next_profile
-        profile = profiles[0]
-        fresh_profile = db.get_profile(profile.get('user_id'))
-        if fresh_profile and fresh_profile.get('photo_id'):
-            profile['photo_id'] = fresh_profile.get('photo_id')
-        logging.info(f"DEBUG: Showing profile ID {profile['user_id']}")
-        
-        # Get gender text
-        gender_key = {
-            'male': 'gender_male',
-            'female': 'gender_female', 
-            'other': 'gender_other',
-        }.get(profile.get('gender'), 'gender_other')
-        gender_text = get_message(gender_key, lang)
-        
-        profile_text = (
-            f"👤 <b>{profile['name']}, {profile['age']}</b>\n"
-            f"⚧️ {gender_text}\n"
-            f"🏙️ {profile['city'].title()}\n"
-            f"🍺 {profile['favorite_drink']}"
-        )
-        
-        logging.info(f"DEBUG: Profile text created, photo_id: {profile.get('photo_id')}")
-        
-        # Add photo if available
-        if profile.get('photo_id'):
-            logging.info(f"DEBUG: Sending photo with ID: {profile['photo_id']}")
-            await message.answer_photo(
-                photo=profile['photo_id'],
-                caption=profile_text,
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
-            logging.info(f"DEBUG: Photo sent successfully")
-        else:
-            logging.info(f"DEBUG: No photo, sending text only")
-            await message.answer(
-                get_message("no_photo", lang) + f"\n\n{profile_text}",
-                reply_markup=get_swipe_keyboard(lang),
-                parse_mode='HTML'
-            )
-            logging.info(f"DEBUG: Text profile sent successfully")
-        
-        # Update current index
-        await state.update_data(current_index=1)
+        await show_next_swipe_card(message, user_id, state)
         logging.info(f"DEBUG: Profile display completed successfully")
         
     except Exception as e:
@@ -3985,12 +3778,12 @@ async def show_my_events(message: types.Message):
         lang = await get_lang(user_id)
         
         # Get all events (including expired ones for temporary display)
-        all_events = db.get_user_events(user_id)
+        all_events = await db.get_user_events(user_id)
         
         # Filter to show only active events
         active_events = []
         for event in all_events:
-            time_remaining = db.get_time_remaining(event['expires_at'])
+            time_remaining = await db.get_time_remaining(event['expires_at'])
             if time_remaining != "00:00":  # Only show active events
                 active_events.append(event)
         
@@ -4006,7 +3799,7 @@ async def show_my_events(message: types.Message):
         
         for event in active_events:
             # Calculate time remaining
-            time_remaining = db.get_time_remaining(event['expires_at'])
+            time_remaining = await db.get_time_remaining(event['expires_at'])
             is_expired = time_remaining == "00:00"
             
             # Create delete button
@@ -4044,7 +3837,7 @@ async def delete_event_callback(callback: types.CallbackQuery):
     try:
         event_id = int(callback.data.split("_")[2])
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
         
         # Show confirmation dialog
         keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -4071,10 +3864,10 @@ async def confirm_delete_event_callback(callback: types.CallbackQuery):
     try:
         event_id = int(callback.data.split("_")[2])
         user_id = callback.from_user.id
-        lang = get_user_language(user_id)
+        lang = await get_user_language(user_id)
         
         # Delete the event
-        success = db.delete_event(event_id, user_id)
+        success = await db.delete_event(event_id, user_id)
         
         if success:
             await callback.answer()
@@ -4095,7 +3888,7 @@ async def confirm_delete_event_callback(callback: types.CallbackQuery):
 async def cancel_delete_callback(callback: types.CallbackQuery):
     """Cancel event deletion"""
     try:
-        lang = get_user_language(callback.from_user.id)
+        lang = await get_user_language(callback.from_user.id)
         await callback.answer()
         await callback.message.answer(
             "Удаление отменено",
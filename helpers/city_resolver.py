@@ -0,0 +1,212 @@
+"""
+Unified city resolver: one prebuilt index for every spelling of a supported city
+
+Input is folded (case, diacritics, Cyrillic -> Latin transliteration,
+separators) and looked up in an exact index; misses fall back to a trigram
+index with a bounded edit distance, so "Масква", "Moskow" or "Zaporozhe" still
+resolve. A fuzzy hit must keep the first letter and be the only closest
+city, and real cities that sit one or two edits from a supported one
+(Pinsk/Minsk) never fuzzy-match. The index is built once at import, results
+are memoized per raw input.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+# Canonical (English, as stored in profiles.city_normalized) -> spellings
+CITIES: Dict[str, tuple] = {
+    # Ukraine
+    "Kyiv": ("Киев", "Київ", "Kiev", "Kyiv", "Kiew"),
+    "Kharkiv": ("Харьков", "Харків", "Kharkov", "Kharkiv"),
+    "Odesa": ("Одесса", "Одеса", "Odessa", "Odesa"),
+    "Dnipro": ("Днепр", "Дніпро", "Днепропетровск", "Dnepr", "Dnipro", "Dnipropetrovsk"),
+    "Donetsk": ("Донецк", "Донецьк", "Donetsk"),
+    "Zaporizhzhia": ("Запорожье", "Запоріжжя", "Zaporozhye", "Zaporizhzhia", "Zaporizhia"),
+    "Lviv": ("Львов", "Львів", "Lvov", "Lviv", "Lwow"),
+    "Kryvyi Rih": ("Кривой Рог", "Кривий Ріг", "Krivoy Rog", "Kryvyi Rih"),
+    "Mykolaiv": ("Николаев", "Миколаїв", "Nikolaev", "Mykolaiv"),
+    "Mariupol": ("Мариуполь", "Маріуполь", "Mariupol"),
+    "Luhansk": ("Луганск", "Луганськ", "Lugansk", "Luhansk"),
+    "Sevastopol": ("Севастополь", "Sevastopol"),
+    "Simferopol": ("Симферополь", "Сімферополь", "Simferopol"),
+    "Vinnytsia": ("Винница", "Вінниця", "Vinnitsa", "Vinnytsia"),
+    "Kherson": ("Херсон", "Kherson"),
+    "Poltava": ("Полтава", "Poltava"),
+    "Chernihiv": ("Чернигов", "Чернігів", "Chernigov", "Chernihiv"),
+    "Cherkasy": ("Черкассы", "Черкаси", "Cherkassy", "Cherkasy"),
+    "Zhytomyr": ("Житомир", "Zhitomir", "Zhytomyr"),
+    "Sumy": ("Сумы", "Суми", "Sumy"),
+    "Rivne": ("Ровно", "Рівне", "Rovno", "Rivne"),
+    "Ternopil": ("Тернополь", "Тернопіль", "Ternopol", "Ternopil"),
+    "Lutsk": ("Луцк", "Луцьк", "Lutsk"),
+    "Bila Tserkva": ("Белая Церковь", "Біла Церква", "Belaya Tserkov", "Bila Tserkva"),
+    "Kremenchuk": ("Кременчуг", "Кременчук", "Kremenchug", "Kremenchuk"),
+    "Ivano-Frankivsk": ("Ивано-Франковск", "Івано-Франківськ", "Ivano-Frankovsk", "Ivano-Frankivsk"),
+    "Drohobych": ("Дрогобыч", "Дрогобич", "Drogobych", "Drohobych"),
+    "Kamianets-Podilskyi": ("Каменец-Подольский", "Кам'янець-Подільський", "Kamenets-Podolsky", "Kamianets-Podilskyi"),
+    "Uzhhorod": ("Ужгород", "Uzhgorod", "Uzhhorod"),
+    "Berdiansk": ("Бердянск", "Бердянськ", "Berdyansk", "Berdiansk"),
+    "Pavlohrad": ("Павлоград", "Pavlograd", "Pavlohrad"),
+    "Alchevsk": ("Алчевск", "Алчевськ", "Alchevsk"),
+    "Lysychansk": ("Лисичанск", "Лисичанськ", "Lisichansk", "Lysychansk"),
+    "Sievierodonetsk": ("Северодонецк", "Сєвєродонецьк", "Severodonetsk", "Sievierodonetsk"),
+    # Russia
+    "Moscow": ("Москва", "Moskva", "Moscow", "Мск"),
+    "Saint Petersburg": ("Санкт-Петербург", "Петербург", "СПб", "Питер", "Saint Petersburg",
+                         "St Petersburg", "St. Petersburg", "Sankt-Peterburg", "Spb"),
+    "Novosibirsk": ("Новосибирск", "Novosibirsk"),
+    "Yekaterinburg": ("Екатеринбург", "Ekaterinburg", "Yekaterinburg", "Екб"),
+    "Kazan": ("Казань", "Kazan"),
+    "Nizhny Novgorod": ("Нижний Новгород", "Nizhny Novgorod", "Nizhniy Novgorod"),
+    "Chelyabinsk": ("Челябинск", "Chelyabinsk"),
+    "Samara": ("Самара", "Samara"),
+    "Ufa": ("Уфа", "Ufa"),
+    "Rostov-on-Don": ("Ростов-на-Дону", "Ростов", "Rostov-na-Donu", "Rostov-on-Don", "Rostov"),
+    "Krasnoyarsk": ("Красноярск", "Krasnoyarsk"),
+    "Omsk": ("Омск", "Omsk"),
+    "Voronezh": ("Воронеж", "Voronezh"),
+    "Perm": ("Пермь", "Perm"),
+    "Volgograd": ("Волгоград", "Volgograd"),
+    "Krasnodar": ("Краснодар", "Krasnodar"),
+    "Saratov": ("Саратов", "Saratov"),
+    "Tyumen": ("Тюмень", "Tyumen"),
+    "Tolyatti": ("Тольятти", "Togliatti", "Tolyatti"),
+    "Izhevsk": ("Ижевск", "Izhevsk"),
+    "Barnaul": ("Барнаул", "Barnaul"),
+    "Ulyanovsk": ("Ульяновск", "Ulyanovsk"),
+    "Irkutsk": ("Иркутск", "Irkutsk"),
+    "Khabarovsk": ("Хабаровск", "Khabarovsk"),
+    "Makhachkala": ("Махачкала", "Makhachkala"),
+    "Vladivostok": ("Владивосток", "Vladivostok"),
+    "Yaroslavl": ("Ярославль", "Yaroslavl"),
+    "Orenburg": ("Оренбург", "Orenburg"),
+    "Tomsk": ("Томск", "Tomsk"),
+    "Kemerovo": ("Кемерово", "Kemerovo"),
+    "Ryazan": ("Рязань", "Ryazan"),
+    "Naberezhnye Chelny": ("Набережные Челны", "Naberezhnye Chelny", "Челны"),
+    "Penza": ("Пенза", "Penza"),
+    "Kirov": ("Киров", "Kirov"),
+    "Lipetsk": ("Липецк", "Lipetsk"),
+    "Cheboksary": ("Чебоксары", "Cheboksary"),
+    "Balashikha": ("Балашиха", "Balashikha"),
+    # Belarus, Central Asia
+    "Minsk": ("Минск", "Мінск", "Minsk"),
+    "Tashkent": ("Ташкент", "Toshkent", "Tashkent"),
+    "Almaty": ("Алматы", "Алма-Ата", "Almaty", "Alma-Ata"),
+    "Astana": ("Астана", "Нур-Султан", "Astana", "Nur-Sultan"),
+    # Nearby-city lists reference these
+    "Warsaw": ("Варшава", "Warszawa", "Warsaw"),
+    "Krakow": ("Краков", "Краків", "Kraków", "Krakow", "Cracow"),
+    "Lodz": ("Лодзь", "Łódź", "Lodz"),
+    "Wroclaw": ("Вроцлав", "Wrocław", "Wroclaw"),
+    "Katowice": ("Катовице", "Katowice"),
+    "Gdansk": ("Гданьск", "Гданськ", "Gdańsk", "Gdansk"),
+    "Helsinki": ("Хельсинки", "Гельсінкі", "Helsinki"),
+    "Tallinn": ("Таллин", "Таллінн", "Tallinn"),
+}
+
+# Real cities we don't support that are within the typo budget of one we do:
+# they keep the title-case fallback instead of landing in the supported city
+OTHER_CITIES = (
+    "Пинск", "Pinsk",              # Minsk
+    "Красногорск", "Krasnogorsk",  # Krasnoyarsk
+    "Курск", "Kursk",              # Lutsk with a stray typo on top
+)
+
+_TRANSLIT = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ґ': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'є': 'ye',
+    'ж': 'zh', 'з': 'z', 'и': 'i', 'і': 'i', 'ї': 'yi', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
+    'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh',
+    'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu',
+    'я': 'ya', 'ł': 'l', "'": '', '’': '', 'ʼ': '', '`': '',
+})
+_SEPARATORS = re.compile(r'[^a-z0-9]+')
+
+
+def fold(text: str) -> str:
+    """Lowercase Latin key: transliterated, without diacritics and punctuation"""
+    text = unicodedata.normalize('NFC', text.strip().lower()).translate(_TRANSLIT)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _distance(a: str, b: str, limit: int) -> int:
+    """Edit distance with adjacent transpositions, gives up above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _max_typos(key: str) -> int:
+    """Short names must match exactly, longer ones tolerate 1-2 typos"""
+    return 0 if len(key) <= 4 else 1 if len(key) <= 8 else 2
+
+
+# Built once at import
+_EXACT: Dict[str, str] = {}
+_NOT_FUZZY: Set[str] = {fold(_city) for _city in OTHER_CITIES}
+_POSTINGS: Dict[str, List[str]] = {}
+for _canonical, _spellings in CITIES.items():
+    for _spelling in (_canonical,) + _spellings:
+        _key = fold(_spelling)
+        if _key and _key not in _EXACT:
+            _EXACT[_key] = _canonical
+            for _gram in _trigrams(_key):
+                _POSTINGS.setdefault(_gram, []).append(_key)
+
+
+def _fuzzy(key: str) -> Optional[str]:
+    limit = _max_typos(key)
+    if not limit or key in _NOT_FUZZY:
+        return None
+    overlap: Dict[str, int] = {}
+    for gram in _trigrams(key):
+        for candidate in _POSTINGS.get(gram, ()):
+            overlap[candidate] = overlap.get(candidate, 0) + 1
+    best, best_distance = set(), limit + 1
+    # Best trigram overlap first; only a handful of candidates get the edit distance
+    for candidate in sorted(overlap, key=overlap.get, reverse=True)[:10]:
+        if candidate[0] != key[0]:
+            continue  # Pinsk is not a typo of Minsk
+        distance = _distance(key, candidate, limit)
+        if distance < best_distance:
+            best, best_distance = {_EXACT[candidate]}, distance
+        elif distance == best_distance <= limit:
+            best.add(_EXACT[candidate])
+    # Two cities equally close: ambiguous, better to keep the user's own spelling
+    return best.pop() if len(best) == 1 else None
+
+
+@lru_cache(maxsize=4096)
+def resolve_city(city_input: str) -> Optional[str]:
+    """Canonical English city name, or None for an unknown city"""
+    if not city_input:
+        return None
+    key = fold(city_input)
+    if not key:
+        return None
+    return _EXACT.get(key) or _fuzzy(key)
+
+
+def normalize_city(city_input: str) -> str:
+    """Canonical name for known cities, title-cased input for unknown ones"""
+    if not city_input:
+        return ""
+    return resolve_city(city_input) or city_input.strip().title()
@@ -0,0 +1,150 @@
+"""
+Offline gazetteer: coordinates of every city the resolver knows
+
+Keys are the canonical names from helpers.city_resolver.CITIES (the values
+stored in profiles.city_normalized), so nearby-city search never needs a
+geocoding call.
+"""
+from math import asin, cos, radians, sin, sqrt
+from typing import Dict, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+# city_normalized -> (lat, lon), city centre
+COORDINATES: Dict[str, Tuple[float, float]] = {
+    # Ukraine
+    "Kyiv": (50.4501, 30.5234),
+    "Kharkiv": (49.9935, 36.2304),
+    "Odesa": (46.4825, 30.7233),
+    "Dnipro": (48.4647, 35.0462),
+    "Donetsk": (48.0159, 37.8028),
+    "Zaporizhzhia": (47.8388, 35.1396),
+    "Lviv": (49.8397, 24.0297),
+    "Kryvyi Rih": (47.9105, 33.3918),
+    "Mykolaiv": (46.9750, 31.9946),
+    "Mariupol": (47.0971, 37.5434),
+    "Luhansk": (48.5740, 39.3078),
+    "Sevastopol": (44.6166, 33.5254),
+    "Simferopol": (44.9521, 34.1024),
+    "Vinnytsia": (49.2331, 28.4682),
+    "Kherson": (46.6354, 32.6169),
+    "Poltava": (49.5883, 34.5514),
+    "Chernihiv": (51.4982, 31.2893),
+    "Cherkasy": (49.4444, 32.0598),
+    "Zhytomyr": (50.2547, 28.6587),
+    "Sumy": (50.9077, 34.7981),
+    "Rivne": (50.6199, 26.2516),
+    "Ternopil": (49.5535, 25.5948),
+    "Lutsk": (50.7472, 25.3254),
+    "Bila Tserkva": (49.7968, 30.1311),
+    "Kremenchuk": (49.0659, 33.4100),
+    "Ivano-Frankivsk": (48.9226, 24.7111),
+    "Drohobych": (49.3500, 23.5050),
+    "Kamianets-Podilskyi": (48.6845, 26.5856),
+    "Uzhhorod": (48.6208, 22.2879),
+    "Berdiansk": (46.7553, 36.7885),
+    "Pavlohrad": (48.5350, 35.8700),
+    "Alchevsk": (48.4672, 38.8170),
+    "Lysychansk": (48.9044, 38.4422),
+    "Sievierodonetsk": (48.9482, 38.4917),
+    # Russia
+    "Moscow": (55.7558, 37.6173),
+    "Saint Petersburg": (59.9343, 30.3351),
+    "Novosibirsk": (55.0084, 82.9357),
+    "Yekaterinburg": (56.8389, 60.6057),
+    "Kazan": (55.7963, 49.1088),
+    "Nizhny Novgorod": (56.2965, 43.9361),
+    "Chelyabinsk": (55.1644, 61.4368),
+    "Samara": (53.1959, 50.1002),
+    "Ufa": (54.7388, 55.9721),
+    "Rostov-on-Don": (47.2357, 39.7015),
+    "Krasnoyarsk": (56.0153, 92.8932),
+    "Omsk": (54.9885, 73.3242),
+    "Voronezh": (51.6720, 39.1843),
+    "Perm": (58.0105, 56.2502),
+    "Volgograd": (48.7080, 44.5133),
+    "Krasnodar": (45.0355, 38.9753),
+    "Saratov": (51.5331, 46.0342),
+    "Tyumen": (57.1530, 65.5343),
+    "Tolyatti": (53.5303, 49.3461),
+    "Izhevsk": (56.8526, 53.2045),
+    "Barnaul": (53.3548, 83.7698),
+    "Ulyanovsk": (54.3142, 48.4031),
+    "Irkutsk": (52.2870, 104.3050),
+    "Khabarovsk": (48.4802, 135.0719),
+    "Makhachkala": (42.9849, 47.5047),
+    "Vladivostok": (43.1155, 131.8855),
+    "Yaroslavl": (57.6261, 39.8845),
+    "Orenburg": (51.7682, 55.0969),
+    "Tomsk": (56.4846, 84.9476),
+    "Kemerovo": (55.3549, 86.0873),
+    "Ryazan": (54.6292, 39.7364),
+    "Naberezhnye Chelny": (55.7436, 52.3958),
+    "Penza": (53.1959, 45.0183),
+    "Kirov": (58.6036, 49.6680),
+    "Lipetsk": (52.6031, 39.5708),
+    "Cheboksary": (56.1439, 47.2489),
+    "Balashikha": (55.7963, 37.9382),
+    # Belarus, Central Asia
+    "Minsk": (53.9006, 27.5590),
+    "Tashkent": (41.2995, 69.2401),
+    "Almaty": (43.2220, 76.8512),
+    "Astana": (51.1694, 71.4491),
+    # Poland, Baltics, Finland
+    "Warsaw": (52.2297, 21.0122),
+    "Krakow": (50.0647, 19.9450),
+    "Lodz": (51.7592, 19.4560),
+    "Wroclaw": (51.1079, 17.0385),
+    "Katowice": (50.2649, 19.0238),
+    "Gdansk": (54.3520, 18.6466),
+    "Helsinki": (60.1699, 24.9384),
+    "Tallinn": (59.4370, 24.7536),
+}
+
+# Business day of a city starts at local midnight: IANA zone per city, Ukraine by default
+DEFAULT_TIMEZONE = "Europe/Kyiv"
+
+_TIMEZONE_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "Europe/Moscow": ("Moscow", "Saint Petersburg", "Kazan", "Nizhny Novgorod", "Rostov-on-Don", "Voronezh",
+                      "Krasnodar", "Makhachkala", "Yaroslavl", "Ryazan", "Naberezhnye Chelny", "Penza",
+                      "Lipetsk", "Cheboksary", "Balashikha"),
+    "Europe/Samara": ("Samara", "Tolyatti", "Izhevsk"),
+    "Europe/Ulyanovsk": ("Ulyanovsk",),
+    "Europe/Saratov": ("Saratov",),
+    "Europe/Volgograd": ("Volgograd",),
+    "Europe/Kirov": ("Kirov",),
+    "Asia/Yekaterinburg": ("Yekaterinburg", "Chelyabinsk", "Ufa", "Perm", "Tyumen", "Orenburg"),
+    "Asia/Omsk": ("Omsk",),
+    "Asia/Novosibirsk": ("Novosibirsk",),
+    "Asia/Barnaul": ("Barnaul",),
+    "Asia/Tomsk": ("Tomsk",),
+    "Asia/Novokuznetsk": ("Kemerovo",),
+    "Asia/Krasnoyarsk": ("Krasnoyarsk",),
+    "Asia/Irkutsk": ("Irkutsk",),
+    "Asia/Vladivostok": ("Khabarovsk", "Vladivostok"),
+    "Europe/Minsk": ("Minsk",),
+    "Asia/Tashkent": ("Tashkent",),
+    "Asia/Almaty": ("Almaty", "Astana"),
+    "Europe/Warsaw": ("Warsaw", "Krakow", "Lodz", "Wroclaw", "Katowice", "Gdansk"),
+    "Europe/Helsinki": ("Helsinki",),
+    "Europe/Tallinn": ("Tallinn",),
+}
+
+# city_normalized -> IANA timezone
+TIMEZONES: Dict[str, str] = {city: DEFAULT_TIMEZONE for city in COORDINATES}
+TIMEZONES.update({city: zone for zone, cities in _TIMEZONE_GROUPS.items() for city in cities})
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a circle around the point"""
+    dlat = radius_km / 111.0
+    dlon = radius_km / max(111.0 * cos(radians(lat)), 1e-6)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
@@ -0,0 +1,330 @@
+"""
+Outbound notifications: priority queue, Telegram rate limits, retries, kept across restarts
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+
+outbox_logger = logging.getLogger('helpers.outbox')
+
+# Lower goes first
+PRIORITY_MATCH = 0
+PRIORITY_LIKE = 1
+
+
+class TokenBucket:
+    """``rate`` tokens per second, at most ``burst`` saved up"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self.wait_time(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self.wait_time(now)
+        return self.tokens >= self.burst
+
+
+class OutboundMessage:
+    __slots__ = ('id', 'chat_id', 'priority', 'payload', 'coalesce_key', 'attempts', 'not_before', 'queued_at')
+
+    def __init__(self, id: Optional[int], chat_id: int, priority: int, payload: Dict[str, Any],
+                 coalesce_key: str = None, attempts: int = 0, not_before: float = 0.0):
+        self.id = id
+        self.chat_id = chat_id
+        self.priority = priority
+        self.payload = payload          # send_message kwargs, JSON-serializable
+        self.coalesce_key = coalesce_key
+        self.attempts = attempts
+        self.not_before = not_before    # unix time, survives restarts
+        self.queued_at = time.time()
+
+
+class Outbox:
+    """Sends notifications off the handler path, within Telegram's limits.
+
+    ``enqueue`` stores the message in the ``outbox`` table and returns; a
+    background loop sends the highest-priority message whose chat may receive
+    one, at most ``global_rate`` per second overall and ``chat_rate`` per
+    chat, ``concurrency`` requests at a time and one per chat. On
+    ``RetryAfter`` all sending pauses for the time Telegram asks; other
+    transient errors back off exponentially up to ``max_attempts``. Blocked
+    bots and missing chats are dropped. A message with a ``coalesce_key``
+    replaces a still-queued one with the same key, so ten likes in a row
+    become one "someone liked you" ping. Rows left by a previous run are
+    picked up by ``load``. Without a ``pool`` the queue lives in memory only.
+    """
+
+    def __init__(self, bot, pool=None, global_rate: float = 30.0, chat_rate: float = 1.0,
+                 concurrency: int = 8, max_attempts: int = 5, backoff: float = 1.0, max_backoff: float = 300.0):
+        self.bot = bot
+        self.pool = pool
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._global = TokenBucket(global_rate)
+        self._chats: Dict[int, TokenBucket] = {}
+        self._pending: Dict[int, OutboundMessage] = {}
+        self._by_key: Dict[str, OutboundMessage] = {}
+        self._busy_chats: Set[int] = set()
+        self._slots = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._paused_until = 0.0
+        self._last_id = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.retried = 0
+        self.retry_after = 0
+        self.coalesced = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    # --- persistence (worker thread) ---
+
+    def _insert(self, message: OutboundMessage) -> int:
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                INSERT INTO outbox (chat_id, priority, payload, coalesce_key, attempts, not_before)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (message.chat_id, message.priority, json.dumps(message.payload, ensure_ascii=False),
+                  message.coalesce_key, message.attempts, message.not_before))
+            conn.commit()
+            return cursor.lastrowid
+
+    def _execute(self, sql: str, params: tuple):
+        with self.pool.connection() as conn:
+            conn.execute(sql, params)
+            conn.commit()
+
+    async def _store(self, fn, *args):
+        if self.pool is None:
+            return None
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except sqlite3.Error as e:
+            outbox_logger.error(f"Outbox persistence error: {e}")
+            return None
+
+    def load(self) -> int:
+        """Queue the messages a previous run did not deliver, return how many"""
+        if self.pool is None:
+            return 0
+        try:
+            with self.pool.connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, chat_id, priority, payload, coalesce_key, attempts, not_before
+                    FROM outbox ORDER BY id
+                ''').fetchall()
+        except sqlite3.Error as e:
+            outbox_logger.error(f"Error loading outbox: {e}")
+            return 0
+        for id, chat_id, priority, payload, coalesce_key, attempts, not_before in rows:
+            if id not in self._pending:
+                self._add(OutboundMessage(id, chat_id, priority, json.loads(payload),
+                                          coalesce_key, attempts, not_before))
+        if rows:
+            outbox_logger.info(f"Outbox: {len(rows)} pending messages restored")
+        return len(rows)
+
+    # --- queue ---
+
+    def _add(self, message: OutboundMessage):
+        self._last_id = max(self._last_id, message.id)
+        self._pending[message.id] = message
+        if message.coalesce_key:
+            self._by_key[message.coalesce_key] = message
+        self._wakeup.set()
+
+    async def enqueue(self, chat_id: int, text: str, priority: int = PRIORITY_LIKE, reply_markup=None,
+                      parse_mode: str = None, coalesce_key: str = None) -> int:
+        """Queue a send_message call, return its outbox id"""
+        payload = {'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        if reply_markup is not None:
+            payload['reply_markup'] = reply_markup.model_dump(exclude_none=True)
+
+        async with self._lock:
+            queued = self._by_key.get(coalesce_key) if coalesce_key else None
+            if queued is not None:
+                # Still waiting for its turn: the newer text wins, the recipient gets one ping
+                queued.payload = payload
+                queued.priority = min(queued.priority, priority)
+                self.coalesced += 1
+                await self._store(self._execute, 'UPDATE outbox SET payload = ?, priority = ? WHERE id = ?',
+                                  (json.dumps(payload, ensure_ascii=False), queued.priority, queued.id))
+                return queued.id
+
+            message = OutboundMessage(None, chat_id, priority, payload, coalesce_key)
+            message.id = await self._store(self._insert, message) or self._last_id + 1
+            self._add(message)
+            return message.id
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= 10000:
+                # Forget chats whose bucket is full again, they start full anyway
+                now = time.monotonic()
+                self._chats = {c: b for c, b in self._chats.items() if not b.full(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate)
+        return bucket
+
+    def _pick(self) -> Tuple[Optional[OutboundMessage], Optional[float]]:
+        """Next message to send now, or None and the seconds until one may be ready"""
+        now, wall = time.monotonic(), time.time()
+        if now < self._paused_until:
+            return None, self._paused_until - now
+
+        best, wait = None, None
+        for message in self._pending.values():
+            if message.chat_id in self._busy_chats:
+                continue  # one request per chat at a time keeps its messages in order
+            delay = max(message.not_before - wall, self._chat_bucket(message.chat_id).wait_time(now))
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+            elif best is None or (message.priority, message.id) < (best.priority, best.id):
+                best = message
+        if best is None:
+            return None, wait
+        global_wait = self._global.wait_time(now)
+        if global_wait > 0:
+            return None, global_wait
+
+        self._global.take(now)
+        self._chat_bucket(best.chat_id).take(now)
+        del self._pending[best.id]
+        if best.coalesce_key and self._by_key.get(best.coalesce_key) is best:
+            del self._by_key[best.coalesce_key]
+        self._busy_chats.add(best.chat_id)
+        return best, None
+
+    # --- delivery ---
+
+    @staticmethod
+    def _request(payload: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = dict(payload)
+        markup = kwargs.get('reply_markup')
+        if markup is not None:
+            markup_type = InlineKeyboardMarkup if 'inline_keyboard' in markup else ReplyKeyboardMarkup
+            kwargs['reply_markup'] = markup_type.model_validate(markup)
+        return kwargs
+
+    async def _retry(self, message: OutboundMessage, delay: float):
+        message.not_before = time.time() + delay
+        self.retried += 1
+        await self._store(self._execute, 'UPDATE outbox SET attempts = ?, not_before = ? WHERE id = ?',
+                          (message.attempts, message.not_before, message.id))
+        self._add(message)
+
+    async def _drop(self, message: OutboundMessage, reason):
+        self.dropped += 1
+        outbox_logger.warning(f"Outbox: message {message.id} to {message.chat_id} dropped: {reason}")
+        await self._store(self._execute, 'DELETE FROM outbox WHERE id = ?', (message.id,))
+
+    async def _deliver(self, message: OutboundMessage):
+        try:
+            await self.bot.send_message(message.chat_id, **self._request(message.payload))
+        except TelegramRetryAfter as e:
+            # Flood control: nothing goes out until Telegram's wait is over
+            self.retry_after += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            outbox_logger.warning(f"Outbox: flood control, pausing for {e.retry_after}s")
+            await self._retry(message, e.retry_after)
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            # Bot blocked, chat not found, bad markup: another attempt won't help
+            await self._drop(message, e)
+        except Exception as e:
+            message.attempts += 1
+            if message.attempts >= self.max_attempts:
+                await self._drop(message, e)
+            else:
+                await self._retry(message, min(self.backoff * 2 ** (message.attempts - 1), self.max_backoff))
+        else:
+            self.sent += 1
+            latency = time.time() - message.queued_at
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            await self._store(self._execute, 'DELETE FROM outbox WHERE id = ?', (message.id,))
+        finally:
+            self._busy_chats.discard(message.chat_id)
+            self._slots.release()
+            self._wakeup.set()
+
+    async def run_forever(self):
+        """Background task: send queued messages as the limits allow"""
+        while True:
+            await self._slots.acquire()
+            try:
+                message = None
+                while message is None:
+                    self._wakeup.clear()
+                    message, wait = self._pick()
+                    if message is None:
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), wait)
+                        except asyncio.TimeoutError:
+                            pass
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._deliver(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def start(self) -> asyncio.Task:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self.run_forever())
+        return self._loop_task
+
+    async def stop(self):
+        """Stop picking new messages and wait for the requests in flight; the rest stays in the table"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def drain(self, timeout: float = None):
+        """Wait until nothing is queued or in flight (tests, benchmarks)"""
+        async def empty():
+            while self._pending or self._tasks:
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(empty(), timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': len(self._pending),
+            'in_flight': len(self._tasks),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'retried': self.retried,
+            'retry_after': self.retry_after,
+            'coalesced': self.coalesced,
+            'avg_latency_ms': self.total_latency / self.sent * 1000 if self.sent else 0.0,
+            'max_latency_ms': self.max_latency * 1000,
+        }
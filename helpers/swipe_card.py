@@ -0,0 +1,53 @@
+"""
+Swipe cards: the next profile replaces the current card message instead of a new message per swipe
+"""
+import logging
+from typing import Dict, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InputMediaPhoto
+
+card_logger = logging.getLogger('helpers.swipe_card')
+
+# How cards were shown since start: edited in place, sent as a new message, edit failed
+card_stats = {'edited': 0, 'sent': 0, 'fallbacks': 0}
+
+
+async def render_card(bot, chat_id: int, card: Optional[Dict], text: str, photo_id: Optional[str],
+                      reply_markup) -> Dict:
+    """Show a card in the chat, return the new card state ``{'message_id', 'photo_id'}``.
+
+    ``card`` is the state returned last time (kept in FSM data). A photo card
+    gets the new photo and caption with one ``editMessageMedia`` (only the
+    caption when the photo is the same), a text card is edited with
+    ``editMessageText``. A new message is sent for the first card, when a
+    photo card has to become a text card or back, and when Telegram refuses
+    the edit (message deleted, older than 48 hours).
+    """
+    if card and bool(card.get('photo_id')) == bool(photo_id):
+        message_id = card['message_id']
+        try:
+            if not photo_id:
+                await bot.edit_message_text(text=text, chat_id=chat_id, message_id=message_id,
+                                            reply_markup=reply_markup, parse_mode='HTML')
+            elif photo_id == card['photo_id']:
+                await bot.edit_message_caption(chat_id=chat_id, message_id=message_id, caption=text,
+                                               reply_markup=reply_markup, parse_mode='HTML')
+            else:
+                await bot.edit_message_media(media=InputMediaPhoto(media=photo_id, caption=text, parse_mode='HTML'),
+                                             chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+            card_stats['edited'] += 1
+            return {'message_id': message_id, 'photo_id': photo_id}
+        except TelegramBadRequest as e:
+            if 'message is not modified' in str(e):
+                # Same card again (e.g. the only card left): it is already on screen
+                return {'message_id': message_id, 'photo_id': photo_id}
+            card_stats['fallbacks'] += 1
+            card_logger.info(f"Card {message_id} in chat {chat_id} can't be edited, sending a new one: {e}")
+
+    if photo_id:
+        sent = await bot.send_photo(chat_id, photo_id, caption=text, reply_markup=reply_markup, parse_mode='HTML')
+    else:
+        sent = await bot.send_message(chat_id, text, reply_markup=reply_markup, parse_mode='HTML')
+    card_stats['sent'] += 1
+    return {'message_id': sent.message_id, 'photo_id': photo_id}
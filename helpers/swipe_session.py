@@ -0,0 +1,64 @@
+"""
+Compact swipe session: shown candidate ids in an array plus a cursor
+"""
+import struct
+from array import array
+from typing import Iterable, Optional
+
+# Oldest ids are dropped past this, so a session never grows with swipe count
+HISTORY_LIMIT = 50
+
+_HEADER = struct.Struct('<i')
+
+
+class SwipeSession:
+    """Swipe history as ``array('q')`` of user_ids and the index of the current card.
+
+    Stored in FSM data as ``pack()`` bytes (4-byte cursor + 8 bytes per id), so
+    a session costs the same whatever the profile rows look like. Card data is
+    hydrated separately from the shared profile cache.
+    """
+
+    __slots__ = ('ids', 'cursor')
+
+    def __init__(self, ids: Iterable[int] = (), cursor: int = -1):
+        self.ids = array('q', ids)
+        self.cursor = cursor
+
+    @classmethod
+    def load(cls, packed: Optional[bytes]) -> 'SwipeSession':
+        session = cls()
+        if packed:
+            session.cursor, = _HEADER.unpack_from(packed)
+            session.ids.frombytes(packed[_HEADER.size:])
+        return session
+
+    def pack(self) -> bytes:
+        return _HEADER.pack(self.cursor) + self.ids.tobytes()
+
+    @property
+    def current(self) -> Optional[int]:
+        if 0 <= self.cursor < len(self.ids):
+            return self.ids[self.cursor]
+        return None
+
+    def push(self, profile_id: int):
+        """Append a new card from the deck and make it current"""
+        self.ids.append(profile_id)
+        if len(self.ids) > HISTORY_LIMIT:
+            del self.ids[:len(self.ids) - HISTORY_LIMIT]
+        self.cursor = len(self.ids) - 1
+
+    def back(self) -> Optional[int]:
+        """Step to the previous card, None when already at the first one"""
+        if self.cursor > 0:
+            self.cursor -= 1
+            return self.ids[self.cursor]
+        return None
+
+    def forward(self) -> Optional[int]:
+        """Step to the next already shown card (after going back), None at the end"""
+        if self.cursor + 1 < len(self.ids):
+            self.cursor += 1
+            return self.ids[self.cursor]
+        return None
@@ -0,0 +1,151 @@
+"""
+Webhook delivery: aiohttp server feeding updates to the Dispatcher through a bounded queue
+"""
+import asyncio
+import hmac
+import logging
+from typing import Optional, Set
+
+from aiohttp import web
+
+webhook_logger = logging.getLogger('helpers.webhook')
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """Telegram pushes updates to ``path``; each one is fed to the Dispatcher in its own task.
+
+    The request handler only checks the secret token (required: without it
+    anyone who finds the URL could inject updates) and puts the raw update
+    on a queue of ``queue_size``. A feeder task starts one dispatcher task
+    per queued update, so concurrency and per-user ordering are left to
+    UpdateLanesMiddleware; at most ``max_pending`` updates are being
+    processed or waiting in a lane at once. When both are full for
+    ``enqueue_timeout`` seconds the update is refused with 503 and Telegram
+    delivers it again later, so a slow database throttles intake instead of
+    piling up tasks in memory. ``/healthz`` reports queue depth and counters.
+    """
+
+    def __init__(self, dispatcher, bot, secret_token: str, path: str = '/webhook',
+                 queue_size: int = 1000, max_pending: int = 1000, enqueue_timeout: float = 5.0, **handler_kwargs):
+        if not secret_token:
+            raise ValueError("WebhookServer needs a secret_token (WEBHOOK_SECRET)")
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.secret_token = secret_token
+        self.path = path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.handler_kwargs = handler_kwargs
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.unauthorized = 0
+        self._feeder: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/healthz', self.healthz)
+        return app
+
+    def _authorized(self, request: web.Request) -> bool:
+        return hmac.compare_digest(request.headers.get(SECRET_HEADER, ''), self.secret_token)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if not self._authorized(request):
+            self.unauthorized += 1
+            return web.Response(status=401)
+        try:
+            update = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        try:
+            await asyncio.wait_for(self.queue.put(update), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            # Backpressure: Telegram keeps the update and retries the delivery
+            self.rejected += 1
+            webhook_logger.warning(f"Update queue full ({self.queue.maxsize}), update {update.get('update_id')} refused")
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response(text='ok')
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok',
+            'queue': self.queue.qsize(),
+            'pending': len(self._pending),
+            'queue_size': self.queue.maxsize,
+            'received': self.received,
+            'processed': self.processed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        })
+
+    async def _feed(self, update: dict):
+        try:
+            await self.dispatcher.feed_raw_update(self.bot, update, **self.handler_kwargs)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            webhook_logger.error(f"Update {update.get('update_id')} failed: {e}")
+        finally:
+            self._slots.release()
+            self.queue.task_done()
+
+    async def _feeder_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            update = await self.queue.get()
+            task = loop.create_task(self._feed(update))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def start_feeder(self):
+        if self._feeder is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._feeder = asyncio.get_running_loop().create_task(self._feeder_loop())
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080):
+        """Start the feeder and the HTTP server (does not register the webhook)"""
+        self.start_feeder()
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        webhook_logger.info(f"Webhook server listening on {host}:{port}{self.path}")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Stop accepting updates, finish the queued and running ones, stop the feeder"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            webhook_logger.warning(f"{self.queue.qsize() + len(self._pending)} updates dropped on shutdown")
+        tasks = list(self._pending) + ([self._feeder] if self._feeder else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._feeder = None
+
+    async def run(self, base_url: str, host: str = '0.0.0.0', port: int = 8080, allowed_updates: list = None):
+        """Register ``base_url`` + ``path`` with Telegram and serve until cancelled"""
+        if not base_url:
+            raise ValueError("Webhook mode needs the public base URL (WEBHOOK_URL)")
+        webhook_url = base_url.rstrip('/') + self.path
+        await self.start(host, port)
+        try:
+            await self.bot.set_webhook(webhook_url, secret_token=self.secret_token, allowed_updates=allowed_updates)
+            webhook_logger.info(f"Webhook set to {webhook_url}")
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
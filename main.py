@@ -6,45 +6,53 @@ from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-import sqlite3
 from datetime import datetime
 import random
 
 from handlers.start import router
+from database.fsm_storage import SQLiteStorage
+from middlewares.language import LanguageMiddleware
 # from rotation_check import check_daily_rotation  # Temporarily disabled
 # from notification_system import get_notification_system  # Temporarily disabled
 
-# Simple rotation check
-async def simple_rotation_check():
-    """Simple daily rotation check"""
-    try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        with sqlite3.connect('drink_bot.db') as conn:
-            cursor = conn.cursor()
-            
-            # Check if we need rotation
-            cursor.execute('SELECT MAX(date) FROM daily_bot_order')
-            last_rotation = cursor.fetchone()[0]
-            
-            if last_rotation != today:
-                logging.info(f"Daily rotation needed: {last_rotation} -> {today}")
-                
-                # Simple activation
-                cursor.execute('''
-                    UPDATE profiles 
-                    SET last_rotation_date = ?
-                    WHERE is_bot = 1 AND (last_rotation_date IS NULL OR last_rotation_date != ?)
-                ''', (today, today))
-                
-                conn.commit()
-                logging.info(f"Daily rotation completed")
-            else:
-                logging.info(f"Daily rotation up to date: {today}")
-                
-    except Exception as e:
-        logging.error(f"Error in rotation check: {e}")
+def make_rotation_scheduler(stagger: float, poll_interval: float):
+    """Daily bot rotation at each city's day boundary, run off the event loop"""
+    from database.models import db
+    from database.rotation_scheduler import RotationScheduler
+    from scripts.bot_rotation import BotRotationManager
+    manager = BotRotationManager(db)
+    return RotationScheduler(
+        db.pool,
+        rotate=lambda city, day: len(manager.rotate_bots_for_city(city, day)),
+        cities=lambda: db.city_config.snapshot.rotation_cities,
+        day_for=db.days.today,
+        stagger=stagger,
+        poll_interval=poll_interval,
+    )
+
+def make_outbox(bot):
+    """Like and match notifications, sent in the background within Telegram's rate limits"""
+    from database.models import db
+    from helpers.outbox import Outbox
+    outbox = Outbox(
+        bot,
+        pool=db.pool,
+        global_rate=float(os.getenv("OUTBOX_GLOBAL_RATE", "30")),
+        chat_rate=float(os.getenv("OUTBOX_CHAT_RATE", "1")),
+    )
+    outbox.load()
+    outbox.start()
+    return outbox
+
+async def city_config_reloader(interval: float):
+    """Pick up city_config edits (limits, tiers, nearby cities) without a restart"""
+    from database.async_db import async_db
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await async_db.reload_city_config()
+        except Exception as e:
+            logging.error(f"Error reloading city config: {e}")
 
 # Load environment variables
 load_dotenv()
@@ -148,29 +156,60 @@ async def main():
         logger.error("BOT_TOKEN not found in environment variables!")
         logger.error("Please create a .env file with BOT_TOKEN=your_token_here")
         return
+
+    webhook_mode = os.getenv("BOT_MODE", "polling") == "webhook"
+    if webhook_mode and not (os.getenv("WEBHOOK_URL") and os.getenv("WEBHOOK_SECRET")):
+        logger.error("BOT_MODE=webhook needs both WEBHOOK_URL and WEBHOOK_SECRET in the environment!")
+        return
     
     try:
+        # Open drink_bot.db and apply pending migrations before anything queries it
+        from database.models import db
+        db.open()
+
         # Initialize bot
         bot = Bot(token=bot_token)
         
         # Set bot instance for notifications
         from handlers.start import set_bot_instance
-        set_bot_instance(bot)
+        outbox = make_outbox(bot)
+        set_bot_instance(bot, outbox)
         
-        # Initialize dispatcher with memory storage for FSM
-        storage = MemoryStorage()
+        # Initialize dispatcher with persistent SQLite storage for FSM
+        storage = SQLiteStorage(os.getenv("FSM_STORAGE_PATH", "fsm_state.db"))
         dp = Dispatcher(storage=storage)
         
         # Add logging middleware
         dp.update.middleware(log_updates)
         
+        # One lane per user: a double tap waits for the first swipe to finish
+        from middlewares.update_lanes import UpdateLanesMiddleware
+        dp.update.middleware(UpdateLanesMiddleware(
+            max_in_flight=int(os.getenv("UPDATE_MAX_IN_FLIGHT", "64")),
+        ))
+        
+        # Resolve user language once per update
+        from database.async_db import async_db
+        dp.update.middleware(LanguageMiddleware(async_db))
+        
         # Include routers - REGISTRATION FIRST!
         dp.include_router(router)  # Registration router must be first
         
         logger.info("📋 Registration router included FIRST")
         
-        # Check daily bot rotation
-        await simple_rotation_check()
+        # Daily bot rotation: catches up on start, then rotates each city when its day begins
+        rotation_interval = float(os.getenv("ROTATION_POLL_INTERVAL", "30"))
+        if rotation_interval > 0:
+            rotation_scheduler = make_rotation_scheduler(
+                stagger=float(os.getenv("ROTATION_STAGGER_SECONDS", "2")),
+                poll_interval=rotation_interval,
+            )
+            asyncio.create_task(rotation_scheduler.run_forever())
+        
+        # Hot reload of per-city limits
+        reload_interval = float(os.getenv("CITY_CONFIG_RELOAD_INTERVAL", "60"))
+        if reload_interval > 0:
+            asyncio.create_task(city_config_reloader(reload_interval))
         
         # Initialize and start notification system
         # notification_system = get_notification_system(bot)
@@ -179,11 +218,27 @@ async def main():
         
         logger.info("🚀 Starting bot...")
         
-        # Start polling
-        await dp.start_polling(
-            bot,
-            allowed_updates=dp.resolve_used_update_types()
-        )
+        if webhook_mode:
+            # Telegram pushes updates to the aiohttp server on fly.toml's internal_port
+            from helpers.webhook import WebhookServer
+            webhook = WebhookServer(
+                dp, bot,
+                secret_token=os.getenv("WEBHOOK_SECRET"),
+                path=os.getenv("WEBHOOK_PATH", "/webhook"),
+                queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+                max_pending=int(os.getenv("WEBHOOK_MAX_PENDING", "1000")),
+            )
+            await webhook.run(
+                os.getenv("WEBHOOK_URL"),
+                port=int(os.getenv("PORT", "8080")),
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+        else:
+            # Start polling
+            await dp.start_polling(
+                bot,
+                allowed_updates=dp.resolve_used_update_types()
+            )
         
     except KeyboardInterrupt:
         logger.info("🛑 Bot stopped by user")
@@ -192,10 +247,22 @@ async def main():
         import traceback
         logger.error(f"💥 TRACEBACK: {traceback.format_exc()}")
     finally:
+        if 'outbox' in locals():
+            await outbox.stop()
+            logger.info(f"📬 Outbox stopped: {outbox.stats()}")
+
         if 'bot' in locals():
             await bot.session.close()
             logger.info("🔌 Bot session closed")
 
+        if 'storage' in locals():
+            await storage.close()
+            logger.info("💾 FSM states saved")
+
+        from database.async_db import async_db
+        async_db.close()
+        logger.info("🔌 Database connections closed")
+
 if __name__ == "__main__":
     try:
         asyncio.run(main())
@@ -0,0 +1,3 @@
+"""
+Aiogram middlewares for Drink Bot
+"""
@@ -0,0 +1,76 @@
+"""
+Per-update language resolution
+"""
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+_current: ContextVar = ContextVar('update_language', default=None)
+
+
+class UpdateLanguage:
+    """Language of the user behind the update being handled"""
+    __slots__ = ('user_id', 'language', 'stored')
+
+    def __init__(self, user_id: int, language: str, stored: str):
+        self.user_id = user_id
+        self.language = language  # FSM state override applied
+        self.stored = stored      # user_settings / profiles only
+
+
+class LanguageMiddleware(BaseMiddleware):
+    """Resolve the sender's language once per update.
+
+    Puts it into handler data as ``lang`` and into a context variable read by
+    ``update_language``, so helpers called many times during one update don't
+    query the language again. Expects the async database facade.
+    """
+
+    def __init__(self, database):
+        self.db = database
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        try:
+            # Warm users are answered from memory without a thread hop
+            stored = self.db.languages.peek(user.id) or await self.db.get_user_language(user.id)
+            language = stored
+            state = data.get('state')
+            if state is not None:
+                language = (await state.get_data()).get('language', stored)
+        except Exception as e:
+            logging.error(f"Error resolving language for user {user.id}: {e}")
+            return await handler(event, data)
+
+        data['lang'] = language
+        token = _current.set(UpdateLanguage(user.id, language, stored))
+        try:
+            return await handler(event, data)
+        finally:
+            _current.reset(token)
+
+
+def update_language(user_id: int, with_state: bool = True) -> Optional[str]:
+    """Language resolved for this update, None outside it or for another user"""
+    current = _current.get()
+    if current is None or current.user_id != user_id:
+        return None
+    return current.language if with_state else current.stored
+
+
+def remember_language(user_id: int, language: str):
+    """User switched language mid-update, keep the resolved value in sync"""
+    current = _current.get()
+    if current is not None and current.user_id == user_id:
+        current.language = current.stored = language
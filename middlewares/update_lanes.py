@@ -0,0 +1,99 @@
+"""
+Per-user serial update lanes with a global cap on running handlers
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+lanes_logger = logging.getLogger('middlewares.update_lanes')
+
+
+class _Lane:
+    __slots__ = ('lock', 'depth')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()  # wakes waiters first come, first served
+        self.depth = 0              # updates queued or running for this user
+
+
+class UpdateLanesMiddleware(BaseMiddleware):
+    """Updates of one user run one after another, different users in parallel.
+
+    Sharded by ``event_from_user``. A user's second tap waits in the user's
+    lane until the first handler has finished, so two swipes never read the
+    same FSM state and ``current_index``. At most ``max_in_flight`` handlers
+    run at once; an update only takes a global slot once it is first in its
+    lane, so one busy user can't use up the cap. Updates without a user
+    bypass the lanes but still count against the cap.
+    """
+
+    def __init__(self, max_in_flight: int = 64, slow_wait: float = 1.0):
+        self.max_in_flight = max_in_flight
+        self.slow_wait = slow_wait
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._lanes: Dict[int, _Lane] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.processed = 0
+        self.max_lane_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get('event_from_user')
+        arrived = time.perf_counter()
+        self.waiting += 1
+        if user is None:
+            try:
+                async with self._slots:
+                    return await self._run(handler, event, data, arrived)
+            finally:
+                self.processed += 1
+
+        lane = self._lanes.get(user.id)
+        if lane is None:
+            lane = self._lanes[user.id] = _Lane()
+        lane.depth += 1
+        self.max_lane_depth = max(self.max_lane_depth, lane.depth)
+        try:
+            async with lane.lock:
+                async with self._slots:
+                    return await self._run(handler, event, data, arrived)
+        finally:
+            self.processed += 1
+            lane.depth -= 1
+            if lane.depth == 0:
+                del self._lanes[user.id]
+
+    async def _run(self, handler, event, data, arrived: float) -> Any:
+        waited = time.perf_counter() - arrived
+        self.waiting -= 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited >= self.slow_wait:
+            lanes_logger.warning(f"Update waited {waited * 1000:.0f} ms for its turn ({self.stats()})")
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'lanes': len(self._lanes),
+            'max_lane_depth': self.max_lane_depth,
+            'processed': self.processed,
+            'avg_wait_ms': self.total_wait / self.processed * 1000 if self.processed else 0.0,
+            'max_wait_ms': self.max_wait * 1000,
+        }
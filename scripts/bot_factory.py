@@ -7,7 +7,6 @@ Bot Factory - Генератор ботов-аккаунтов для систе
 import os
 import sys
 import random
-import sqlite3
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
@@ -201,7 +200,7 @@ class BotFactory:
     def create_bot_in_db(self, profile: Dict[str, Any]) -> bool:
         """Создать бота в базе данных"""
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
+            with self.db.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -220,6 +219,7 @@ class BotFactory:
                 ))
                 
                 conn.commit()
+                self.db.profile_cache.invalidate(profile['user_id'])
                 print(f"Created bot: {profile['name']}, {profile['age']}, {profile['city']}")
                 return True
                 
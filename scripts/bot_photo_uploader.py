@@ -5,7 +5,6 @@ Bot Photo Uploader - Загрузка фото ботов в Telegram
 
 import os
 import sys
-import sqlite3
 import asyncio
 from typing import Dict, Any, List
 
@@ -75,7 +74,7 @@ class BotPhotoUploader:
     def get_bots_without_photos(self) -> List[Dict[str, Any]]:
         """Получить ботов без загруженных фото"""
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
+            with self.db.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT user_id, name, bot_photo_path 
@@ -100,7 +99,7 @@ class BotPhotoUploader:
     def update_bot_photo_id(self, user_id: int, photo_id: str):
         """Обновить photo_id для бота"""
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
+            with self.db.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE profiles 
@@ -108,6 +107,7 @@ class BotPhotoUploader:
                     WHERE user_id = ? AND is_bot = 1
                 ''', (photo_id, user_id))
                 conn.commit()
+                self.db.profile_cache.invalidate(user_id)
                 
         except Exception as e:
             print(f"Error updating photo_id for bot {user_id}: {e}")
@@ -7,70 +7,39 @@ Bot Rotation System - Алгоритм "Управляемого Хаоса"
 import os
 import sys
 import random
-import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Set
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple
 
 # Добавляем путь к корню проекта
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from database.bot_order import daily_bot_order
 from database.models import Database
 from helpers.city_normalizer import normalize_city_name
 
+BOT_COLUMNS = ['user_id', 'name', 'age', 'gender', 'city', 'city_normalized',
+               'favorite_drink', 'who_pays', 'bot_photo_path', 'last_rotation_date']
+
+
 class BotRotationManager:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, database: Database = None):
+        self.db = database or Database()
         
-        # Распределение ботов по важности городов
-        self.city_tiers = {
-            # Tier 1 - Крупнейшие города (15 ботов на гендер)
-            "Москва": 15, "Санкт-Петербург": 15, "Киев": 15, "Минск": 15,
-            
-            # Tier 2 - Большие города (10 ботов на гендер)
-            "Новосибирск": 10, "Екатеринбург": 10, "Ташкент": 10, "Казань": 10,
-            "Харьков": 10, "Нижний Новгород": 10, "Челябинск": 10, "Алматы": 10,
-            "Самара": 10, "Уфа": 10, "Ростов-на-Дону": 10, "Красноярск": 10,
-            "Омск": 10, "Воронеж": 10, "Пермь": 10, "Волгоград": 10,
-            
-            # Tier 3 - Средние города (7 ботов на гендер)
-            "Одесса": 7, "Краснодар": 7, "Днепр": 7, "Саратов": 7, "Донецк": 7,
-            "Тюмень": 7, "Тольятти": 7, "Львов": 7, "Запорожье": 7, "Ижевск": 7,
-            "Барнаул": 7, "Кривой Рог": 7, "Ульяновск": 7, "Иркутск": 7, "Хабаровск": 7,
-            
-            # Tier 4 - Маленькие города (5 ботов на гендер)
-            "Махачкала": 5, "Владивосток": 5, "Ярославль": 5, "Оренбург": 5, "Томск": 5,
-            "Кемерово": 5, "Рязань": 5, "Набережные Челны": 5, "Астана": 5, "Пенза": 5,
-            "Киров": 5, "Липецк": 5, "Чебоксары": 5, "Балашиха": 5, "Николаев": 5
-        }
+        # Распределение ботов по важности городов (таблица city_config)
+        self.city_tiers = self.db.city_config.tiers()
         
         self.rotation_cities = list(self.city_tiers.keys())
 
-    def get_all_bots(self) -> List[Dict[str, Any]]:
-        """Получить всех ботов из базы данных"""
+    def _fetch_bots(self, where: str = '', params: tuple = ()) -> List[Dict[str, Any]]:
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
+            with self.db.pool.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_id, name, age, gender, city, city_normalized,
-                           favorite_drink, who_pays, bot_photo_path, last_rotation_date
+                cursor.execute(f'''
+                    SELECT {', '.join(BOT_COLUMNS)}
                     FROM profiles 
-                    WHERE is_bot = 1
-                ''')
-                
-                # Получаем данные и создаем словари вручную
-                rows = cursor.fetchall()
-                columns = ['user_id', 'name', 'age', 'gender', 'city', 'city_normalized',
-                          'favorite_drink', 'who_pays', 'bot_photo_path', 'last_rotation_date']
-                
-                bots = []
-                for row in rows:
-                    bot_dict = {}
-                    for i, column in enumerate(columns):
-                        bot_dict[column] = row[i]
-                    bots.append(bot_dict)
-                
-                print(f"Found {len(bots)} bots in database")
-                return bots
+                    WHERE is_bot = 1 {where}
+                ''', params)
+                return [dict(zip(BOT_COLUMNS, row)) for row in cursor]
                 
         except Exception as e:
             print(f"Error getting bots: {e}")
@@ -78,11 +47,23 @@ class BotRotationManager:
             traceback.print_exc()
             return []
 
+    def get_all_bots(self) -> List[Dict[str, Any]]:
+        """Получить всех ботов из базы данных (один запрос)"""
+        bots = self._fetch_bots()
+        print(f"Found {len(bots)} bots in database")
+        return bots
+
     def get_bots_by_city_and_gender(self, city_normalized: str, gender: str) -> List[Dict[str, Any]]:
         """Получить ботов для конкретного города и гендера"""
-        bots = self.get_all_bots()
-        return [bot for bot in bots 
-                if bot['city_normalized'] == city_normalized and bot['gender'] == gender]
+        return self._fetch_bots('AND city_normalized = ? AND gender = ?', (city_normalized, gender))
+
+    @staticmethod
+    def group_bots(bots: List[Dict[str, Any]]) -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+        """Разложить ботов по (город, гендер) за один проход"""
+        groups = defaultdict(list)
+        for bot in bots:
+            groups[(bot['city_normalized'], bot['gender'])].append(bot)
+        return groups
 
     def shuffle_bots(self, bots: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Перемешать ботов в случайном порядке"""
@@ -90,25 +71,78 @@ class BotRotationManager:
         random.shuffle(shuffled)
         return shuffled
 
-    def update_rotation_date(self, user_ids: List[int], date: str):
-        """Обновить дату ротации для указанных ботов"""
+    def select_active_bots(self, city_normalized: str, male_bots: List[Dict[str, Any]],
+                           female_bots: List[Dict[str, Any]], date: str) -> List[Dict[str, Any]]:
+        """Выбрать активных ботов города (квота на гендер) в порядке показа.
+
+        Тот же хеш-порядок, что бот считает сам (database/bot_order.py), так что
+        записанная таблица совпадает с BOT_ORDER_MODE=hash.
+        """
+        bots = {bot['user_id']: bot for bot in male_bots + female_bots}
+        order = daily_bot_order(
+            [(bot['user_id'], bot['gender']) for bot in bots.values()],
+            self.db.city_config.bots_per_gender(city_normalized), city_normalized, date, self.db.bot_order.seed,
+        )
+        return [bots[user_id] for user_id in order]
+
+    def write_rotation(self, date: str, selections: Dict[str, List[Dict[str, Any]]], reset_all: bool = False) -> int:
+        """Записать активных ботов и daily_bot_order всех городов одной транзакцией"""
+        cities = list(selections)
+        active_rows = [(date, bot['user_id']) for bots in selections.values() for bot in bots]
+        order_rows = [
+            (city, bot['user_id'], index, date)
+            for city, bots in selections.items()
+            for index, bot in enumerate(bots)
+        ]
+        with self.db.pool.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                if reset_all:
+                    cursor.execute('''
+                        UPDATE profiles SET last_rotation_date = NULL
+                        WHERE is_bot = 1 AND last_rotation_date IS NOT NULL
+                    ''')
+                else:
+                    # Сбрасываем только ротируемые города, остальные не трогаем
+                    cursor.executemany('''
+                        UPDATE profiles SET last_rotation_date = NULL
+                        WHERE is_bot = 1 AND city_normalized = ?
+                    ''', [(city,) for city in cities])
+                cursor.executemany('UPDATE profiles SET last_rotation_date = ? WHERE user_id = ?', active_rows)
+                cursor.executemany('DELETE FROM daily_bot_order WHERE city_normalized = ? AND date = ?',
+                                   [(city, date) for city in cities])
+                cursor.executemany('''
+                    INSERT INTO daily_bot_order (city_normalized, bot_user_id, order_index, date)
+                    VALUES (?, ?, ?, ?)
+                ''', order_rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        for city in cities:
+            # В режиме hash порядок не читается из daily_bot_order, кэш остаётся верным
+            if self.db.bot_order.mode == 'table':
+                self.db.bot_order.invalidate(city, date)
+            self.db.swipe_deck.invalidate_city(city, date)
+        return len(active_rows)
+
+    def update_rotation_date(self, user_ids: List[int], date: str, city_normalized: str = None):
+        """Обновить дату ротации для указанных ботов (сброс только в их городе, если он задан)"""
         try:
-            with sqlite3.connect(self.db.db_path) as conn:
+            with self.db.pool.connection() as conn:
                 cursor = conn.cursor()
-                
-                # Сначала сбрасываем дату ротации для всех ботов
-                cursor.execute("UPDATE profiles SET last_rotation_date = NULL WHERE is_bot = 1")
-                
-                # Устанавливаем новую дату для активных ботов
-                if user_ids:
-                    placeholders = ','.join(['?' for _ in user_ids])
-                    cursor.execute(f'''
-                        UPDATE profiles 
-                        SET last_rotation_date = ? 
-                        WHERE user_id IN ({placeholders}) AND is_bot = 1
-                    ''', [date] + user_ids)
-                
+                if city_normalized:
+                    cursor.execute('''
+                        UPDATE profiles SET last_rotation_date = NULL
+                        WHERE is_bot = 1 AND city_normalized = ?
+                    ''', (city_normalized,))
+                cursor.executemany(
+                    'UPDATE profiles SET last_rotation_date = ? WHERE user_id = ? AND is_bot = 1',
+                    [(date, user_id) for user_id in user_ids]
+                )
                 conn.commit()
+                if city_normalized:
+                    self.db.swipe_deck.invalidate_city(city_normalized, date)
                 print(f"Updated rotation date for {len(user_ids)} bots to {date}")
                 
         except Exception as e:
@@ -116,112 +150,53 @@ class BotRotationManager:
 
     def get_active_bots_for_city(self, city_normalized: str, date: str) -> List[Dict[str, Any]]:
         """Получить активных ботов для города на указанную дату"""
-        try:
-            with sqlite3.connect(self.db.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_id, name, age, gender, city, city_normalized,
-                           favorite_drink, who_pays, bot_photo_path, last_rotation_date
-                    FROM profiles 
-                    WHERE is_bot = 1 
-                    AND city_normalized = ?
-                    AND last_rotation_date = ?
-                    ORDER BY RANDOM()
-                ''', (city_normalized, date))
-                
-                # Получаем данные и создаем словари вручную
-                rows = cursor.fetchall()
-                columns = ['user_id', 'name', 'age', 'gender', 'city', 'city_normalized',
-                          'favorite_drink', 'who_pays', 'bot_photo_path', 'last_rotation_date']
-                
-                bots = []
-                for row in rows:
-                    bot_dict = {}
-                    for i, column in enumerate(columns):
-                        bot_dict[column] = row[i]
-                    bots.append(bot_dict)
-                
-                return bots
-                
-        except Exception as e:
-            print(f"Error getting active bots for {city_normalized}: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+        bots = self._fetch_bots('AND city_normalized = ? AND last_rotation_date = ?', (city_normalized, date))
+        random.shuffle(bots)
+        return bots
 
     def rotate_bots_for_city(self, city_normalized: str, date: str):
-        """Выполнить ротацию ботов для конкретного города"""
+        """Выполнить ротацию ботов для одного города"""
         print(f"\n=== Rotating bots for {city_normalized} ===")
         
-        # Получаем количество ботов для этого города
-        # Находим оригинальное название города по нормализованному
-        original_city = None
-        for city, bots_per_gender in self.city_tiers.items():
-            if normalize_city_name(city) == city_normalized:
-                original_city = city
-                break
-        
-        if original_city:
-            bots_per_gender = self.city_tiers[original_city]
-        else:
-            bots_per_gender = 5  # По умолчанию
+        bots = self._fetch_bots('AND city_normalized = ?', (city_normalized,))
+        groups = self.group_bots(bots)
+        active = self.select_active_bots(city_normalized, groups[(city_normalized, 'male')],
+                                         groups[(city_normalized, 'female')], date)
         
-        print(f"Target: {bots_per_gender} bots per gender for {original_city or city_normalized}")
-        
-        # Получаем всех ботов для города
-        male_bots = self.get_bots_by_city_and_gender(city_normalized, 'male')
-        female_bots = self.get_bots_by_city_and_gender(city_normalized, 'female')
-        
-        print(f"Available bots: {len(male_bots)} male, {len(female_bots)} female")
-        
-        # Перемешиваем ботов
-        male_bots = self.shuffle_bots(male_bots)
-        female_bots = self.shuffle_bots(female_bots)
-        
-        # Выбираем активных ботов (с учетом лимита города)
-        active_male = male_bots[:bots_per_gender]
-        active_female = female_bots[:bots_per_gender]
-        
-        # Собираем ID активных ботов
-        active_bot_ids = [bot['user_id'] for bot in active_male + active_female]
-        
-        print(f"Selected {len(active_male)} male and {len(active_female)} female bots")
-        
-        # Обновляем дату ротации
-        self.update_rotation_date(active_bot_ids, date)
-        
-        return active_male + active_female
+        print(f"Available bots: {len(groups[(city_normalized, 'male')])} male, {len(groups[(city_normalized, 'female')])} female")
+        self.write_rotation(date, {city_normalized: active})
+        return active
 
     def rotate_all_cities(self, date: str = None):
-        """Выполнить ротацию для всех городов"""
+        """Выполнить ротацию для всех городов: одно чтение ботов, одна транзакция записи"""
         if date is None:
-            date = datetime.now().strftime('%Y-%m-%d')
+            date = self.db.days.today()
         
         print(f"Starting bot rotation for {date}")
         print("=" * 60)
         
-        total_activated = 0
+        groups = self.group_bots(self.get_all_bots())
+        selections = {}
         city_stats = {}
         
         for city in self.rotation_cities:
-            # Нормализуем город
             city_normalized = normalize_city_name(city)
-            
-            # Выполняем ротацию
-            active_bots = self.rotate_bots_for_city(city_normalized, date)
-            
-            total_activated += len(active_bots)
+            active_bots = self.select_active_bots(city_normalized, groups.get((city_normalized, 'male'), []),
+                                                  groups.get((city_normalized, 'female'), []), date)
+            selections[city_normalized] = active_bots
             city_stats[city] = len(active_bots)
             
             # Показываем статистику по городу
             male_count = len([b for b in active_bots if b['gender'] == 'male'])
-            female_count = len([b for b in active_bots if b['gender'] == 'female'])
+            female_count = len(active_bots) - male_count
             
             if active_bots:
                 print(f"OK {city}: {male_count}M + {female_count}F = {len(active_bots)} active")
             else:
                 print(f"WARNING {city}: No bots available")
         
+        total_activated = self.write_rotation(date, selections, reset_all=True)
+        
         # Итоговая статистика
         print("\n" + "=" * 60)
         print(f"ROTATION COMPLETE!")
@@ -240,7 +215,7 @@ class BotRotationManager:
     def get_rotation_report(self, date: str = None) -> Dict[str, Any]:
         """Получить отчет о ротации на указанную дату"""
         if date is None:
-            date = datetime.now().strftime('%Y-%m-%d')
+            date = self.db.days.today()
         
         print(f"\nROTATION REPORT for {date}")
         print("=" * 50)
@@ -253,7 +228,6 @@ class BotRotationManager:
         }
         
         for city in self.rotation_cities:
-            from helpers.city_normalizer import normalize_city_name
             city_normalized = normalize_city_name(city)
             
             active_bots = self.get_active_bots_for_city(city_normalized, date)
@@ -291,7 +265,7 @@ class BotRotationManager:
         test_date = "2024-01-29"
         
         # Выполняем ротацию
-        stats = self.rotate_all_cities(test_date)
+        self.rotate_all_cities(test_date)
         
         # Показываем отчет
         report = self.get_rotation_report(test_date)
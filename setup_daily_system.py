@@ -1,5 +1,9 @@
 import sqlite3
 from datetime import datetime
+
+from database.city_config import load_snapshot
+from database.migrations import run_migrations
+from helpers.city_normalizer import normalize_city_name
 import random
 
 def setup_daily_system():
@@ -14,53 +18,15 @@ def setup_daily_system():
     print("=" * 50)
     print(f"Date: {today}")
     
-    # 1. Создаем таблицу для ежедневного порядка
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS daily_bot_order (
-            city_normalized TEXT,
-            bot_user_id INTEGER,
-            order_index INTEGER,
-            date TEXT,
-            PRIMARY KEY (city_normalized, bot_user_id, date)
-        )
-    ''')
-    
-    # 2. Получаем конфигурацию городов
-    city_tiers = {
-        "Киев": 15, "Москва": 15, "Санкт-Петербург": 15, "Минск": 15,
-        "Новосибирск": 10, "Екатеринбург": 10, "Ташкент": 10, "Казань": 10,
-        "Харьков": 10, "Нижний Новгород": 10, "Челябинск": 10, "Алматы": 10,
-        "Самара": 10, "Уфа": 10, "Ростов-на-Дону": 10, "Красноярск": 10,
-        "Омск": 10, "Воронеж": 10, "Пермь": 10, "Волгоград": 10,
-        "Одесса": 7, "Краснодар": 7, "Днепр": 7, "Саратов": 7, "Донецк": 7,
-        "Тюмень": 7, "Тольятти": 7, "Львов": 7, "Запорожье": 7, "Ижевск": 7,
-        "Барнаул": 7, "Кривой Рог": 7, "Ульяновск": 7, "Иркутск": 7, "Хабаровск": 7,
-        "Махачкала": 5, "Владивосток": 5, "Ярославль": 5, "Оренбург": 5, "Томск": 5,
-        "Кемерово": 5, "Рязань": 5, "Набережные Челны": 5, "Астана": 5, "Пенза": 5,
-        "Киров": 5, "Липецк": 5, "Чебоксары": 5, "Балашиха": 5, "Николаев": 5
-    }
+    # 1. Таблица daily_bot_order и ее индекс создаются миграциями
+    run_migrations(conn)
     
-    # 3. Маппинг городов
-    city_mappings = {
-        "москва": "Moscow", "киев": "Kyiv", "санкт-петербург": "Saint Petersburg",
-        "минск": "Minsk", "харьков": "Kharkiv", "одесса": "Odesa", "днепр": "Dnipro",
-        "донецк": "Donetsk", "запорожье": "Zaporizhzhia", "львов": "Lviv",
-        "новосибирск": "Novosibirsk", "екатеринбург": "Yekaterinburg", "ташкент": "Tashkent",
-        "казань": "Kazan", "нижний новгород": "Nizhny Novgorod", "челябинск": "Chelyabinsk",
-        "алматы": "Almaty", "самара": "Samara", "уфа": "Ufa", "ростов-на-дону": "Rostov-on-Don",
-        "красноярск": "Krasnoyarsk", "омск": "Omsk", "воронеж": "Voronezh", "пермь": "Perm",
-        "волгоград": "Volgograd", "краснодар": "Krasnodar", "саратов": "Saratov", "тюмень": "Tyumen",
-        "тольятти": "Tolyatti", "барнаул": "Barnaul", "ульяновск": "Ulyanovsk", "иркутск": "Irkutsk",
-        "хабаровск": "Khabarovsk", "махачкала": "Makhachkala", "владивосток": "Vladivostok",
-        "ярославль": "Yaroslavl", "оренбург": "Orenburg", "томск": "Tomsk", "кемерово": "Kemerovo",
-        "рязань": "Ryazan", "набережные челны": "Naberezhnye Chelny", "астана": "Astana",
-        "пенза": "Penza", "киров": "Kirov", "липецк": "Lipetsk", "чебоксары": "Cheboksary",
-        "балашиха": "Balashikha", "николаев": "Mykolaiv"
-    }
+    # 2. Получаем конфигурацию городов (таблица city_config)
+    city_tiers = load_snapshot(conn).tiers()
     
-    # 4. Для каждого города создаем порядок
+    # 3. Для каждого города создаем порядок
     for city, bots_per_gender in city_tiers.items():
-        city_normalized = city_mappings.get(city.lower(), city)
+        city_normalized = normalize_city_name(city)
         
         print(f"\nProcessing {city} ({city_normalized})...")
         
@@ -122,14 +88,6 @@ def setup_daily_system():
     
     conn.commit()
     
-    # 5. Создаем индекс
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_daily_bot_order_lookup 
-        ON daily_bot_order (city_normalized, date, order_index)
-    ''')
-    
-    conn.commit()
-    
     # 6. Проверяем результат
     print(f"\nSYSTEM SETUP COMPLETE:")
     cursor.execute('SELECT COUNT(*) FROM profiles WHERE is_bot = 1 AND last_rotation_date = ?', (today,))
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from database.models import Database
+from database.async_db import AsyncDatabase
+
+
+class SlowSwipeDatabase(Database):
+    """Database whose swipe query takes as long as a cold full scan"""
+
+    def get_profiles_for_swiping_with_filters(self, *args, **kwargs):
+        time.sleep(0.5)
+        return super().get_profiles_for_swiping_with_filters(*args, **kwargs)
+
+
+def test_async_database_does_not_serialize_users():
+    """Нагрузочный тест: медленный запрос одного юзера не блокирует остальных"""
+
+    async def scenario(adb):
+        await adb.create_profile(1, 'Slow', 30, 'male', 'Kyiv', 'Пиво')
+        for user_id in range(2, 22):
+            await adb.create_profile(user_id, f'User {user_id}', 25, 'female', 'Kyiv', 'Вино')
+
+        loop_lag = []
+
+        async def ticker():
+            # Measures how late the event loop wakes us up
+            for _ in range(20):
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                loop_lag.append(time.perf_counter() - started - 0.01)
+
+        async def fast_user(user_id):
+            started = time.perf_counter()
+            profile = await adb.get_profile(user_id)
+            assert profile['user_id'] == user_id
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        slow = asyncio.create_task(adb.get_profiles_for_swiping_with_filters(1, city_normalized='Kyiv'))
+        await asyncio.sleep(0)
+        fast_times = await asyncio.gather(*(fast_user(user_id) for user_id in range(2, 22)), ticker())
+        await slow
+        total = time.perf_counter() - started
+
+        # Other users are served while the slow query is still running
+        assert max(fast_times[:-1]) < 0.4
+        # The event loop itself never stalls behind the query
+        assert max(loop_lag) < 0.1
+        # Everything finishes in about the time of the one slow query
+        assert total < 0.9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = SlowSwipeDatabase(os.path.join(tmp, 'async.db'), pool_size=4)
+        adb = AsyncDatabase(database)
+        try:
+            asyncio.run(scenario(adb))
+        finally:
+            adb.close()
+
+
+def test_async_database_mirrors_sync_surface():
+    with tempfile.TemporaryDirectory() as tmp:
+        adb = AsyncDatabase(Database(os.path.join(tmp, 'mirror.db'), pool_size=4))
+        try:
+            async def scenario():
+                assert await adb.create_profile(7, 'Ann', 22, 'female', 'Київ', 'Вино')
+                profile = await adb.get_profile(7)
+                assert profile['city_normalized'] == 'Kyiv'
+                # Inline helpers are awaitable too
+                assert await adb.normalize_city('киев') == 'Kyiv'
+                assert adb.db_path.endswith('mirror.db')
+
+            asyncio.run(scenario())
+            assert adb.max_workers == 2  # two connections stay with background threads
+        finally:
+            adb.close()
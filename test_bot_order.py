@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+from database.bot_order import BotOrder, daily_bot_order
+from database.models import Database
+
+
+def _add_bots(db, city_normalized: str, male: int, female: int, start_id: int):
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, is_bot)
+            VALUES (?, 'Bot', 25, ?, ?, ?, 'Пиво', 1)
+        ''', [(start_id + i, 'male' if i < male else 'female', city_normalized, city_normalized)
+              for i in range(male + female)])
+        conn.commit()
+
+
+def test_order_is_deterministic_and_respects_quota():
+    bots = [(i, 'male' if i % 3 else 'female') for i in range(60)]
+    order = daily_bot_order(bots, 5, 'Kyiv', '2026-01-01', 'seed')
+
+    assert order == daily_bot_order(list(reversed(bots)), 5, 'Kyiv', '2026-01-01', 'seed')
+    assert len(order) == 10 and len(set(order)) == 10
+    genders = dict(bots)
+    assert sum(genders[user_id] == 'male' for user_id in order) == 5
+
+    # Another day, city or seed gives another permutation
+    assert order != daily_bot_order(bots, 5, 'Kyiv', '2026-01-02', 'seed')
+    assert order != daily_bot_order(bots, 5, 'Lviv', '2026-01-01', 'seed')
+    assert order != daily_bot_order(bots, 5, 'Kyiv', '2026-01-01', 'other')
+
+    # Memoized per (city, day): the roster is read once
+    loads = []
+    bot_order = BotOrder(lambda city: loads.append(city) or bots, lambda city, day: [], lambda city: 5, seed='seed')
+    assert bot_order.get('Kyiv', '2026-01-01') == order
+    assert bot_order.get('Kyiv', '2026-01-01') == order
+    assert loads == ['Kyiv'] and bot_order.computed == 1
+    bot_order.invalidate('Kyiv')
+    bot_order.get('Kyiv', '2026-01-01')
+    assert loads == ['Kyiv', 'Kyiv']
+
+    # A (city, day) invalidation keeps the city's other days
+    bot_order.get('Kyiv', '2026-01-02')
+    bot_order.invalidate('Kyiv', '2026-01-02')
+    bot_order.get('Kyiv', '2026-01-01')
+    assert loads == ['Kyiv', 'Kyiv', 'Kyiv']
+
+
+def test_swipe_works_without_rotation_rows():
+    """Пропущенная ротация: бот считает порядок сам, daily_bot_order пуст и ничего не пишется"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'order.db'), pool_size=1)
+        try:
+            db.create_profile(1, 'Swiper', 30, 'male', 'Kyiv', 'Пиво')
+            _add_bots(db, 'Kyiv', 20, 20, 1000)  # quota 15 per gender
+
+            profiles = db.get_profiles_for_swiping_by_city_exact(1, 'Kyiv', limit=100)
+            expected = db.bot_order.get('Kyiv', db.days.today('Kyiv'))
+            assert [p['user_id'] for p in profiles] == list(expected)
+            assert len(expected) == 30
+
+            # A second process with the same seed serves the same feed
+            other = Database(os.path.join(tmp, 'order.db'), pool_size=1)
+            try:
+                assert other.bot_order.get('Kyiv', other.days.today('Kyiv')) == expected
+            finally:
+                other.close()
+
+            with db._connect() as conn:
+                assert conn.execute('SELECT COUNT(*) FROM daily_bot_order').fetchone()[0] == 0
+                assert conn.execute('SELECT COUNT(*) FROM profiles WHERE last_rotation_date IS NOT NULL').fetchone()[0] == 0
+
+            # A quota change from city_config applies without a rotation run
+            db.update_city_config('Kyiv', bots_per_gender=2)
+            assert len(db.get_profiles_for_swiping_with_filters(1, 'Kyiv', limit=100)) == 4
+        finally:
+            db.close()
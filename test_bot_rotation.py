@@ -0,0 +1,79 @@
+import contextlib
+import io
+import os
+import tempfile
+
+from database.models import Database
+from scripts.bot_rotation import BotRotationManager
+
+
+def _add_bots(db, city_normalized: str, male: int, female: int, start_id: int) -> int:
+    rows = []
+    for i in range(male + female):
+        gender = 'male' if i < male else 'female'
+        rows.append((start_id + i, f'Bot {start_id + i}', 25, gender, city_normalized, city_normalized, 'Пиво'))
+    with db._connect() as conn:
+        conn.executemany('''
+            INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, is_bot)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ''', rows)
+        conn.commit()
+    return start_id + len(rows)
+
+
+def _active_counts(db, date: str) -> dict:
+    with db._connect() as conn:
+        rows = conn.execute('''
+            SELECT city_normalized, gender, COUNT(*) FROM profiles
+            WHERE is_bot = 1 AND last_rotation_date = ?
+            GROUP BY city_normalized, gender
+        ''', (date,)).fetchall()
+    return {(city, gender): count for city, gender, count in rows}
+
+
+def test_every_city_keeps_its_quota():
+    """Ротация всех городов: каждый город сохраняет свою квоту, не только последний"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'rotation.db'), pool_size=1)
+        try:
+            next_id = 1000
+            next_id = _add_bots(db, 'Kyiv', 20, 20, next_id)     # quota 15 per gender
+            next_id = _add_bots(db, 'Kharkiv', 12, 3, next_id)   # quota 10, only 3 women
+            next_id = _add_bots(db, 'Mykolaiv', 8, 8, next_id)   # quota 5, last tier
+            next_id = _add_bots(db, 'Atlantis', 5, 5, next_id)   # not in city_config
+
+            manager = BotRotationManager(db)
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.rotate_all_cities('2026-01-01')
+
+            counts = _active_counts(db, '2026-01-01')
+            assert counts == {
+                ('Kyiv', 'male'): 15, ('Kyiv', 'female'): 15,
+                ('Kharkiv', 'male'): 10, ('Kharkiv', 'female'): 3,
+                ('Mykolaiv', 'male'): 5, ('Mykolaiv', 'female'): 5,
+            }
+
+            with db._connect() as conn:
+                order = conn.execute('''
+                    SELECT city_normalized, COUNT(*), MIN(order_index), MAX(order_index) FROM daily_bot_order
+                    WHERE date = ? GROUP BY city_normalized
+                ''', ('2026-01-01',)).fetchall()
+            assert {row[0]: row[1:] for row in order} == {
+                'Kyiv': (30, 0, 29), 'Kharkiv': (13, 0, 12), 'Mykolaiv': (10, 0, 9),
+            }
+
+            # Next day replaces the active set instead of adding to it
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.rotate_all_cities('2026-01-02')
+            assert _active_counts(db, '2026-01-01') == {}
+            assert sum(_active_counts(db, '2026-01-02').values()) == 53
+
+            # Single-city rotation leaves the other cities alone
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.rotate_bots_for_city('Kyiv', '2026-01-03')
+            counts = _active_counts(db, '2026-01-02')
+            assert ('Kyiv', 'male') not in counts and counts[('Kharkiv', 'male')] == 10
+            assert _active_counts(db, '2026-01-03') == {('Kyiv', 'male'): 15, ('Kyiv', 'female'): 15}
+        finally:
+            db.close()
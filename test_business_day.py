@@ -0,0 +1,52 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from database.business_day import BusinessDay
+from database.models import Database
+
+
+def test_day_key_follows_city_timezone():
+    days = BusinessDay({'Kyiv': 'Europe/Kyiv', 'Warsaw': 'Europe/Warsaw', 'Nowhere': 'Mars/Olympus'}.get)
+    now = datetime(2026, 3, 1, 22, 30, tzinfo=timezone.utc)
+
+    assert days.today('Kyiv', now) == '2026-03-02'     # UTC+2
+    assert days.today('Warsaw', now) == '2026-03-01'   # UTC+1
+    assert days.today('Atlantis', now) == '2026-03-02'  # no zone: default Europe/Kyiv
+    assert days.today('Nowhere', now) == '2026-03-02'   # bad zone name: default as well
+
+
+def test_views_limits_and_decks_roll_over_per_city():
+    """Киев уже в новом дне, Варшава ещё нет: просмотры, лимиты и колоды не путаются"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'days.db'), pool_size=1)
+        clock = [datetime(2026, 3, 1, 22, 30, tzinfo=timezone.utc)]
+        db.days.clock = lambda: clock[0]
+        try:
+            db.create_profile(1, 'Kyiv user', 30, 'male', 'Kyiv', 'Пиво')
+            db.create_profile(2, 'Warsaw user', 30, 'male', 'Warsaw', 'Пиво')
+            db.mark_profile_as_viewed(1, 100)
+            db.mark_profile_as_viewed(2, 100)
+            db.increment_daily_bot_count(1, 'Kyiv')
+            db.write_behind.flush()
+
+            with db._connect() as conn:
+                views = conn.execute('SELECT user_id, view_date FROM profile_views ORDER BY user_id').fetchall()
+                counters = conn.execute('SELECT city_normalized, date FROM daily_bot_limits').fetchall()
+            assert views == [(1, '2026-03-02'), (2, '2026-03-01')]
+            assert counters == [('Kyiv', '2026-03-02')]
+            assert db.get_viewed_profiles_today(2) == [100]
+            assert db.seen.get(2).has_viewed(100)
+            kyiv_deck, warsaw_deck = db.swipe_deck.make_key('Kyiv'), db.swipe_deck.make_key('Warsaw')
+
+            # Midnight in Warsaw: only Warsaw's day changes
+            clock[0] = datetime(2026, 3, 1, 23, 30, tzinfo=timezone.utc)
+            assert db.get_viewed_profiles_today(1) == [100]
+            assert db.get_viewed_profiles_today(2) == []
+            assert db.seen.get(1).has_viewed(100) and not db.seen.get(2).has_viewed(100)
+            assert db.swipe_deck.make_key('Kyiv') == kyiv_deck
+            assert db.swipe_deck.make_key('Warsaw') != warsaw_deck
+            assert db.get_daily_bot_status(1, 'Kyiv')['shown'] == 1
+        finally:
+            db.close()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+
+from database.city_config import CitySnapshot
+from database.models import Database
+
+
+def test_city_config_seeded_from_migration():
+    """Лимиты, тиры и соседние города читаются из таблицы city_config"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'cities.db'), pool_size=1)
+        try:
+            config = db.city_config
+            assert config.daily_limit('Kyiv') == 15
+            assert config.daily_limit('Saint Petersburg') == 12
+            assert config.daily_limit('Lviv') == 8
+            assert config.daily_limit('Kryvyi Rih') == 5
+            assert config.daily_limit('Atlantis') == 5
+
+            assert config.bots_per_gender('Saint Petersburg') == 15
+            assert config.bots_per_gender('Kharkiv') == 10
+            assert config.nearby('Kyiv') == ('Kharkiv', 'Odesa', 'Lviv', 'Dnipro')
+            assert config.with_nearby('Atlantis') == ['Atlantis']
+
+            tiers = config.tiers()
+            assert len(tiers) == 50 and tiers['Mykolaiv'] == 5
+            # Warsaw has neighbours but no bots to rotate
+            assert 'Warsaw' not in tiers and config.nearby('Warsaw')
+
+            assert db.get_daily_bot_status(1, 'Kyiv')['limit'] == 15
+        finally:
+            db.close()
+
+
+def test_city_config_hot_reload():
+    """Изменение лимита применяется без перезапуска, старый снимок не меняется"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cities.db')
+        db = Database(path, pool_size=1)
+        try:
+            before = db.city_config.snapshot
+            assert db.update_city_config('Kyiv', daily_limit=20, nearby=['Lviv'])
+            assert db.city_config.daily_limit('Kyiv') == 20
+            assert db.city_config.nearby('Kyiv') == ('Lviv',)
+            assert db.get_daily_bot_status(1, 'Kyiv')['limit'] == 20
+            # Readers holding the previous snapshot keep a consistent view
+            assert before.daily_limit('Kyiv') == 15
+
+            # New city, then an edit made by another process
+            assert db.update_city_config('Porto', tier=4, bots_per_gender=3, daily_limit=6)
+            assert db.city_config.tiers()['Porto'] == 3
+            with sqlite3.connect(path) as other:
+                other.execute("UPDATE city_config SET daily_limit = 9 WHERE city_normalized = 'Porto'")
+            assert db.city_config.daily_limit('Porto') == 6
+            assert db.reload_city_config() is True
+            assert db.city_config.daily_limit('Porto') == 9
+            assert db.reload_city_config() is False
+
+            # Broken table: keep serving the last good snapshot
+            with sqlite3.connect(path) as other:
+                other.execute("ALTER TABLE city_config RENAME TO city_config_old")
+            assert db.reload_city_config() is False
+            assert db.city_config.daily_limit('Porto') == 9
+        finally:
+            db.close()
+
+
+def test_snapshot_is_read_only():
+    snapshot = CitySnapshot([('Kyiv', 1, 15, 15, 'Lviv, Odesa')])
+    assert snapshot.nearby('Kyiv') == ('Lviv', 'Odesa')
+    try:
+        snapshot._cities['Kyiv'] = None
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("snapshot mapping must be immutable")
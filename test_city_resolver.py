@@ -0,0 +1,39 @@
+from helpers.city_normalizer import normalize_city_name
+from helpers.city_resolver import fold, resolve_city
+
+
+def test_city_resolver_spellings_and_typos():
+    """Один индекс городов: кириллица, украинский, латиница, диакритика, опечатки"""
+
+    cases = {
+        'Киев': 'Kyiv', 'київ': 'Kyiv', 'KYIV': 'Kyiv', ' Kiev ': 'Kyiv',
+        'Харків': 'Kharkiv', 'Kharkov': 'Kharkiv', 'Харьков': 'Kharkiv',
+        'Санкт Петербург': 'Saint Petersburg', 'спб': 'Saint Petersburg', 'St. Petersburg': 'Saint Petersburg',
+        'Ростов на Дону': 'Rostov-on-Don', 'Кривой Рог': 'Kryvyi Rih', 'Ижевск': 'Izhevsk',
+        'Kraków': 'Krakow', 'Łódź': 'Lodz', 'Кам’янець-Подільський': 'Kamianets-Podilskyi',
+        # Typos
+        'Масква': 'Moscow', 'Moskow': 'Moscow', 'Екатеринбур': 'Yekaterinburg', 'Новосибирк': 'Novosibirsk',
+    }
+    for raw, expected in cases.items():
+        assert normalize_city_name(raw) == expected, raw
+
+    assert fold('Дніпро') == 'dnipro'
+    # Short names never fuzzy-match, unknown cities keep the old title-case fallback
+    assert resolve_city('Uta') is None
+    assert normalize_city_name('berlin') == 'Berlin'
+
+    # Real cities close to a supported one stay themselves
+    not_typos = {
+        'Pinsk': 'Pinsk', 'Пинск': 'Пинск', 'Kursk': 'Kursk', 'Курск': 'Курск',
+        'Krasnogorsk': 'Krasnogorsk', 'Lutsk': 'Lutsk', 'Minsk': 'Minsk',
+    }
+    for raw, expected in not_typos.items():
+        assert normalize_city_name(raw) == expected, raw
+    # A typo that changes the first letter is not guessed either
+    assert resolve_city('Vinsk') is None
+    assert normalize_city_name('') == ''
+
+    resolve_city.cache_clear()
+    normalize_city_name('Киев')
+    normalize_city_name('Киев')
+    assert resolve_city.cache_info().hits == 1
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import tempfile
+import threading
+
+from database.pool import ConnectionPool
+
+
+def test_connection_pool():
+    """Пул отдает одно и то же долгоживущее соединение и применяет PRAGMA один раз"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, 'pool.db'), size=2, timeout=0.2)
+
+        with pool.connection() as conn:
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            first = conn
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+            # Nested use in the same thread gets the same connection back
+            with pool.connection() as nested:
+                assert nested is conn
+
+        with pool.connection() as conn:
+            assert conn is first
+            conn.execute('INSERT INTO t VALUES (1)')
+
+        # Errors roll back the transaction
+        try:
+            with pool.connection() as conn:
+                conn.execute('INSERT INTO t VALUES (2)')
+                raise ValueError('boom')
+        except ValueError:
+            pass
+
+        with pool.connection() as conn:
+            assert conn.execute('SELECT x FROM t').fetchall() == [(1,)]
+
+        # Two threads holding connections exhaust a pool of size 2
+        holding = threading.Barrier(3)
+        release = threading.Event()
+
+        def hold():
+            with pool.connection():
+                holding.wait()
+                release.wait()
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        holding.wait()
+        try:
+            with pool.connection():
+                assert False, 'pool should be exhausted'
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        assert pool.open_connections == 2
+        pool.close_all()
+        assert pool.open_connections == 0
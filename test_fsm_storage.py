@@ -0,0 +1,73 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from database.fsm_storage import SQLiteStorage
+
+
+class Form(StatesGroup):
+    name = State()
+
+
+def test_sqlite_storage_persists_and_coalesces():
+    """FSM в SQLite: переживает рестарт, пачки записей схлопываются, TTL чистит старое"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fsm.db')
+        key = StorageKey(bot_id=1, chat_id=42, user_id=42)
+        other = StorageKey(bot_id=1, chat_id=43, user_id=43)
+
+        async def first_run():
+            storage = SQLiteStorage(path, flush_interval=0.05)
+            writes = []
+            original_write = storage._write
+            storage._write = lambda rows, deletes: writes.append(len(rows)) or original_write(rows, deletes)
+
+            await storage.set_state(key, Form.name)
+            for i in range(100):
+                await storage.update_data(key, {'step': i, 'swipe': b'\x01\x02'})
+            await storage.set_data(other, {'temp': 1})
+            await storage.set_data(other, {})
+
+            # Reads see pending writes before any flush
+            assert (await storage.get_data(key))['step'] == 99
+            await asyncio.sleep(0.2)
+            # 101 writes to one key + one emptied key -> a single upserted row
+            assert writes[0] == 1
+
+            # Idle clean keys leave memory and are reloaded from disk
+            storage.idle_seconds = 0
+            storage._evict_idle()
+            assert not storage._hot
+            assert await storage.get_state(key) == Form.name.state
+            await storage.close()
+
+        async def second_run():
+            storage = SQLiteStorage(path)
+            assert await storage.get_state(key) == Form.name.state
+            assert await storage.get_data(key) == {'step': 99, 'swipe': b'\x01\x02'}
+            assert await storage.get_data(other) == {}
+            await storage.close()
+
+        asyncio.run(first_run())
+        asyncio.run(second_run())
+
+        # Stored as JSON, bytes (packed swipe sessions) as base64
+        with sqlite3.connect(path) as conn:
+            raw = conn.execute('SELECT data FROM fsm_state').fetchone()[0]
+        assert raw == '{"step":99,"swipe":{"__bytes__":"AQI="}}'
+
+        # Abandoned states expire
+        with sqlite3.connect(path) as conn:
+            conn.execute('UPDATE fsm_state SET updated_at = ?', (time.time() - 10,))
+        storage = SQLiteStorage(path, ttl_seconds=5)
+        assert asyncio.run(storage.get_state(key)) is None
+        storage._cleanup_expired()
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('SELECT COUNT(*) FROM fsm_state').fetchone()[0] == 0
+        asyncio.run(storage.close())
@@ -0,0 +1,89 @@
+import os
+import tempfile
+
+from database.geo_index import GeoIndex
+from database.models import Database
+from helpers.city_resolver import CITIES
+from helpers.gazetteer import COORDINATES, haversine_km
+
+
+def test_gazetteer_covers_every_resolvable_city():
+    assert set(COORDINATES) == set(CITIES)
+    assert 460 < haversine_km(*COORDINATES['Kyiv'], *COORDINATES['Lviv']) < 480
+
+
+def test_nearby_cities_from_spatial_index():
+    """Соседние города: радиус по координатам плюс дополнительные из city_config"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'geo.db'), pool_size=1)
+        try:
+            nearby = db.geo.nearby('Lviv', radius_km=200, limit=10)
+            assert nearby[:2] == ('Drohobych', 'Ivano-Frankivsk')
+            assert 'Lviv' not in nearby and 'Kyiv' not in nearby
+            distances = [haversine_km(*COORDINATES['Lviv'], *COORDINATES[city]) for city in nearby]
+            assert distances == sorted(distances) and distances[-1] <= 200
+
+            # Spatial neighbours first, hand-picked extras (Kyiv for Lviv) after them
+            cities = db.get_nearby_cities('Lviv')
+            assert cities[0] == 'Drohobych' and cities[-1] == 'Kyiv'
+            assert db.get_nearby_cities('Tashkent') == []
+            assert db.get_nearby_cities('Atlantis') == []
+
+            assert [city for city, _ in db.geo.nearest(50.0, 30.0, k=2)] == ['Bila Tserkva', 'Kyiv']
+            assert [city for city, _ in db.geo.nearest(41.3, 69.2)] == ['Tashkent']
+
+            db.geo.add('Brovary', 50.5110, 30.7909)
+            assert db.geo.nearby('Kyiv')[0] == 'Brovary'
+        finally:
+            db.close()
+
+
+def test_profiles_get_city_coordinates():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'geo.db'), pool_size=1)
+        try:
+            db.create_profile(1, 'Ann', 22, 'female', 'Киев', 'Вино')
+            profile = db.get_profile(1)
+            assert (profile['lat'], profile['lon']) == COORDINATES['Kyiv']
+
+            db.update_profile(1, city='Львов')
+            profile = db.get_profile(1)
+            assert (profile['lat'], profile['lon']) == COORDINATES['Lviv']
+
+            db.update_user_city_normalized(1, 'Atlantis', 'Atlantis')
+            profile = db.get_profile(1)
+            assert profile['lat'] is None and profile['lon'] is None
+        finally:
+            db.close()
+
+
+def test_gazetteer_additions_reach_an_existing_database():
+    """Город, добавленный в газеттир после миграции, попадает в city_geo при старте"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'geo.db')
+        db = Database(path, pool_size=1)
+        try:
+            with db._connect() as conn:
+                conn.execute("DELETE FROM city_geo WHERE city_normalized = 'Drohobych'")
+                conn.execute('''
+                    INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink)
+                    VALUES (1, 'Ann', 25, 'female', 'Brovary', 'Brovary', 'Вино')
+                ''')
+                conn.commit()
+        finally:
+            db.close()
+
+        db = Database(path, pool_size=1)
+        try:
+            # Restored from the gazetteer on start, and nothing left to write after that
+            assert 'Drohobych' in db.geo.nearby('Lviv')
+            assert db.geo.sync(COORDINATES) == 0
+
+            newer = GeoIndex(db.pool, gazetteer={**COORDINATES, 'Brovary': (50.5110, 30.7909)})
+            assert newer.nearby('Kyiv')[0] == 'Brovary'
+            with db._connect() as conn:
+                assert conn.execute('SELECT lat FROM profiles WHERE user_id = 1').fetchone()[0] == 50.5110
+        finally:
+            db.close()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import tempfile
+
+from database.geocoding import GeocodingService, LocalGeocoder
+from database.models import Database
+
+
+class FailingGeocoder:
+    name = 'failing'
+
+    def __init__(self):
+        self.calls = 0
+
+    def geocode(self, query):
+        self.calls += 1
+        raise TimeoutError("service unavailable")
+
+
+def test_known_cities_never_hit_the_network():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'geo.db'), pool_size=1)
+        backend = LocalGeocoder()
+        service = GeocodingService(db.pool, db.geo, backend=backend, min_interval=0)
+        try:
+            result = service.lookup('Харьков')
+            assert result.city_normalized == 'Kharkiv' and result.found and result.source == 'index'
+            assert asyncio.run(service.geocode('Kyiv')).source == 'index'
+            assert service.lookup('Brovary') is None
+            assert backend.calls == 0
+        finally:
+            db.close()
+
+
+def test_network_lookups_are_deduplicated_cached_and_rate_limited():
+    """Один запрос на город, ответы (в т.ч. "не найдено") сохраняются в geocode_cache"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'geo.db'), pool_size=1)
+        backend = LocalGeocoder(places={'Brovary': (50.5110, 30.7909), 'Irpin': (50.5218, 30.2506)}, delay=0.05)
+        service = GeocodingService(db.pool, db.geo, backend=backend, min_interval=0.2)
+        try:
+            async def run():
+                started = asyncio.get_running_loop().time()
+                results = await asyncio.gather(*[service.geocode('Brovary') for _ in range(5)])
+                irpin = await service.geocode('irpin')
+                return results, irpin, asyncio.get_running_loop().time() - started
+
+            results, irpin, elapsed = asyncio.run(run())
+            assert all(r.found and r.city_normalized == 'Brovary' and r.source == 'local' for r in results)
+            assert irpin.found
+            # Five concurrent requests share one call; the second city waits for the rate limit
+            assert backend.calls == 2 and service.network_calls == 2
+            assert elapsed >= 0.2
+
+            # Spatial index (backed by city_geo) now knows the city
+            cached = service.lookup('  brovary ')
+            assert cached.source == 'index' and (cached.lat, cached.lon) == (50.5110, 30.7909)
+            assert 'Brovary' in db.geo.nearby('Kyiv')
+
+            missing = asyncio.run(service.geocode('Nowhereville'))
+            assert missing.found is False
+            cached = service.lookup('Nowhereville')
+            assert cached.found is False and cached.source == 'cache'
+            assert backend.calls == 3
+        finally:
+            db.close()
+
+
+def test_failures_are_not_cached_and_background_lookup():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'geo.db'), pool_size=1)
+        try:
+            failing = GeocodingService(db.pool, db.geo, backend=FailingGeocoder(), min_interval=0)
+            assert asyncio.run(failing.geocode('Brovary')) is None
+            assert failing.network_errors == 1
+            assert failing.lookup('Brovary') is None
+
+            service = GeocodingService(db.pool, db.geo, backend=LocalGeocoder(places={'Brovary': (50.5110, 30.7909)}),
+                                       min_interval=0)
+
+            async def run():
+                service.schedule('Brovary')
+                await service.drain()
+
+            asyncio.run(run())
+            assert service.lookup('Brovary').found
+            assert db.lookup_city_location('Brovary').city_normalized == 'Brovary'
+        finally:
+            db.close()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+from database.async_db import AsyncDatabase
+from database.models import Database
+from middlewares.language import LanguageMiddleware, update_language, remember_language
+
+
+def test_language_resolver_tracks_writes():
+    """Язык: один запрос на пользователя, дальше из памяти; записи обновляют карту"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'lang.db'), pool_size=1)
+        try:
+            assert db.get_user_language(1) == 'ru'
+
+            db.create_profile(1, 'Ann', 22, 'female', 'Kyiv', 'Вино', language='en')
+            assert db.get_user_language(1) == 'en'
+            assert db.get_user_language(1) == 'en'
+            assert db.languages.hits == 1 and db.languages.misses == 2
+
+            # user_settings wins over profiles.language
+            db.update_user_language(1, 'ua')
+            assert db.get_user_language(1) == 'ua'
+            db.update_profile(1, language='en')
+            assert db.get_user_language(1) == 'ua'
+            # Unrelated profile updates keep the entry
+            db.update_profile(1, username='ann')
+            assert db.languages.peek(1) == 'ua'
+        finally:
+            db.close()
+
+
+def test_language_middleware_resolves_once_per_update():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'lang.db'), pool_size=1)
+        async_db = AsyncDatabase(db)
+        db.create_profile(7, 'Bob', 25, 'male', 'Kyiv', 'Пиво', language='en')
+        calls = []
+        loader = db.languages.loader
+        db.languages.loader = lambda user_id: calls.append(user_id) or loader(user_id)
+
+        class FakeState:
+            def __init__(self, data):
+                self.data = data
+
+            async def get_data(self):
+                return dict(self.data)
+
+        async def handler(event, data):
+            assert data['lang'] == update_language(7) == 'ua'
+            assert update_language(7, with_state=False) == 'en'
+            assert update_language(8) is None
+            remember_language(7, 'ru')
+            return update_language(7)
+
+        middleware = LanguageMiddleware(async_db)
+
+        async def run():
+            user = SimpleNamespace(id=7)
+            for _ in range(3):
+                data = {'event_from_user': user, 'state': FakeState({'language': 'ua'})}
+                assert await middleware(handler, object(), data) == 'ru'
+            assert update_language(7) is None
+
+        try:
+            asyncio.run(run())
+            assert calls == [7]
+        finally:
+            async_db.close()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import tempfile
+
+import handlers.start as start
+from database.async_db import AsyncDatabase
+from database.models import Database
+
+
+def _add_matches(db, user_id: int, others: range):
+    """Matches alternate sides: user1_id for odd partners, user2_id for even ones"""
+    with db._connect() as conn:
+        for other in others:
+            conn.execute('''
+                INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, photo_id)
+                VALUES (?, ?, 25, 'female', 'Kyiv', 'Kyiv', 'Вино', ?)
+            ''', (other, f'Match {other}', f'photo-{other}' if other % 7 else None))
+            pair = (user_id, other) if other % 2 else (other, user_id)
+            conn.execute('INSERT INTO matches (user1_id, user2_id) VALUES (?, ?)', pair)
+        conn.commit()
+
+
+def test_keyset_pages_cover_every_match_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'matches.db'), pool_size=1)
+        try:
+            db.create_profile(1, 'Me', 30, 'male', 'Kyiv', 'Пиво')
+            _add_matches(db, 1, range(100, 112))
+
+            pages, before = [], None
+            while True:
+                page, more = db.get_user_matches_page(1, before_id=before, limit=5)
+                pages.append([m['user_id'] for m in page])
+                if not more:
+                    break
+                before = page[-1]['match_id']
+
+            # Back from the last page to the middle one
+            newer, more_newer = db.get_user_matches_page(1, after_id=page[0]['match_id'], limit=5)
+        finally:
+            db.close()
+
+    assert pages == [[111, 110, 109, 108, 107], [106, 105, 104, 103, 102], [101, 100]]
+    assert [m['user_id'] for m in newer] == pages[1] and more_newer
+
+
+class RecordingMessage:
+    """Message stand-in: records which Bot API call each answer_* would make"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def answer(self, text, **kwargs):
+        self.calls.append(('sendMessage', text, kwargs.get('reply_markup')))
+
+    async def answer_photo(self, photo, **kwargs):
+        self.calls.append(('sendPhoto', photo, None))
+
+    async def answer_media_group(self, media, **kwargs):
+        self.calls.append(('sendMediaGroup', [item.media for item in media], None))
+
+
+def test_match_page_is_one_album_and_one_navigation_message():
+    """Страница метчей: альбом + одно сообщение с навигацией, без разделителей"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'matches.db'), pool_size=1)
+        saved_db = start.db
+        start.db = AsyncDatabase(db)
+        try:
+            db.create_profile(1, 'Me', 30, 'male', 'Kyiv', 'Пиво')
+            _add_matches(db, 1, range(100, 112))
+            first, second = RecordingMessage(), RecordingMessage()
+            asyncio.run(start.show_matches(first, user_id=1))
+            next_button = first.calls[-1][2].inline_keyboard[0][-1]
+            before = int(next_button.callback_data.split('_')[2])
+            asyncio.run(start.show_matches(second, user_id=1, before_id=before))
+        finally:
+            start.db.close()
+            start.db = saved_db
+
+    assert [call[0] for call in first.calls] == ['sendMediaGroup', 'sendMessage']
+    assert first.calls[0][1] == [f'photo-{n}' for n in (111, 110, 109, 108, 107)]
+    assert [b.text for b in first.calls[1][2].inline_keyboard[0]] == ['➡️ Далее']
+
+    # Match 105 has no photo: it is listed in the navigation message instead
+    assert [call[0] for call in second.calls] == ['sendMediaGroup', 'sendMessage']
+    assert second.calls[0][1] == [f'photo-{n}' for n in (106, 104, 103, 102)]
+    assert 'Match 105' in second.calls[1][1]
+    assert [b.text for b in second.calls[1][2].inline_keyboard[0]] == ['⬅️ Назад', '➡️ Далее']
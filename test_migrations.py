@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import tempfile
+
+from database.models import Database
+from database.migrations import LATEST_VERSION, get_schema_version, run_migrations
+
+
+def test_legacy_database_is_upgraded_in_place():
+    """Старая база без новых колонок мигрирует без потери данных"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        conn = sqlite3.connect(path)
+        conn.execute('''
+            CREATE TABLE profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                age INTEGER NOT NULL,
+                city TEXT NOT NULL,
+                favorite_drink TEXT NOT NULL,
+                photo_id TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                creator_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                place TEXT NOT NULL,
+                price_type TEXT NOT NULL,
+                description TEXT NOT NULL,
+                city TEXT NOT NULL
+            )
+        ''')
+        conn.execute("INSERT INTO profiles (user_id, name, age, city, favorite_drink) VALUES (1, 'Old', 30, 'Киев', 'Пиво')")
+        conn.execute("INSERT INTO events (creator_id, name, place, price_type, description, city) VALUES (1, 'Party', 'Bar', 'free', 'Fun', 'киев')")
+        conn.commit()
+        conn.close()
+
+        db = Database(path, pool_size=1)
+        try:
+            profile = db.get_profile(1)
+            assert profile['name'] == 'Old'
+            assert profile['language'] == 'ru'
+            assert profile['filter_gender'] == 'all'
+
+            with db._connect() as conn:
+                assert get_schema_version(conn) == LATEST_VERSION
+                event = conn.execute('SELECT city_normalized, status, expires_at FROM events').fetchone()
+                assert event[0] == 'Kyiv' and event[1] == 'active' and event[2] is not None
+
+                tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+                for name in ('profile_views', 'daily_bot_order', 'daily_bot_limits', 'user_settings',
+                             'user_notifications', 'idx_daily_bot_order_covering'):
+                    assert name in tables
+        finally:
+            db.close()
+
+
+def test_warm_start_is_single_version_read():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'warm.db')
+        Database(path, pool_size=1).close()
+
+        conn = sqlite3.connect(path)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        assert run_migrations(conn) == 0
+        assert statements == ['SELECT MAX(version) FROM schema_version']
+        conn.close()
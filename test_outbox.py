@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from database.models import Database
+from helpers.outbox import PRIORITY_LIKE, PRIORITY_MATCH, Outbox
+
+
+class FakeBotAPI:
+    """Local Bot API: records sendMessage calls, answers with canned errors per chat"""
+
+    def __init__(self, errors: dict = None):
+        self.errors = errors or {}  # chat_id -> list of error responses, served first
+        self.sent = []              # (monotonic time, chat_id, text, reply_markup)
+        self.server = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        chat_id = int(form['chat_id'])
+        pending = self.errors.get(chat_id)
+        if pending:
+            error = pending.pop(0)
+            return web.json_response(error, status=error['error_code'])
+        markup = json.loads(form['reply_markup']) if 'reply_markup' in form else None
+        self.sent.append((time.monotonic(), chat_id, form['text'], markup))
+        return web.json_response({'ok': True, 'result': {
+            'message_id': len(self.sent), 'date': 1767225600, 'text': form['text'],
+            'chat': {'id': chat_id, 'type': 'private'},
+        }})
+
+    async def __aenter__(self) -> Bot:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        api = TelegramAPIServer.from_base(str(self.server.make_url('')).rstrip('/'))
+        self.bot = Bot(token='42:TEST', session=AiohttpSession(api=api))
+        return self.bot
+
+    async def __aexit__(self, *exc):
+        await self.bot.session.close()
+        await self.server.close()
+
+
+def texts(api: FakeBotAPI, chat_id: int) -> list:
+    return [text for _, chat, text, _ in api.sent if chat == chat_id]
+
+
+def test_priority_coalescing_and_chat_rate():
+    async def run():
+        api = FakeBotAPI()
+        async with api as bot:
+            outbox = Outbox(bot, global_rate=100, chat_rate=10)
+            for liker in 'abc':
+                await outbox.enqueue(1, f'like {liker}', coalesce_key='like:1')
+            await outbox.enqueue(3, 'first')
+            await outbox.enqueue(3, 'second')
+            await outbox.enqueue(2, 'match', priority=PRIORITY_MATCH)
+            outbox.start()
+            await outbox.drain(5)
+            await outbox.stop()
+        return api, outbox
+
+    api, outbox = asyncio.run(run())
+    assert api.sent[0][1:3] == (2, 'match')
+    assert texts(api, 1) == ['like c']
+    assert texts(api, 3) == ['first', 'second']
+    chat3 = [at for at, chat, _, _ in api.sent if chat == 3]
+    assert chat3[1] - chat3[0] >= 0.09  # 10 per second per chat
+    assert outbox.stats()['coalesced'] == 2 and outbox.stats()['sent'] == 4
+
+
+def test_retry_after_pauses_and_blocked_chat_is_dropped():
+    """429 от Telegram: ждём retry_after и повторяем; заблокировавший бота получатель выбывает"""
+
+    async def run():
+        api = FakeBotAPI({
+            5: [{'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                 'parameters': {'retry_after': 1}}],
+            6: [{'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}],
+        })
+        async with api as bot:
+            outbox = Outbox(bot, global_rate=100, chat_rate=100)
+            await outbox.enqueue(5, 'match', priority=PRIORITY_MATCH)
+            await outbox.enqueue(6, 'like', priority=PRIORITY_LIKE)
+            started = time.monotonic()
+            outbox.start()
+            await outbox.drain(5)
+            await outbox.stop()
+        return api, outbox, started
+
+    api, outbox, started = asyncio.run(run())
+    assert texts(api, 5) == ['match'] and texts(api, 6) == []
+    assert api.sent[0][0] - started >= 1.0
+    stats = outbox.stats()
+    assert stats['retry_after'] == 1 and stats['dropped'] == 1 and stats['sent'] == 1
+
+
+def test_pending_messages_survive_restart():
+    async def enqueue(db):
+        outbox = Outbox(None, pool=db.pool)
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text='View', callback_data='view_like_profile_7')]])
+        await outbox.enqueue(8, 'someone liked you', reply_markup=keyboard, coalesce_key='like:8')
+        await outbox.enqueue(9, 'match', priority=PRIORITY_MATCH)
+
+    async def deliver(db):
+        api = FakeBotAPI()
+        async with api as bot:
+            outbox = Outbox(bot, pool=db.pool, global_rate=100, chat_rate=100)
+            restored = outbox.load()
+            await outbox.enqueue(8, 'liked again', coalesce_key='like:8')
+            outbox.start()
+            await outbox.drain(5)
+            await outbox.stop()
+        return api, restored
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'outbox.db'), pool_size=2)
+        try:
+            asyncio.run(enqueue(db))
+            api, restored = asyncio.run(deliver(db))
+            with db._connect() as conn:
+                left = conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+        finally:
+            db.close()
+
+    assert restored == 2 and left == 0
+    assert [(chat, text) for _, chat, text, _ in api.sent] == [(9, 'match'), (8, 'liked again')]
+    assert api.sent[1][3] is None  # coalesced payload replaces the old keyboard too
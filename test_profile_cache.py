@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+
+from database.models import Database
+from database.profile_cache import ProfileCache
+
+
+def test_profile_cache_lru_ttl_and_memory_cap():
+    cache = ProfileCache(max_entries=2, ttl_seconds=60)
+    cache.put(1, {'name': 'A'})
+    cache.put(2, {'name': 'B'})
+    assert cache.get(1) == {'name': 'A'}
+    cache.put(3, {'name': 'C'})  # evicts 2, the least recently used
+    assert cache.get(2) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1 and cache.stats()['evictions'] == 1
+
+    cache = ProfileCache(ttl_seconds=0.01)
+    cache.put(1, {'name': 'A'})
+    time.sleep(0.02)
+    assert cache.get(1) is None
+    assert cache.stats()['entries'] == 0
+
+    # Memory cap holds regardless of entry count
+    cache = ProfileCache(max_entries=1000, max_bytes=4000)
+    for user_id in range(100):
+        cache.put(user_id, {'name': 'x' * 100, 'photo_id': 'p' * 200})
+    assert cache.stats()['bytes'] <= 4000
+    assert 0 < len(cache) < 100
+
+
+def test_database_profile_cache_invalidation():
+    """Кэш профилей: повторные чтения без SQL, любые изменения профиля сбрасывают кэш"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'cache.db'), pool_size=1)
+        try:
+            db.create_profile(1, 'Ann', 22, 'female', 'Kyiv', 'Вино')
+            assert db.get_profile(1)['name'] == 'Ann'
+
+            # Callers get copies, the cached row can't be mutated from outside
+            db.get_profile(1)['name'] = 'Mutated'
+            assert db.get_profile(1)['name'] == 'Ann'
+            assert db.profile_cache.hits == 2
+
+            db.update_profile(1, name='Anna', gender='other')
+            profile = db.get_profile(1)
+            assert profile['name'] == 'Anna' and profile['gender'] == 'other'
+
+            db.update_profile(1, photo_id='photo-2')
+            assert db.get_profile(1)['photo_id'] == 'photo-2'
+
+            db.update_user_city_normalized(1, 'Lviv', 'Lviv')
+            assert db.get_profile(1)['city_normalized'] == 'Lviv'
+
+            db.save_user_filters(1, gender_filter='male')
+            assert db.get_profile(1)['filter_gender'] == 'male'
+
+            db.create_profile(1, 'Anna Re', 23, 'female', 'Kyiv', 'Пиво')
+            assert db.get_profile(1)['name'] == 'Anna Re'
+
+            db.delete_profile(1)
+            assert db.get_profile(1) is None
+        finally:
+            db.close()
+
+
+def test_unregistered_user_is_cached_as_missing():
+    """Пользователь без анкеты: один запрос к profiles, дальше день берётся из кэша"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'cache.db'), pool_size=1)
+        try:
+            queries = []
+            with db._connect() as conn:  # the only pooled connection
+                conn.set_trace_callback(queries.append)
+            for _ in range(3):
+                assert db.get_profile(7) is None
+                db.user_day(7)
+            assert len([q for q in queries if 'FROM profiles' in q]) == 1
+            assert db.profile_cache.misses == 1 and db.profile_cache.hits == 5
+
+            # Registration replaces the negative entry
+            db.create_profile(7, 'Ann', 22, 'female', 'Kyiv', 'Вино')
+            assert db.get_profile(7)['name'] == 'Ann'
+        finally:
+            db.close()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+
+from database.models import Database
+
+# Hot read paths: (method, args). Every SELECT they issue must be index-only.
+HOT_QUERIES = [
+    ('get_profile', (1,)),
+    ('get_user_language', (1,)),
+    ('get_user_filters', (1,)),
+    ('get_profiles_for_swiping_with_filters', (1, 'Kyiv')),
+    ('get_profiles_for_swiping_with_filters', (1, 'Kyiv', 'female', 'split')),
+    ('get_profiles_for_swiping_exact_city', (1, 'Kyiv', 'male', 'i_treat')),
+    ('get_profiles_for_swiping_exact_city_all_data', (1, 'Kyiv')),
+    ('find_profiles_for_swipe', (1, 'Kyiv')),
+    ('get_viewed_profiles_today', (1,)),
+    ('check_mutual_like', (1, 2)),
+    ('record_swipe', (1, 2, 'like')),
+    ('get_mutual_likes', (1,)),
+    ('get_profile_likes', (1,)),
+    ('get_user_matches', (1,)),
+    ('get_user_matches_page', (1,)),
+    ('get_daily_bot_status', (1, 'Kyiv')),
+    ('get_daily_limits', ('Kyiv',)),
+    ('get_city_bot_count', ('Kyiv',)),
+    ('get_events_by_city', ('Kyiv',)),
+    ('get_events_by_city_nearby', ('Kyiv',)),
+    ('get_user_events', (1,)),
+    ('get_companies_by_city', ('Kyiv',)),
+    ('get_user_companies', (1,)),
+]
+
+
+def collect_query_plans(db):
+    """Run every hot method and return (method, sql, plan details) for each SELECT"""
+    plans = []
+    with db._connect() as conn:
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            for name, args in HOT_QUERIES:
+                start = len(statements)
+                getattr(db, name)(*args)
+                for sql in statements[start:]:
+                    if sql.lstrip().upper().startswith('SELECT'):
+                        plans.append((name, sql, [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]))
+        finally:
+            conn.set_trace_callback(None)
+    return plans
+
+
+def test_hot_queries_never_scan():
+    """EXPLAIN QUERY PLAN: горячие запросы используют индексы, без SCAN"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'plans.db'), pool_size=1)
+        try:
+            # A few Kyiv bots so the candidate queries get a non-empty active set
+            with db._connect() as conn:
+                conn.executemany('''
+                    INSERT INTO profiles (user_id, name, age, gender, city, city_normalized, favorite_drink, is_bot)
+                    VALUES (?, 'Bot', 25, ?, 'Kyiv', 'Kyiv', 'Пиво', 1)
+                ''', [(100 + i, 'male' if i % 2 else 'female') for i in range(6)])
+                conn.commit()
+            plans = collect_query_plans(db)
+        finally:
+            db.close()
+
+    assert {name for name, _, _ in plans} == {name for name, _ in HOT_QUERIES}
+
+    scans = [
+        f"{name}: {detail}\n{sql.strip()}"
+        for name, sql, details in plans
+        for detail in details
+        # SCAN CONSTANT ROW is a FROM-less SELECT of scalar subqueries, not a table scan;
+        # an R*Tree "scan" with box constraints (INDEX 2:B0D1...) is a spatial index search
+        if detail.startswith('SCAN') and detail != 'SCAN CONSTANT ROW'
+        and not (' VIRTUAL TABLE INDEX 2:' in detail and not detail.endswith(':'))
+    ]
+    assert not scans, "Full table scans in hot queries:\n" + "\n\n".join(scans)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import threading
+
+from database.models import Database, SwipeOutcome
+
+
+def test_record_swipe_outcomes():
+    """Свайп одной транзакцией: просмотр, лайк, взаимность и мэтч"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'swipe.db'), pool_size=1)
+        try:
+            assert db.record_swipe(1, 2, 'dislike') == SwipeOutcome.VIEWED
+            assert db.record_swipe(1, 2, 'dislike') == SwipeOutcome.DUPLICATE
+            assert db.get_viewed_profiles_today(1) == [2]
+
+            assert db.record_swipe(1, 3, 'like') == SwipeOutcome.LIKED
+            assert db.record_swipe(1, 3, 'like') == SwipeOutcome.DUPLICATE
+            assert db.record_swipe(3, 1, 'like') == SwipeOutcome.MATCHED
+            assert db.check_mutual_like(1, 3)
+            with db._connect() as conn:
+                assert conn.execute('SELECT user1_id, user2_id FROM matches').fetchall() == [(1, 3)]
+        finally:
+            db.close()
+
+
+def test_record_swipe_simultaneous_likes_match_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'swipe.db'), pool_size=2)
+        try:
+            for pair in range(20):
+                a, b = 1000 + pair * 2, 1001 + pair * 2
+                barrier = threading.Barrier(2)
+                outcomes = []
+
+                def like(from_id, to_id):
+                    barrier.wait()
+                    outcomes.append(db.record_swipe(from_id, to_id, 'like'))
+
+                threads = [threading.Thread(target=like, args=(a, b)), threading.Thread(target=like, args=(b, a))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                assert sorted(outcomes) == [SwipeOutcome.LIKED, SwipeOutcome.MATCHED]
+        finally:
+            db.close()
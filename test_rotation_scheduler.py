@@ -0,0 +1,98 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from database.models import Database
+from database.rotation_scheduler import RotationScheduler
+
+
+def test_each_city_rotates_once_per_day_across_instances():
+    """Два экземпляра бота: каждый город ротируется один раз в свои сутки"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'rotation.db'), pool_size=2)
+        try:
+            calls = []
+            days = {'Kyiv': '2026-01-01', 'Lviv': '2026-01-01', 'Odesa': '2026-01-01'}
+
+            def make(owner):
+                return RotationScheduler(
+                    db.pool, rotate=lambda city, day: calls.append((city, day)) or 10,
+                    cities=lambda: list(days), day_for=days.get, stagger=0.05, owner=owner,
+                )
+
+            first, second = make('a'), make('b')
+            started = time.perf_counter()
+            assert asyncio.run(first.run_once()) == 3
+            assert time.perf_counter() - started >= 0.1  # cities staggered
+            assert asyncio.run(second.run_once()) == 0
+            assert second.skipped == 3 and len(calls) == 3
+
+            # Lviv's day starts first: only Lviv is due
+            days['Lviv'] = '2026-01-02'
+            assert first.due() == {'Lviv': '2026-01-02'}
+            assert asyncio.run(second.run_once()) == 1
+            assert asyncio.run(first.run_once()) == 0
+            assert calls[-1] == ('Lviv', '2026-01-02')
+
+            with db._connect() as conn:
+                rows = conn.execute('''
+                    SELECT city_normalized, date, owner, status, bots FROM rotation_runs ORDER BY date, city_normalized
+                ''').fetchall()
+            assert rows[-1] == ('Lviv', '2026-01-02', 'b', 'done', 10)
+            assert first.stats()['runs'] == 3 and first.stats()['max_seconds'] >= 0
+        finally:
+            db.close()
+
+
+def test_failed_rotation_is_retried_and_runs_real_rotation():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'rotation.db'), pool_size=2)
+        try:
+            attempts = []
+
+            def flaky(city, day):
+                attempts.append(city)
+                if len(attempts) == 1:
+                    raise RuntimeError("disk full")
+                return 5
+
+            scheduler = RotationScheduler(db.pool, rotate=flaky, cities=lambda: ['Kyiv'],
+                                          day_for=lambda city: '2026-01-01', stagger=0)
+            assert asyncio.run(scheduler.run_once()) == 0
+            assert scheduler.failures == 1 and scheduler.due() == {'Kyiv': '2026-01-01'}
+            assert asyncio.run(scheduler.run_once()) == 1
+            assert attempts == ['Kyiv', 'Kyiv']
+        finally:
+            db.close()
+
+
+def test_city_running_in_another_instance_is_busy_not_failed():
+    """Другой экземпляр ещё ротирует город: не ошибка, смотрим снова на следующем опросе"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'rotation.db'), pool_size=2)
+        try:
+            calls = []
+            scheduler = RotationScheduler(db.pool, rotate=lambda city, day: calls.append(city) or 5,
+                                          cities=lambda: ['Kyiv'], day_for=lambda city: '2026-01-01',
+                                          stagger=0, owner='b')
+            with db._connect() as conn:
+                conn.execute('''
+                    INSERT INTO rotation_runs (city_normalized, date, owner) VALUES ('Kyiv', '2026-01-01', 'a')
+                ''')
+                conn.commit()
+
+            assert asyncio.run(scheduler.run_once()) == 0
+            assert scheduler.stats()['busy'] == 1 and scheduler.failures == 0
+            assert scheduler.due() == {'Kyiv': '2026-01-01'} and calls == []
+
+            # The other instance finishes: the city is done, not rotated twice
+            with db._connect() as conn:
+                conn.execute("UPDATE rotation_runs SET status = 'done'")
+                conn.commit()
+            assert asyncio.run(scheduler.run_once()) == 0
+            assert scheduler.skipped == 1 and scheduler.due() == {} and calls == []
+        finally:
+            db.close()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from database.models import Database
+from database.seen_set import SeenSet, SeenSets
+
+
+def test_seen_set_membership_and_load_race():
+    seen = SeenSet(liked=[5, 3, 3, 9], viewed=[7])
+    assert 3 in seen and 7 in seen and 4 not in seen
+    assert list(seen.liked) == [3, 5, 9]
+
+    # A like recorded while the set is loading is replayed on top of the loaded ids
+    sets = SeenSets(lambda user_id: (sets.add_liked(user_id, 42) or [1], []))
+    assert sets.get(1).has_liked(42) and sets.get(1).has_liked(1)
+    assert sets.loads == 1
+
+
+def test_swipe_queries_skip_seen_profiles():
+    """Исключение лайкнутых/просмотренных без NOT IN и без списка ? в SQL"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'seen.db'), pool_size=1)
+        try:
+            db.create_profile(1, 'Swiper', 30, 'male', 'Kyiv', 'Пиво')
+            for user_id in (2, 3, 4):
+                db.create_profile(user_id, f'User {user_id}', 25, 'female', 'Kyiv', 'Вино')
+
+            # Heavy user: more liked ids than SQLite allows bound parameters
+            with db._connect() as conn:
+                conn.executemany('INSERT INTO likes (from_user_id, to_user_id) VALUES (1, ?)',
+                                 [(10**6 + i,) for i in range(40000)])
+            db.add_like(1, 2)
+
+            assert sorted(p['user_id'] for p in db.find_profiles_for_swipe(1, 'Kyiv')) == [3, 4]
+            assert db.seen.loads == 1
+
+            # Swipes keep the loaded set current, no reload
+            db.record_swipe(1, 3, 'dislike')
+            assert db.seen.get(1).has_viewed(3)
+            db.record_swipe(1, 4, 'like')
+            # find_profiles_for_swipe excludes likes only, a dislike doesn't hide the profile
+            assert [p['user_id'] for p in db.find_profiles_for_swipe(1, 'Kyiv')] == [3]
+            assert db.seen.loads == 1
+        finally:
+            db.close()
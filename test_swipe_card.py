@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageMedia
+
+from helpers.swipe_card import render_card
+
+
+class FakeBot:
+    """Records Bot API calls; edit_error makes the next edit fail with that description"""
+
+    def __init__(self):
+        self.calls = []
+        self.edit_error = None
+        self.next_id = 100
+
+    async def _edit(self, name, **kwargs):
+        self.calls.append(name)
+        if self.edit_error:
+            error, self.edit_error = self.edit_error, None
+            raise TelegramBadRequest(method=EditMessageMedia(media={'type': 'photo', 'media': 'x'}), message=error)
+        return True
+
+    async def edit_message_media(self, **kwargs):
+        return await self._edit('editMessageMedia', **kwargs)
+
+    async def edit_message_caption(self, **kwargs):
+        return await self._edit('editMessageCaption', **kwargs)
+
+    async def edit_message_text(self, **kwargs):
+        return await self._edit('editMessageText', **kwargs)
+
+    async def _send(self, name):
+        self.calls.append(name)
+        self.next_id += 1
+        return SimpleNamespace(message_id=self.next_id)
+
+    async def send_photo(self, *args, **kwargs):
+        return await self._send('sendPhoto')
+
+    async def send_message(self, *args, **kwargs):
+        return await self._send('sendMessage')
+
+
+def test_cards_are_edited_in_place():
+    async def run():
+        bot = FakeBot()
+        card = await render_card(bot, 1, None, 'Ann', 'photo-a', None)
+        card = await render_card(bot, 1, card, 'Kate', 'photo-b', None)
+        card = await render_card(bot, 1, card, 'Kate, 2', 'photo-b', None)
+        return bot, card
+
+    bot, card = asyncio.run(run())
+    assert bot.calls == ['sendPhoto', 'editMessageMedia', 'editMessageCaption']
+    assert card == {'message_id': 101, 'photo_id': 'photo-b'}
+
+
+def test_new_message_only_when_edit_is_impossible():
+    """Фото→текст или удалённое сообщение: отправляем новую карточку"""
+
+    async def run():
+        bot = FakeBot()
+        photo = await render_card(bot, 1, None, 'Ann', 'photo-a', None)
+        text = await render_card(bot, 1, photo, 'No photo', None, None)
+        same = await render_card(bot, 1, text, 'Still no photo', None, None)
+
+        bot.edit_error = 'Bad Request: message is not modified'
+        unchanged = await render_card(bot, 1, same, 'Still no photo', None, None)
+        bot.edit_error = 'Bad Request: message to edit not found'
+        resent = await render_card(bot, 1, unchanged, 'Bob', None, None)
+        return bot, [photo, text, same, unchanged, resent]
+
+    bot, cards = asyncio.run(run())
+    assert bot.calls == ['sendPhoto', 'sendMessage', 'editMessageText',
+                         'editMessageText', 'editMessageText', 'sendMessage']
+    assert [c['message_id'] for c in cards] == [101, 102, 102, 102, 103]
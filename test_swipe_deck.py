@@ -0,0 +1,153 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import handlers.start as start
+from database.async_db import AsyncDatabase
+from database.models import Database
+from helpers.swipe_session import SwipeSession
+
+
+def make_city(db, swiper_id=1, bots=7):
+    """Swiper plus bots in Kyiv that are active in today's rotation"""
+    db.create_profile(swiper_id, 'Swiper', 30, 'male', 'Kyiv', 'Пиво')
+    today = db.days.today('Kyiv')
+    with db._connect() as conn:
+        for i in range(bots):
+            bot_id = 100 + i
+            conn.execute('''
+                INSERT INTO profiles (user_id, name, age, gender, city, city_display, city_normalized,
+                                      favorite_drink, is_bot, last_rotation_date)
+                VALUES (?, ?, 25, ?, 'Kyiv', 'Kyiv', 'Kyiv', 'Вино', 1, ?)
+            ''', (bot_id, f'Bot {i}', 'female' if i % 2 == 0 else 'male', today))
+            # Reverse order_index so the deck order is not just insertion order
+            conn.execute('''
+                INSERT INTO daily_bot_order (city_normalized, bot_user_id, order_index, date)
+                VALUES ('Kyiv', ?, ?, ?)
+            ''', (bot_id, bots - i, today))
+
+
+def drain(db, user_id, **deck):
+    ids = []
+    while True:
+        candidate = db.next_swipe_candidate(user_id, **deck)
+        if candidate is None:
+            return ids
+        ids.append(candidate)
+        db.mark_profile_as_viewed(user_id, candidate)
+        db.swipe_deck._executor.submit(lambda: None).result()  # let background refills land
+
+
+def test_swipe_deck_order_refill_and_invalidation():
+    """Колода: порядок по daily_bot_order, фоновая дозагрузка и инвалидация"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'deck.db'), pool_size=2)
+        db.bot_order.mode = 'table'  # order comes from the daily_bot_order rows written below
+        db.swipe_deck.batch_size = 3
+        db.swipe_deck.low_watermark = 1
+        try:
+            make_city(db)
+            fetches = []
+            original_fetch = db.swipe_deck._fetch
+            db.swipe_deck._fetch = lambda *a: fetches.append(a) or original_fetch(*a)
+
+            assert db.open_swipe_deck(1, 'Kyiv') == 3
+            # Re-opening the feed reuses the materialized deck
+            assert db.open_swipe_deck(1, 'Kyiv') == 3
+            assert len(fetches) == 1
+
+            # A like made elsewhere removes the candidate from the queue
+            db.add_like(1, 105)
+
+            ids = drain(db, 1, city_normalized='Kyiv')
+            assert ids == [106, 104, 103, 102, 101, 100]
+            assert len(fetches) > 1  # remaining batches came from background refills
+
+            # Filters change: the user's deck is rebuilt with the new filter
+            db.save_user_filters(1, gender_filter='female')
+            db.write_behind.flush()
+            with db._connect() as conn:
+                conn.execute('DELETE FROM profile_views')
+            db.seen.clear()  # views removed behind the Database's back
+            assert drain(db, 1, city_normalized='Kyiv', gender_filter='female') == [106, 104, 102, 100]
+
+            # Profile edit: the candidate leaves other users' decks
+            db.write_behind.flush()
+            with db._connect() as conn:
+                conn.execute('DELETE FROM profile_views')
+            db.seen.clear()  # views removed behind the Database's back
+            db.swipe_deck.batch_size = 10
+            db.open_swipe_deck(1, 'Kyiv')
+            db.update_profile(104, name='Renamed')
+            assert 104 not in db.swipe_deck._decks[1].queue
+        finally:
+            db.close()
+
+
+def test_rotation_drops_only_the_rotated_city_decks():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'deck.db'), pool_size=2)
+        try:
+            make_city(db)
+            db.create_profile(2, 'Other', 30, 'male', 'Lviv', 'Пиво')
+            db.open_swipe_deck(1, 'Kyiv')
+            db.open_swipe_deck(2, 'Lviv')
+            db.open_swipe_deck(3, None)
+
+            db.swipe_deck.invalidate_city('Kyiv', 'yesterday')  # another day: only the city-less deck goes
+            assert set(db.swipe_deck._decks) == {1, 2}
+
+            db.swipe_deck.invalidate_city('Kyiv', db.days.today('Kyiv'))
+            assert set(db.swipe_deck._decks) == {2}
+        finally:
+            db.close()
+
+
+class CardBot:
+    """Bot stand-in for the first card: records who was shown"""
+
+    def __init__(self):
+        self.captions = []
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.captions.append(caption)
+        return SimpleNamespace(message_id=len(self.captions))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.captions.append(text)
+        return SimpleNamespace(message_id=len(self.captions))
+
+
+def test_first_card_comes_from_the_filtered_deck():
+    """Первая карточка из той же колоды и с теми же фильтрами, что и следующие"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'deck.db'), pool_size=2)
+        db.bot_order.mode = 'table'
+        saved_db = start.db
+        start.db = AsyncDatabase(db)
+        try:
+            make_city(db)
+            db.save_user_filters(1, gender_filter='female')
+            bot = CardBot()
+            message = SimpleNamespace(from_user=SimpleNamespace(id=1), chat=SimpleNamespace(id=1), bot=bot)
+            state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=1, user_id=1))
+
+            asyncio.run(start.show_next_profile(message, state))
+            data = asyncio.run(state.get_data())
+            shown = SwipeSession.load(data['swipe']).current
+            rest = drain(db, 1, **data['deck'])
+        finally:
+            start.db.close()
+            start.db = saved_db
+
+    # Deck order of the female bots: the first one is on the card, the deck serves the others once
+    assert data['deck']['gender_filter'] == 'female'
+    assert [shown] + rest == [106, 104, 102, 100]
+    assert 'Bot 6' in bot.captions[0]
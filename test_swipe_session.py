@@ -0,0 +1,30 @@
+from helpers.swipe_session import HISTORY_LIMIT, SwipeSession
+
+
+def test_swipe_session_navigation_and_packing():
+    """Сессия свайпа: id в массиве + курсор, назад/вперед и упаковка в bytes"""
+
+    session = SwipeSession()
+    assert session.current is None
+    assert session.forward() is None
+
+    for profile_id in (101, 102, 103):
+        session.push(profile_id)
+    assert session.current == 103
+
+    # Back, then forward replays the card that was not swiped yet
+    assert session.back() == 102
+    restored = SwipeSession.load(session.pack())
+    assert restored.current == 102
+    assert restored.forward() == 103
+    assert restored.forward() is None
+
+    # Packed size depends only on the number of ids
+    assert len(session.pack()) == 4 + 8 * 3
+    assert SwipeSession.load(None).current is None
+
+    # History is capped so long sessions stay small
+    for profile_id in range(HISTORY_LIMIT * 2):
+        session.push(profile_id)
+    assert len(session.ids) == HISTORY_LIMIT
+    assert session.current == HISTORY_LIMIT * 2 - 1
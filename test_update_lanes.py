@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+from middlewares.update_lanes import UpdateLanesMiddleware
+
+
+def make_handler(log: list, running: dict, delay: float = 0.01):
+    async def handler(event, data):
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+        log.append(('start', event))
+        await asyncio.sleep(delay)
+        log.append(('end', event))
+        running['now'] -= 1
+        return event
+    return handler
+
+
+def test_same_user_runs_serially_in_arrival_order():
+    """Двойной тап: второй свайп стартует только после завершения первого"""
+
+    async def run():
+        lanes = UpdateLanesMiddleware()
+        log, running = [], {'now': 0, 'peak': 0}
+        handler = make_handler(log, running)
+        user = {'event_from_user': SimpleNamespace(id=1)}
+        results = await asyncio.gather(*[lanes(handler, n, dict(user)) for n in range(3)])
+        return lanes, log, running, results
+
+    lanes, log, running, results = asyncio.run(run())
+    assert results == [0, 1, 2]
+    assert log == [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)]
+    assert running['peak'] == 1
+    stats = lanes.stats()
+    assert stats['max_lane_depth'] == 3 and stats['lanes'] == 0
+    assert stats['processed'] == 3 and stats['waiting'] == 0
+    assert stats['max_wait_ms'] >= 15
+
+
+def test_users_run_in_parallel_under_global_cap():
+    async def run():
+        lanes = UpdateLanesMiddleware(max_in_flight=2)
+        log, running = [], {'now': 0, 'peak': 0}
+        handler = make_handler(log, running)
+        calls = [lanes(handler, n, {'event_from_user': SimpleNamespace(id=n)}) for n in range(4)]
+        calls.append(lanes(handler, 'channel', {}))  # no user: no lane, still capped
+        await asyncio.gather(*calls)
+        return lanes, running
+
+    lanes, running = asyncio.run(run())
+    assert running['peak'] == 2
+    assert lanes.stats()['max_lane_depth'] == 1
+    assert lanes.stats()['processed'] == 5 and lanes.stats()['in_flight'] == 0
+
+
+def test_failed_handler_releases_lane():
+    async def run():
+        lanes = UpdateLanesMiddleware()
+        user = {'event_from_user': SimpleNamespace(id=7)}
+
+        async def broken(event, data):
+            raise RuntimeError('boom')
+
+        try:
+            await lanes(broken, 'tap', dict(user))
+        except RuntimeError:
+            pass
+        result = await asyncio.wait_for(lanes(make_handler([], {'now': 0, 'peak': 0}), 'retry', dict(user)), 1)
+        return lanes, result
+
+    lanes, result = asyncio.run(run())
+    assert result == 'retry'
+    assert lanes.stats()['lanes'] == 0 and lanes.stats()['in_flight'] == 0
@@ -0,0 +1,133 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from helpers.webhook import SECRET_HEADER, WebhookServer
+from middlewares.update_lanes import UpdateLanesMiddleware
+
+
+def make_update(update_id: int, text: str = 'hi') -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 1767225600, 'text': text,
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Test'},
+        },
+    }
+
+
+def make_dispatcher(seen: list) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        seen.append(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def test_webhook_checks_secret_and_feeds_dispatcher():
+    async def run():
+        seen = []
+        bot = Bot(token='42:TEST')
+        server = WebhookServer(make_dispatcher(seen), bot, secret_token='s3cret')
+        async with TestClient(TestServer(server.make_app())) as client:
+            server.start_feeder()
+            assert (await client.post('/webhook', json=make_update(1))).status == 401
+            response = await client.post('/webhook', json=make_update(2, 'like'), headers={SECRET_HEADER: 's3cret'})
+            assert response.status == 200
+            await server.queue.join()
+
+            health = await (await client.get('/healthz')).json()
+            await server.stop()
+        await bot.session.close()
+        return seen, health, server
+
+    seen, health, server = asyncio.run(run())
+    assert seen == ['like']
+    assert server.unauthorized == 1
+    assert health['processed'] == 1 and health['queue'] == 0
+
+
+def test_full_queue_refuses_updates_with_503():
+    """Очередь заполнена: Telegram получает 503 и повторит доставку позже"""
+
+    async def run():
+        bot = Bot(token='42:TEST')
+        server = WebhookServer(make_dispatcher([]), bot, secret_token='s3cret', queue_size=2,
+                               enqueue_timeout=0.05)
+        async with TestClient(TestServer(server.make_app())) as client:
+            statuses = [(await client.post('/webhook', json=make_update(i), headers={SECRET_HEADER: 's3cret'})).status
+                        for i in range(3)]
+            health = await (await client.get('/healthz')).json()
+        await bot.session.close()
+        return statuses, health
+
+    statuses, health = asyncio.run(run())
+    assert statuses == [200, 200, 503]
+    assert health['queue'] == 2 and health['rejected'] == 1
+
+
+def test_webhook_refuses_to_start_unconfigured():
+    """Без секрета или без WEBHOOK_URL вебхук не стартует"""
+
+    async def run():
+        bot = Bot(token='42:TEST')
+        try:
+            server = WebhookServer(Dispatcher(), bot, secret_token='s3cret')
+            await server.run('', port=0)
+        finally:
+            await bot.session.close()
+
+    try:
+        WebhookServer(Dispatcher(), None, secret_token=None)
+    except ValueError as e:
+        assert 'WEBHOOK_SECRET' in str(e)
+    else:
+        raise AssertionError('no secret accepted')
+
+    try:
+        asyncio.run(run())
+    except ValueError as e:
+        assert 'WEBHOOK_URL' in str(e)
+    else:
+        raise AssertionError('empty URL accepted')
+
+
+def test_busy_user_does_not_stall_other_users():
+    """10 апдейтов от A, затем один от B: B обслужен, не дожидаясь всей очереди A"""
+
+    async def run():
+        finished = []
+        router = Router()
+
+        @router.message()
+        async def slow(message: Message):
+            await asyncio.sleep(0.02)
+            finished.append(message.from_user.id)
+
+        dp = Dispatcher()
+        dp.update.middleware(UpdateLanesMiddleware(max_in_flight=8))
+        dp.include_router(router)
+        bot = Bot(token='42:TEST')
+        server = WebhookServer(dp, bot, secret_token='s3cret')
+        async with TestClient(TestServer(server.make_app())) as client:
+            server.start_feeder()
+            for n in range(11):
+                update = make_update(n)
+                if n == 10:
+                    update['message']['from']['id'] = update['message']['chat']['id'] = 43
+                await client.post('/webhook', json=update, headers={SECRET_HEADER: 's3cret'})
+            await server.queue.join()
+            await server.stop()
+        await bot.session.close()
+        return finished
+
+    finished = asyncio.run(run())
+    assert sorted(finished) == [42] * 10 + [43]
+    assert finished.index(43) < 3
@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from database.models import Database
+
+
+def count_rows(path, table):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_write_behind_buffers_and_drains():
+    """Отложенная запись: чтения видят буфер, пачка по размеру/времени, слив при закрытии"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'wb.db')
+        db = Database(path, pool_size=2)
+        db.write_behind.flush_interval = 60
+        db.write_behind.max_pending = 6  # reached by the last view below (5 views + 1 counter)
+        try:
+            assert db.mark_profile_as_viewed(1, 10)
+            assert not db.mark_profile_as_viewed(1, 10)  # already pending
+            for _ in range(3):
+                db.increment_daily_bot_count(1, 'Kyiv')
+
+            # Nothing committed yet, reads see the buffer
+            assert count_rows(path, 'profile_views') == 0
+            assert db.get_viewed_profiles_today(1) == [10]
+            status = db.get_daily_bot_status(1, 'Kyiv')
+            assert status['shown'] == 3 and status['remaining'] == 12
+
+            # Size threshold wakes the flusher
+            for profile_id in range(11, 15):
+                db.mark_profile_as_viewed(1, profile_id)
+            deadline = time.time() + 5
+            while count_rows(path, 'profile_views') < 5 and time.time() < deadline:
+                time.sleep(0.01)
+            assert count_rows(path, 'profile_views') == 5
+            assert db.get_daily_bot_status(1, 'Kyiv')['shown'] == 3
+
+            # Counter increments merge into the existing row
+            db.increment_daily_bot_count(1, 'Kyiv')
+            db.mark_profile_as_viewed(2, 10)
+        finally:
+            db.close()
+
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('SELECT bots_shown, daily_limit FROM daily_bot_limits').fetchall() == [(4, 15)]
+        assert count_rows(path, 'profile_views') == 6